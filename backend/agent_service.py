@@ -1,21 +1,87 @@
 import os
 import json
-from openai import OpenAI
+import asyncio
+import hashlib
+import re
+import time
+from typing import AsyncIterator, List
+import httpx
+from openai import AsyncOpenAI
 from spoon_ai.llm import LLMManager, ConfigurationManager
 from models import Strategy, PerformanceData, AnalysisResult
 from desearch_service import DesearchService
-# Real-time crypto data now handled by yfinance in the system
+from response_cache import TTLCache
+from prompt_builder import PromptBuilder, compact_json, count_tokens
+from llm_gateway import LLMGateway, LLMUnavailableError
+from market_snapshot import market_snapshot
 
 class TradingStrategyAgent:
     """
     Enhanced Trading Strategy Agent with SpoonOS Real-Time Crypto Data
     """
+    # Chat cache TTLs (seconds), bounded by how fresh each kind of context is
+    CHAT_CACHE_TTL_PLAIN = 1800
+    CHAT_CACHE_TTL_MARKET_DATA = 60
+    CHAT_CACHE_TTL_WEB_SEARCH = 600
+    # Answers built without a requested context source (timeout, error) are only reused briefly
+    CHAT_CACHE_TTL_DEGRADED = 15
+
+    # Market data fields that carry no signal for the model
+    LOW_VALUE_MARKET_FIELDS = ("note",)
+
+    ANALYSIS_TASK = """Using the live market data context, analyze this trading strategy and determine if it should be:
+1. KEPT (performance is good, strategy aligns with current market conditions)
+2. MODIFIED (performance is suboptimal but fixable, may need adjustments for current market)
+3. REPLACED (performance is terrible or strategy is fundamentally flawed for current conditions)
+
+Consider current market volatility, trend direction, and momentum in your analysis.
+If MODIFIED, suggest specific parameter changes based on current market conditions.
+If REPLACED, generate a completely new strategy optimized for the current market environment.
+
+Respond ONLY in valid JSON format:
+{"action": "keep" | "modify" | "replace", "feedback": "Your detailed analysis including market data insights and reasoning", "new_strategy": null | Strategy Object}"""
+
     def __init__(self):
         # Validate OpenAI API key presence
         if not os.getenv("OPENAI_API_KEY"):
             raise ValueError("OPENAI_API_KEY environment variable not set")
         # Initialize both OpenAI and SpoonOS for different capabilities
-        self.client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+        # One pooled HTTP client is shared by every LLM call (keep-alive, bounded connections)
+        max_concurrency = int(os.getenv("OPENAI_MAX_CONCURRENCY", "8"))
+        self.http_client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=max_concurrency * 2,
+                max_keepalive_connections=max_concurrency,
+                keepalive_expiry=60.0
+            ),
+            timeout=httpx.Timeout(60.0, connect=5.0)
+        )
+        # OPENAI_BASE_URL points the agent at any OpenAI-compatible server (e.g. openai_stub.py)
+        # Retries are handled by the gateway, not the SDK
+        self.client = AsyncOpenAI(
+            api_key=os.getenv("OPENAI_API_KEY"),
+            base_url=os.getenv("OPENAI_BASE_URL") or None,
+            http_client=self.http_client,
+            max_retries=0
+        )
+        self.model = os.getenv("OPENAI_MODEL", "gpt-4-1106-preview")
+        # Rate limits, retries and circuit breaking for every LLM call
+        self.gateway = LLMGateway(self.client, self.model, max_concurrency=max_concurrency)
+        self.analysis_timeout = float(os.getenv("OPENAI_ANALYSIS_TIMEOUT", "60"))
+        self.chat_timeout = float(os.getenv("OPENAI_CHAT_TIMEOUT", "30"))
+        
+        # Repeat questions against the same strategy and market are answered from cache
+        self.chat_cache = TTLCache(max_entries=int(os.getenv("CHAT_CACHE_MAX_ENTRIES", "512")))
+        
+        # Per-call prompt budgets and token accounting
+        self.analysis_prompt_budget = int(os.getenv("ANALYSIS_PROMPT_TOKEN_BUDGET", "3000"))
+        self.chat_prompt_budget = int(os.getenv("CHAT_PROMPT_TOKEN_BUDGET", "2000"))
+        self.token_usage = {}
+        
+        # Chat context sources are fetched concurrently, each with its own timeout
+        self.market_data_timeout = float(os.getenv("CHAT_MARKET_DATA_TIMEOUT", "3"))
+        self.news_timeout = float(os.getenv("CHAT_NEWS_TIMEOUT", "8"))
+        self.context_stats = {}
         
         # Initialize SpoonOS for crypto data tools
         try:
@@ -38,54 +104,124 @@ class TradingStrategyAgent:
         
         print("TradingStrategyAgent initialized with real-time crypto data capabilities")
 
+    async def _create_completion(self, timeout: float, prompt_stats: dict, **kwargs):
+        """
+        Run a chat completion through the LLM gateway, reserving the prompt plus max completion tokens
+        """
+        estimated_tokens = prompt_stats["prompt_tokens"] + kwargs.get("max_tokens", 0)
+        return await self.gateway.complete(timeout, estimated_tokens, **kwargs)
+
+    async def aclose(self):
+        """Close the pooled HTTP client"""
+        await self.http_client.aclose()
+
+    def _record_usage(self, kind: str, prompt_stats: dict, response=None, completion_text: str = ""):
+        """
+        Record prompt and completion tokens for one LLM call
+        
+        Uses the provider's usage numbers when the response carries them and local counts otherwise.
+        """
+        usage = getattr(response, "usage", None)
+        prompt_tokens = usage.prompt_tokens if usage else prompt_stats["prompt_tokens"]
+        completion_tokens = usage.completion_tokens if usage else count_tokens(completion_text)
+        
+        stats = self.token_usage.setdefault(kind, {
+            "calls": 0,
+            "prompt_tokens": 0,
+            "completion_tokens": 0,
+            "trimmed_calls": 0,
+            "section_tokens": {}
+        })
+        stats["calls"] += 1
+        stats["prompt_tokens"] += prompt_tokens
+        stats["completion_tokens"] += completion_tokens
+        if prompt_stats["trimmed"]:
+            stats["trimmed_calls"] += 1
+        for section, tokens in prompt_stats["sections"].items():
+            stats["section_tokens"][section] = stats["section_tokens"].get(section, 0) + tokens
+        stats["last_call"] = {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "trimmed": prompt_stats["trimmed"]
+        }
+
+    def get_token_usage(self) -> dict:
+        """Get token usage per call kind, with averages"""
+        report = {}
+        for kind, stats in self.token_usage.items():
+            calls = stats["calls"] or 1
+            report[kind] = {
+                **stats,
+                "avg_prompt_tokens": round(stats["prompt_tokens"] / calls, 1),
+                "avg_completion_tokens": round(stats["completion_tokens"] / calls, 1)
+            }
+        return report
+
     async def get_live_market_data(self, symbol: str = "BTC-USD") -> dict:
         """
-        Get live market data - currently using static fallback
-        Real-time data comes from yfinance_data_generator
+        Get live market data from the shared market snapshot
+        
+        The snapshot is kept current by the yfinance generator and CoinMarketCap
+        service, so this adds no network round trip to the LLM call.
         """
-        # SpoonOS temporarily disabled due to message format issues
-        # The yfinance system provides real-time data directly
+        quote = market_snapshot.get(symbol)
+        if quote is not None:
+            return quote
         
-        # Simple fallback - yfinance is the primary real-time data source
         return {
             "symbol": symbol,
-            "price": 96000.0,  # Approximate current BTC price
-            "change_24h": 0.0,
-            "source": "static_fallback",
-            "note": "Real-time data via yfinance in the main system"
+            "source": "unavailable",
+            "note": "No recent quote in the market snapshot"
         }
 
-    async def analyze_strategy(self, strategy: Strategy, performance: PerformanceData) -> AnalysisResult:
-        # Get live market data for enhanced analysis
-        market_data = await self.get_live_market_data("BTC-USD")
-        
-        prompt = f"""
-        You are an expert quantitative trading agent with access to real-time market data.
+    async def analyze_strategy(self, strategy: Strategy, performance: PerformanceData, raise_on_error: bool = False) -> AnalysisResult:
+        """
+        Analyze one performance snapshot of a strategy
         
-        Current Market Data: {json.dumps(market_data, indent=2)}
-        Strategy: {strategy.json()}
-        Performance: {performance.json()}
+        A failed LLM call returns a "keep" result, or raises when raise_on_error is set
+        so callers can tell a real review from the safety fallback.
+        """
+        return await self._run_strategy_analysis(strategy, f"Performance: {compact_json(performance.dict())}", raise_on_error)
+
+    async def analyze_strategy_batch(self, strategy: Strategy, performances: List[PerformanceData], raise_on_error: bool = False) -> AnalysisResult:
+        """
+        Analyze several performance snapshots of one strategy with a single LLM call
         
-        Using the live market data context, analyze this trading strategy and determine if it should be:
-        1. KEPT (performance is good, strategy aligns with current market conditions)
-        2. MODIFIED (performance is suboptimal but fixable, may need adjustments for current market)
-        3. REPLACED (performance is terrible or strategy is fundamentally flawed for current conditions)
+        The strategy and market context are sent once, followed by the snapshots as a
+        time series, so tokens and calls scale with the number of batches, not files.
+        """
+        if len(performances) == 1:
+            return await self.analyze_strategy(strategy, performances[0], raise_on_error)
         
-        Consider current market volatility, trend direction, and momentum in your analysis.
-        If MODIFIED, suggest specific parameter changes based on current market conditions.
-        If REPLACED, generate a completely new strategy optimized for the current market environment.
+        series = sorted(performances, key=lambda p: p.timestamp)
+        # Column names once, then one row of values per snapshot
+        columns = [field for field in series[0].dict() if field != "strategy_id"]
+        rows = [[p.dict()[field] for field in columns] for p in series]
+        performance_section = (
+            f"Performance Time Series ({len(rows)} snapshots, oldest first): "
+            f"{compact_json({'columns': columns, 'rows': rows})}"
+        )
+        return await self._run_strategy_analysis(strategy, performance_section, raise_on_error)
+
+    async def _run_strategy_analysis(self, strategy: Strategy, performance_section: str, raise_on_error: bool = False) -> AnalysisResult:
+        # Get live market data for enhanced analysis
+        market_data = await self.get_live_market_data("BTC-USD")
+        market_data = {k: v for k, v in market_data.items() if k not in self.LOW_VALUE_MARKET_FIELDS}
         
-        Respond ONLY in valid JSON format:
-        {{
-            "action": "keep" | "modify" | "replace",
-            "feedback": "Your detailed analysis including market data insights and reasoning",
-            "new_strategy": null | Strategy Object
-        }}
-        """
+        prompt, prompt_stats = (
+            PromptBuilder(self.analysis_prompt_budget)
+            .add("role", "You are an expert quantitative trading agent with access to real-time market data.", required=True)
+            .add("market_data", f"Current Market Data: {compact_json(market_data)}", priority=1)
+            .add("strategy", f"Strategy: {compact_json(strategy.dict())}", required=True)
+            .add("performance", performance_section, priority=2)
+            .add("task", self.ANALYSIS_TASK, required=True)
+            .build()
+        )
 
         try:
-            response = self.client.chat.completions.create(
-                model="gpt-4-1106-preview",
+            response = await self._create_completion(
+                timeout=self.analysis_timeout,
+                prompt_stats=prompt_stats,
                 messages=[
                     {"role": "system", "content": "You are a helpful assistant that responds only in valid JSON format."},
                     {"role": "user", "content": prompt}
@@ -96,6 +232,7 @@ class TradingStrategyAgent:
             )
             
             content = response.choices[0].message.content
+            self._record_usage("analysis", prompt_stats, response, content)
             result = json.loads(content)
             
             # Try to create the AnalysisResult, with error handling for validation issues
@@ -112,6 +249,8 @@ class TradingStrategyAgent:
             
         except Exception as e:
             print(f"Error with strategy analysis: {e}")
+            if raise_on_error:
+                raise
             return AnalysisResult(
                 action="keep",
                 feedback=f"Analysis encountered an error: {str(e)}. Keeping current strategy for safety.",
@@ -154,80 +293,228 @@ class TradingStrategyAgent:
         }
         return market_descriptions.get(market.lower(), "Cryptocurrencies")
 
-    async def chat(self, message: str, strategy: Strategy, market: str = "crypto", include_market_data: bool = False, include_web_search: bool = False) -> str:
-        # Gather context based on enabled modes
-        context_parts = []
-        
+    def _chat_cache_key(self, message: str, strategy: Strategy, market: str, include_market_data: bool, include_web_search: bool) -> tuple:
+        """
+        Cache key: normalized message, strategy hash, market and context flags
+        """
+        normalized = re.sub(r"\s+", " ", message.strip().lower()).rstrip("?!. ")
+        strategy_hash = hashlib.sha256(strategy.json().encode()).hexdigest()[:16]
+        return (normalized, strategy_hash, market.lower(), include_market_data, include_web_search)
+
+    def _chat_cache_ttl(self, include_market_data: bool, include_web_search: bool, missing_context: List[str] = ()) -> float:
+        """
+        Cached answers live no longer than the freshest context they were built from,
+        and only briefly when a requested context source was missing
+        """
+        if missing_context:
+            return self.CHAT_CACHE_TTL_DEGRADED
+        ttl = self.CHAT_CACHE_TTL_PLAIN
         if include_market_data:
-            symbol_map = {
-                "crypto": "BTC-USD",
-                "stock": "SPY",
-                "future": "ES=F",
-                "forex": "EURUSD=X"
-            }
-            symbol = symbol_map.get(market, "BTC-USD")
-            market_data = await self.get_live_market_data(symbol)
-            context_parts.append(f"Current Market Data: {json.dumps(market_data, indent=2)}")
+            ttl = min(ttl, self.CHAT_CACHE_TTL_MARKET_DATA)
+        if include_web_search:
+            ttl = min(ttl, self.CHAT_CACHE_TTL_WEB_SEARCH)
+        return ttl
+
+    async def _build_chat_prompt(self, message: str, strategy: Strategy, market: str, include_market_data: bool, include_web_search: bool) -> tuple:
+        """
+        Gather the enabled context and build the chat prompt within the token budget
         
+        Returns:
+            (prompt, max_tokens, prompt_stats); prompt_stats["missing_context"] lists
+            the requested sources that timed out, failed or had no data
+        """
+        market_label = market.capitalize()
+        builder = PromptBuilder(self.chat_prompt_budget)
+        
+        # Gather context based on enabled modes, all sources at once
+        fetches = {}
+        if include_market_data:
+            fetches["market_data"] = (self.get_live_market_data(self._get_symbol_for_market(market)), self.market_data_timeout)
         if include_web_search and self.desearch_available:
             # Extract symbol from strategy or use BTC as default
             symbol = "BTC"  # Could be enhanced to extract from strategy
-            web_data = await self.desearch.get_market_news(symbol, timeframe='PAST_24_HOURS')
-            if web_data and web_data.get('success'):
-                context_parts.append(f"\nRecent News & Sentiment:\n{web_data['summary']}")
-                if web_data.get('sources'):
-                    sources_str = "\n".join([f"- {s.get('title', 'Source')}" for s in web_data['sources'][:3]])
-                    context_parts.append(f"\nSources:\n{sources_str}")
+            fetches["news"] = (self.desearch.get_market_news(symbol, timeframe='PAST_24_HOURS'), self.news_timeout)
+        results = dict(zip(fetches, await asyncio.gather(*(
+            self._fetch_context(source, coro, timeout) for source, (coro, timeout) in fetches.items()
+        ))))
+        
+        market_data = results.get("market_data")
+        web_data = results.get("news")
+        if web_data and not web_data.get('success'):
+            web_data = None
+        has_context = market_data is not None or web_data is not None
+        missing_context = [source for source in fetches if {"market_data": market_data, "news": web_data}[source] is None]
+        if market_data is not None and market_data.get("source") == "unavailable":
+            missing_context.append("market_data")
+        
+        if has_context:
+            builder.add("role", f"You are an expert quantitative trading assistant specializing in {market_label} markets with access to real-time data.", required=True)
+            builder.add("market_context", f"Market Context: {market_label} ({self._get_market_description(market)})", required=True)
+        
+        if market_data is not None:
+            market_data = {k: v for k, v in market_data.items() if k not in self.LOW_VALUE_MARKET_FIELDS}
+            builder.add("market_data", f"Current Market Data: {compact_json(market_data)}", priority=2)
+        
+        if web_data is not None:
+            builder.add("news", f"Recent News & Sentiment:\n{web_data['summary']}", priority=1)
+            if web_data.get('sources'):
+                sources_str = "\n".join([f"- {s.get('title', 'Source') if isinstance(s, dict) else s}" for s in web_data['sources'][:3]])
+                builder.add("sources", f"Sources:\n{sources_str}", priority=0)
         
         # Build prompt based on context
-        if context_parts:
-            context_str = "\n\n".join(context_parts)
-            market_label = market.capitalize()
-            market_description = self._get_market_description(market)
-            prompt = f"""
-            You are an expert quantitative trading assistant specializing in {market_label} markets with access to real-time data.
-            
-            Market Context: {market_label} ({market_description})
-            
-            {context_str}
-            
-            Current Strategy Context: {strategy.json()}
-            User Message: {message}
-            
-            Provide a helpful response incorporating the available context and market-specific insights. Keep it concise unless detailed analysis is specifically requested.
-            """
+        if has_context:
+            builder.add("strategy", f"Current Strategy Context: {compact_json(strategy.dict())}", priority=3)
+            builder.add("message", f"User Message: {message}", required=True)
+            builder.add("task", "Provide a helpful response incorporating the available context and market-specific insights. Keep it concise unless detailed analysis is specifically requested.", required=True)
             max_tokens = 800
         else:
             # Normal chat mode
-            market_label = market.capitalize()
-            prompt = f"""
-            You are a helpful trading assistant specializing in {market_label} markets.
-            
-            Market Context: {market_label}
-            Current Strategy: {strategy.name} (ID: {strategy.strategy_id})
-            User Message: {message}
-            
-            Provide a helpful response about the trading strategy with {market_label}-specific insights. Keep it concise and focused.
-            """
+            builder.add("role", f"You are a helpful trading assistant specializing in {market_label} markets.", required=True)
+            builder.add("market_context", f"Market Context: {market_label}", required=True)
+            builder.add("strategy", f"Current Strategy: {strategy.name} (ID: {strategy.strategy_id})", required=True)
+            builder.add("message", f"User Message: {message}", required=True)
+            builder.add("task", f"Provide a helpful response about the trading strategy with {market_label}-specific insights. Keep it concise and focused.", required=True)
             max_tokens = 400
+        
+        prompt, prompt_stats = builder.build()
+        prompt_stats["missing_context"] = missing_context
+        return prompt, max_tokens, prompt_stats
 
+    async def _fetch_context(self, source: str, coro, timeout: float):
+        """
+        Await one chat context source, giving up after timeout so a slow source
+        cannot hold back the others
+        
+        Returns:
+            The source's result, or None on timeout or error
+        """
+        stats = self.context_stats.setdefault(source, {"calls": 0, "timeouts": 0, "errors": 0, "total_ms": 0.0})
+        stats["calls"] += 1
+        started = time.monotonic()
         try:
-            response = self.client.chat.completions.create(
-                model="gpt-4-1106-preview",
-                messages=[
-                    {"role": "system", "content": "You are a helpful and concise trading assistant. Keep responses brief unless detailed analysis is requested."},
-                    {"role": "user", "content": prompt}
-                ],
+            return await asyncio.wait_for(coro, timeout)
+        except asyncio.TimeoutError:
+            stats["timeouts"] += 1
+            print(f"⏱️ Chat context source '{source}' timed out after {timeout}s")
+        except Exception as e:
+            stats["errors"] += 1
+            print(f"Error fetching chat context from '{source}': {e}")
+        finally:
+            stats["total_ms"] += (time.monotonic() - started) * 1000
+        return None
+
+    def get_context_stats(self) -> dict:
+        """Get per-source chat context fetch statistics"""
+        report = {
+            source: {**stats, "total_ms": round(stats["total_ms"], 1), "avg_ms": round(stats["total_ms"] / stats["calls"], 1)}
+            for source, stats in self.context_stats.items()
+        }
+        if self.desearch_available:
+            report["news_cache"] = self.desearch.get_cache_stats()
+        return report
+
+    def _chat_messages(self, prompt: str) -> list:
+        return [
+            {"role": "system", "content": "You are a helpful and concise trading assistant. Keep responses brief unless detailed analysis is requested."},
+            {"role": "user", "content": prompt}
+        ]
+
+    async def chat(
+        self,
+        message: str,
+        strategy: Strategy,
+        market: str = "crypto",
+        include_market_data: bool = False,
+        include_web_search: bool = False,
+        use_cache: bool = True,
+        raise_on_error: bool = False
+    ) -> str:
+        """
+        Answer a chat message, from the chat cache when the same question was answered recently
+        
+        Args:
+            use_cache: Read the cache; False always asks the LLM (the answer is still cached)
+            raise_on_error: Raise LLM failures instead of answering with a stale reply or error text
+        """
+        cache_key = self._chat_cache_key(message, strategy, market, include_market_data, include_web_search)
+        cached = self.chat_cache.get(cache_key) if use_cache else None
+        if cached is not None:
+            return cached
+        
+        prompt, max_tokens, prompt_stats = await self._build_chat_prompt(message, strategy, market, include_market_data, include_web_search)
+
+        try:
+            response = await self._create_completion(
+                timeout=self.chat_timeout,
+                prompt_stats=prompt_stats,
+                messages=self._chat_messages(prompt),
                 max_tokens=max_tokens,
                 temperature=0.7
             )
             
-            return response.choices[0].message.content
+            content = response.choices[0].message.content
+            self._record_usage("chat", prompt_stats, response, content)
+            self.chat_cache.set(cache_key, content, ttl=self._chat_cache_ttl(include_market_data, include_web_search, prompt_stats["missing_context"]))
+            return content
             
         except Exception as e:
             print(f"Error with chat: {e}")
+            if raise_on_error:
+                raise
+            # Provider unhealthy: an expired answer beats an error
+            stale = self.chat_cache.get(cache_key, allow_stale=True)
+            if stale is not None:
+                return stale
+            if isinstance(e, LLMUnavailableError):
+                return "The AI assistant is temporarily unavailable. Please try again in a moment."
             return f"I encountered an error while processing your request: {str(e)}. Please try again."
     
+    async def chat_stream(self, message: str, strategy: Strategy, market: str = "crypto", include_market_data: bool = False, include_web_search: bool = False) -> AsyncIterator[str]:
+        """
+        Stream a chat response token by token
+        
+        Cached answers are yielded in one piece. Closing the generator (e.g. when the
+        client disconnects) closes the upstream stream and stops generation.
+        """
+        cache_key = self._chat_cache_key(message, strategy, market, include_market_data, include_web_search)
+        cached = self.chat_cache.get(cache_key)
+        if cached is not None:
+            yield cached
+            return
+        
+        prompt, max_tokens, prompt_stats = await self._build_chat_prompt(message, strategy, market, include_market_data, include_web_search)
+        
+        chunks = []
+        try:
+            async with self.gateway.stream(
+                self.chat_timeout,
+                prompt_stats["prompt_tokens"] + max_tokens,
+                messages=self._chat_messages(prompt),
+                max_tokens=max_tokens,
+                temperature=0.7
+            ) as stream:
+                async for chunk in stream:
+                    if not chunk.choices:
+                        continue
+                    token = chunk.choices[0].delta.content
+                    if token:
+                        chunks.append(token)
+                        yield token
+        except Exception as e:
+            if chunks:
+                raise
+            # Nothing sent yet: fall back to an expired answer if there is one
+            stale = self.chat_cache.get(cache_key, allow_stale=True)
+            if stale is None:
+                raise
+            print(f"Error with chat stream, serving cached answer: {e}")
+            yield stale
+            return
+        
+        content = "".join(chunks)
+        self._record_usage("chat_stream", prompt_stats, completion_text=content)
+        self.chat_cache.set(cache_key, content, ttl=self._chat_cache_ttl(include_market_data, include_web_search, prompt_stats["missing_context"]))
+    
     async def get_market_summary(self) -> str:
         """
         Get a quick market summary using live data
@@ -0,0 +1,169 @@
+"""
+Pipeline Benchmark
+Measures PerformanceAnalyzer throughput and the latency our own code adds on top of LLM calls
+
+Record a cassette once against the live provider (or openai_stub.py):
+    python benchmark_pipeline.py --mode record --records 20
+Then benchmark offline from the recording:
+    python benchmark_pipeline.py --records 500 --concurrency 16 --latency none
+    python benchmark_pipeline.py --records 200 --concurrency 8 --latency lognormal:1.5,0.4
+"""
+
+import os
+import io
+import sys
+import time
+import random
+import asyncio
+import argparse
+import tempfile
+from contextlib import redirect_stdout
+from pathlib import Path
+from typing import Any, Dict, List
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark the performance analysis pipeline")
+    parser.add_argument("--mode", choices=["replay", "record"], default="replay", help="Replay from the cassette or record a new one")
+    parser.add_argument("--cassette", default="./recordings/cassette.jsonl", help="Cassette file")
+    parser.add_argument("--latency", default="recorded", help="Replay latency: recorded | none | fixed:<s> | uniform:<min>,<max> | lognormal:<median>,<sigma>")
+    parser.add_argument("--records", type=int, default=100, help="Performance records to analyze")
+    parser.add_argument("--concurrency", type=int, default=8, help="Records analyzed at once")
+    parser.add_argument("--strategies", type=int, default=4, help="Distinct strategies the records are spread over")
+    parser.add_argument("--prescreen", action="store_true", help="Keep the rule-based pre-screen on (default: every record goes to the LLM)")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for generated records and synthetic latency")
+    parser.add_argument("--quiet", action="store_true", help="Suppress pipeline logging while running")
+    return parser.parse_args()
+
+def make_record(i: int, strategies: int, rng: random.Random) -> Dict[str, Any]:
+    """A synthetic performance record shaped like YFinanceDataGenerator output"""
+    pnl = rng.gauss(0, 150)
+    price = 96000 * (1 + rng.gauss(0, 0.01))
+    return {
+        "strategy": {
+            "strategy_id": f"bench_strategy_{i % strategies}",
+            "name": "Benchmark Momentum Strategy",
+            "risk_profile": {"max_position_pct": 0.2, "stop_loss_pct": 0.03, "take_profit_pct": 0.06},
+            "logic": [{
+                "indicator": "SMA_crossover",
+                "params": {"fast_period": 5, "slow_period": 20},
+                "buy": {"condition": "fast_above_slow"},
+                "sell": {"condition": "fast_below_slow"}
+            }]
+        },
+        "performance": {
+            "timestamp": f"2026-01-01T00:{i // 60 % 60:02d}:{i % 60:02d}",
+            "market": "BTC-USD",
+            "signal": rng.choice(["HOLD", "HOLD", "HOLD", "BUY", "SELL"]),
+            "price": round(price, 2),
+            "qty": 0.05,
+            "position_after": 1,
+            "pnl_realized": round(pnl, 2),
+            "pnl_unrealized": round(pnl / 2, 2)
+        },
+        "portfolio_metrics": {
+            "win_rate": round(rng.uniform(0.3, 0.7), 3),
+            "portfolio_value": round(10000 + pnl * 1.5, 2)
+        }
+    }
+
+def percentile(values: List[float], pct: float) -> float:
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+async def run(args) -> Dict[str, Any]:
+    # Imported after the environment is configured: the recorder reads it at import time
+    from agent_service import TradingStrategyAgent
+    from performance_analyzer import PerformanceAnalyzer
+    from llm_recorder import llm_recorder, upstream_latency
+
+    agent = TradingStrategyAgent()
+    rng = random.Random(args.seed)
+    records = [make_record(i, args.strategies, rng) for i in range(args.records)]
+    latencies, overheads = [], []
+    failures = 0
+
+    with tempfile.TemporaryDirectory() as watch_directory:
+        analyzer = PerformanceAnalyzer(agent, watch_directory=watch_directory)
+        semaphore = asyncio.Semaphore(args.concurrency)
+
+        async def analyze(record):
+            nonlocal failures
+            async with semaphore:
+                spent: List[float] = []
+                upstream_latency.set(spent)
+                started = time.monotonic()
+                # None also covers fallback keeps answered while the LLM was unavailable
+                result = await analyzer.process_performance_record(record, batch=False)
+                elapsed = time.monotonic() - started
+                if result is None:
+                    # A failed record is fast, not analyzed; keep it out of the figures
+                    failures += 1
+                    return
+                latencies.append(elapsed)
+                overheads.append(elapsed - sum(spent))
+
+        started = time.monotonic()
+        await asyncio.gather(*(analyze(record) for record in records))
+        wall_seconds = time.monotonic() - started
+        prescreen_stats = analyzer.prescreen.get_stats()
+
+    await agent.aclose()
+    return {
+        "records": len(records),
+        "failures": failures,
+        "wall_seconds": wall_seconds,
+        "analyses_per_second": (len(records) - failures) / wall_seconds if wall_seconds > 0 else 0.0,
+        "latencies": latencies,
+        "overheads": overheads,
+        "short_circuit_rate": prescreen_stats["short_circuit_rate"],
+        "gateway": agent.gateway.get_stats(),
+        "recorder": llm_recorder.get_stats()
+    }
+
+def print_report(args, report: Dict[str, Any]):
+    ms = lambda seconds: f"{seconds * 1000:8.1f} ms"
+    print(f"\n📈 Pipeline benchmark ({args.mode}, latency={args.latency}, concurrency={args.concurrency})")
+    print(f"   Records:            {report['records']} ({report['failures']} failed)")
+    print(f"   Wall time:          {report['wall_seconds']:.2f} s")
+    print(f"   Throughput:         {report['analyses_per_second']:.1f} analyses/sec (successful only)")
+    print(f"   Pre-screened:       {report['short_circuit_rate']:.1%}")
+    print(f"   LLM calls:          {report['gateway']['attempts']} ({report['gateway']['retries']} retries, "
+          f"{report['gateway']['failed']} failed, {report['gateway']['rejected_circuit_open']} rejected by the open circuit)")
+    print(f"   Exact/fallback:     {report['recorder'].get('exact_matches', '-')}/{report['recorder'].get('fallback_matches', '-')} cassette matches")
+    print("                       p50         p95         p99         max")
+    for label, values in (("End-to-end", report["latencies"]), ("Our overhead", report["overheads"])):
+        print(f"   {label:<14} {ms(percentile(values, 50))} {ms(percentile(values, 95))} {ms(percentile(values, 99))} {ms(max(values, default=0.0))}")
+    if report["failures"]:
+        print(f"⚠️ {report['failures']} of {report['records']} records got no LLM analysis; "
+              "they are left out of throughput and latency, so the figures do not describe a healthy run")
+
+def main():
+    args = parse_args()
+    sys.path.insert(0, str(Path(__file__).parent))
+
+    from dotenv import load_dotenv
+    load_dotenv(dotenv_path=Path(__file__).parent / ".env")
+
+    os.environ["LLM_RECORD_MODE"] = args.mode
+    os.environ["LLM_CASSETTE"] = args.cassette
+    os.environ["REPLAY_LATENCY"] = args.latency
+    os.environ["REPLAY_SEED"] = str(args.seed)
+    if not args.prescreen:
+        os.environ["PRESCREEN_ENABLED"] = "false"
+    if args.mode == "replay":
+        # Nothing reaches the provider, but the client still needs a key
+        os.environ.setdefault("OPENAI_API_KEY", "replay")
+        if not Path(args.cassette).exists():
+            sys.exit(f"Cassette {args.cassette} not found; record one first with --mode record")
+
+    if args.quiet:
+        with redirect_stdout(io.StringIO()):
+            report = asyncio.run(run(args))
+    else:
+        report = asyncio.run(run(args))
+    print_report(args, report)
+
+if __name__ == "__main__":
+    main()
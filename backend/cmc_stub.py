@@ -0,0 +1,177 @@
+"""
+Local CoinMarketCap Stub Server
+Serves CoinMarketCap-shaped quotes with the plan's credit limits enforced, so credit budgeting can be exercised offline
+
+Run with:
+    uvicorn cmc_stub:app --port 8002
+and start the backend with COINMARKETCAP_BASE_URL=http://localhost:8002/v1
+
+Limits (STUB_CMC_CREDITS_PER_MINUTE, STUB_CMC_CREDITS_PER_DAY) answer with a 429 like
+the real API once exceeded. GET /stub/credits shows what the backend has spent.
+"""
+
+import os
+import math
+import time
+import random
+import asyncio
+from collections import deque
+from datetime import datetime, timezone
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+app = FastAPI()
+
+# Simulated response time per request, in seconds
+STUB_LATENCY_SECONDS = float(os.getenv("STUB_CMC_LATENCY_SECONDS", "0.05"))
+CREDITS_PER_MINUTE = int(os.getenv("STUB_CMC_CREDITS_PER_MINUTE", "30"))
+CREDITS_PER_DAY = int(os.getenv("STUB_CMC_CREDITS_PER_DAY", "333"))
+
+# id, name, symbol, rank, starting price
+ASSETS = [
+    (1, "Bitcoin", "BTC", 1, 96000.0),
+    (1027, "Ethereum", "ETH", 2, 3400.0),
+    (825, "Tether USDt", "USDT", 3, 1.0),
+    (1839, "BNB", "BNB", 4, 690.0),
+    (5426, "Solana", "SOL", 5, 190.0),
+    (52, "XRP", "XRP", 6, 2.3),
+    (3408, "USDC", "USDC", 7, 1.0),
+    (74, "Dogecoin", "DOGE", 8, 0.32),
+    (2010, "Cardano", "ADA", 9, 0.95),
+    (1958, "TRON", "TRX", 10, 0.25),
+    (5805, "Avalanche", "AVAX", 11, 38.0),
+    (1975, "Chainlink", "LINK", 12, 22.0),
+    (6636, "Polkadot", "DOT", 13, 7.0),
+    (3890, "Polygon", "MATIC", 14, 0.5),
+    (2, "Litecoin", "LTC", 15, 105.0),
+]
+ASSETS_BY_SYMBOL = {symbol: (asset_id, name, symbol, rank, price) for asset_id, name, symbol, rank, price in ASSETS}
+prices = {symbol: price for _, _, symbol, _, price in ASSETS}
+rng = random.Random(int(os.getenv("STUB_CMC_SEED", "0")))
+
+# (time, credits) spent in the last minute, and today's total
+minute_window: deque = deque()
+credit_stats = {"day": None, "used_today": 0, "requests": 0, "credits_by_endpoint": {}, "rate_limited": 0}
+
+def _status(error_code: int = 0, error_message=None, credit_count: int = 0) -> dict:
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "error_code": error_code,
+        "error_message": error_message,
+        "elapsed": int(STUB_LATENCY_SECONDS * 1000),
+        "credit_count": credit_count
+    }
+
+def _spend(endpoint: str, credits: int):
+    """Charge credits like the real API, or return its 429 response once a limit is hit"""
+    credit_stats["requests"] += 1
+    now = time.monotonic()
+    while minute_window and minute_window[0][0] <= now - 60:
+        minute_window.popleft()
+    today = datetime.now(timezone.utc).strftime("%Y-%m-%d")
+    if credit_stats["day"] != today:
+        credit_stats["day"] = today
+        credit_stats["used_today"] = 0
+
+    if sum(c for _, c in minute_window) + credits > CREDITS_PER_MINUTE:
+        credit_stats["rate_limited"] += 1
+        return JSONResponse(status_code=429, content={"status": _status(1008, "You've exceeded your API Key's HTTP request rate limit. Rate limits reset every minute.")})
+    if credit_stats["used_today"] + credits > CREDITS_PER_DAY:
+        credit_stats["rate_limited"] += 1
+        return JSONResponse(status_code=429, content={"status": _status(1009, "You've exceeded your API Key's daily credit limit.")})
+
+    minute_window.append((now, credits))
+    credit_stats["used_today"] += credits
+    credit_stats["credits_by_endpoint"][endpoint] = credit_stats["credits_by_endpoint"].get(endpoint, 0) + credits
+    return None
+
+def _quote(symbol: str, convert: str) -> dict:
+    """A random-walk quote, so repeated fetches are distinguishable"""
+    asset_id, name, _, rank, _ = ASSETS_BY_SYMBOL[symbol]
+    prices[symbol] *= 1 + rng.gauss(0, 0.002)
+    price = prices[symbol]
+    return {
+        "id": asset_id,
+        "name": name,
+        "symbol": symbol,
+        "cmc_rank": rank,
+        "last_updated": datetime.now(timezone.utc).isoformat(),
+        "quote": {
+            convert: {
+                "price": price,
+                "volume_24h": price * 1e6 / rank,
+                "percent_change_1h": rng.uniform(-1, 1),
+                "percent_change_24h": rng.uniform(-5, 5),
+                "percent_change_7d": rng.uniform(-10, 10),
+                "market_cap": price * 1e7 / rank,
+                "last_updated": datetime.now(timezone.utc).isoformat()
+            }
+        }
+    }
+
+@app.get("/v1/cryptocurrency/quotes/latest")
+async def quotes_latest(request: Request):
+    params = request.query_params
+    symbols = [s.strip().upper() for s in params.get("symbol", "").split(",") if s.strip()]
+    convert = params.get("convert", "USD").upper()
+    skip_invalid = params.get("skip_invalid", "false").lower() == "true"
+    await asyncio.sleep(STUB_LATENCY_SECONDS)
+
+    unknown = [s for s in symbols if s not in ASSETS_BY_SYMBOL]
+    if not symbols or (unknown and not skip_invalid):
+        return JSONResponse(status_code=400, content={"status": _status(400, f'Invalid value for "symbol": "{",".join(unknown)}"')})
+
+    credits = math.ceil(len(symbols) / 100)
+    throttled = _spend("cryptocurrency/quotes/latest", credits)
+    if throttled is not None:
+        return throttled
+    data = {s: _quote(s, convert) for s in symbols if s in ASSETS_BY_SYMBOL}
+    return {"status": _status(credit_count=credits), "data": data}
+
+@app.get("/v1/global-metrics/quotes/latest")
+async def global_metrics():
+    await asyncio.sleep(STUB_LATENCY_SECONDS)
+    throttled = _spend("global-metrics/quotes/latest", 1)
+    if throttled is not None:
+        return throttled
+    total_market_cap = sum(prices[s] * 1e7 / rank for _, _, s, rank, _ in ASSETS)
+    return {
+        "status": _status(credit_count=1),
+        "data": {
+            "btc_dominance": prices["BTC"] * 1e7 / total_market_cap * 100,
+            "eth_dominance": prices["ETH"] * 1e7 / 2 / total_market_cap * 100,
+            "active_cryptocurrencies": len(ASSETS),
+            "last_updated": datetime.now(timezone.utc).isoformat(),
+            "quote": {
+                "USD": {
+                    "total_market_cap": total_market_cap,
+                    "total_volume_24h": total_market_cap / 10,
+                    "last_updated": datetime.now(timezone.utc).isoformat()
+                }
+            }
+        }
+    }
+
+@app.get("/v1/cryptocurrency/map")
+async def cryptocurrency_map(request: Request):
+    symbols = {s.strip().upper() for s in request.query_params.get("symbol", "").split(",") if s.strip()}
+    await asyncio.sleep(STUB_LATENCY_SECONDS)
+    throttled = _spend("cryptocurrency/map", 1)
+    if throttled is not None:
+        return throttled
+    data = [
+        {"id": asset_id, "name": name, "symbol": symbol, "slug": name.lower().replace(" ", "-"), "rank": rank, "is_active": 1}
+        for asset_id, name, symbol, rank, _ in ASSETS
+        if not symbols or symbol in symbols
+    ]
+    return {"status": _status(credit_count=1), "data": data}
+
+@app.get("/stub/credits")
+async def get_credits():
+    """Credits spent against the stub's limits"""
+    return {
+        **credit_stats,
+        "used_this_minute": sum(c for t, c in minute_window if t > time.monotonic() - 60),
+        "per_minute_limit": CREDITS_PER_MINUTE,
+        "per_day_limit": CREDITS_PER_DAY
+    }
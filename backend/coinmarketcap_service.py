@@ -4,10 +4,17 @@ Provides real-time cryptocurrency prices, market cap, volume, and historical dat
 """
 
 import os
+import math
+import time
 import asyncio
 from typing import Optional, Dict, List
 import aiohttp
 from datetime import datetime, timedelta
+from market_snapshot import market_snapshot
+from response_cache import TTLCache
+from micro_batcher import MicroBatcher
+from credit_budget import CreditBudget, request_priority
+from symbol_index import SymbolIndex
 
 class CoinMarketCapService:
     """
@@ -23,13 +30,279 @@ class CoinMarketCapService:
             raise ValueError("COINMARKETCAP_API_KEY environment variable not set")
         
         self.api_key = api_key
-        self.base_url = self.SANDBOX_URL if use_sandbox else self.BASE_URL
+        # COINMARKETCAP_BASE_URL points the service at another server, e.g. cmc_stub.py
+        self.base_url = os.getenv("COINMARKETCAP_BASE_URL") or (self.SANDBOX_URL if use_sandbox else self.BASE_URL)
         self.headers = {
             'X-CMC_PRO_API_KEY': self.api_key,
             'Accept': 'application/json'
         }
         self.available = True
-        print(f"CoinMarketCap service initialized ({'sandbox' if use_sandbox else 'production'} mode)")
+        
+        # One pooled session for every request; opened and closed with the app lifespan
+        self.session: Optional[aiohttp.ClientSession] = None
+        self.max_connections = int(os.getenv("CMC_MAX_CONNECTIONS", "20"))
+        self.timeout = aiohttp.ClientTimeout(
+            total=float(os.getenv("CMC_REQUEST_TIMEOUT", "10")),
+            connect=float(os.getenv("CMC_CONNECT_TIMEOUT", "5"))
+        )
+        # Quotes per (symbol, convert), kept about as long as CMC takes to refresh them
+        self.quote_cache = TTLCache(max_entries=2048, default_ttl=float(os.getenv("CMC_QUOTE_TTL_SECONDS", "60")))
+        # Symbols CMC does not know, so repeated lookups do not cost credits
+        self.unknown_symbols = TTLCache(max_entries=1024, default_ttl=float(os.getenv("CMC_NEGATIVE_TTL_SECONDS", "600")))
+        # Concurrent lookups of missing symbols share one quotes/latest call
+        self.quote_batcher = MicroBatcher(
+            self._fetch_quote_batch,
+            window_seconds=float(os.getenv("CMC_BATCH_WINDOW_MS", "10")) / 1000,
+            max_batch_size=100
+        )
+        # Plan limits (defaults: Basic plan, 10k credits/month); background refreshes get a smaller share
+        self.credit_budget = CreditBudget.from_env("CMC", per_minute=30, per_day=333)
+        # How stale a cached quote may be when served instead of spending credits
+        self.max_stale_seconds = float(os.getenv("CMC_MAX_STALE_SECONDS", "900"))
+        # Background lookups (price feed pollers, portfolio loops) reuse quotes up to this age, so
+        # their refreshes fit the background share of the daily budget. Sized for
+        # CMC_BACKGROUND_REFRESH_CREDITS credits per refresh round (one per concurrent poll loop
+        # for up to 100 symbols); with the Basic plan defaults about every 14 minutes, and at the
+        # quote TTL on plans with enough credits.
+        background_credits = float(os.getenv("CMC_BACKGROUND_REFRESH_CREDITS", "2"))
+        self.background_quote_max_age = max(
+            self.quote_cache.default_ttl,
+            self.credit_budget.background_refresh_seconds(background_credits)
+        )
+        # Global metrics change every few minutes; cached so they can be served when out of credits
+        self.global_metrics_cache = TTLCache(max_entries=1, default_ttl=float(os.getenv("CMC_GLOBAL_METRICS_TTL_SECONDS", "300")))
+        # Searches are answered from the full symbol map, kept locally and refreshed occasionally
+        self.symbol_index = SymbolIndex()
+        self.symbol_map_path = os.getenv("CMC_SYMBOL_MAP_PATH", "./market_data/cmc_symbol_map.json")
+        self.symbol_map_refresh_seconds = float(os.getenv("CMC_SYMBOL_MAP_REFRESH_HOURS", "24")) * 3600
+        self._symbol_refresh_lock = asyncio.Lock()
+        self._symbol_refresh_task: Optional[asyncio.Task] = None
+        self.cache_stats = {
+            "lookups": 0,
+            "negative_hits": 0,
+            "upstream_calls": 0,
+            "credits_used": 0,
+            "credits_saved": 0,
+            "throttled_calls": 0,
+            "stale_served": 0
+        }
+        print(f"CoinMarketCap service initialized ({self.base_url})")
+    
+    async def start(self):
+        """Open the shared HTTP session"""
+        if self.session is None or self.session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.max_connections,
+                ttl_dns_cache=300,
+                keepalive_timeout=60,
+                enable_cleanup_closed=True
+            )
+            self.session = aiohttp.ClientSession(connector=connector, timeout=self.timeout, headers=self.headers)
+        
+        if not self.symbol_index.loaded and self.symbol_index.load(self.symbol_map_path):
+            print(f"🔎 Loaded {len(self.symbol_index)} symbols from {self.symbol_map_path}")
+        self._schedule_symbol_refresh()
+    
+    async def close(self):
+        """Close the shared HTTP session and its pooled connections"""
+        if self._symbol_refresh_task is not None and not self._symbol_refresh_task.done():
+            self._symbol_refresh_task.cancel()
+        if self.session is not None and not self.session.closed:
+            await self.session.close()
+        self.session = None
+    
+    async def _get_json(self, path: str, params: Optional[Dict] = None) -> Optional[Dict]:
+        """
+        GET an API path on the shared session
+        
+        Returns:
+            Parsed JSON body, or None on a non-200 response
+        """
+        if self.session is None or self.session.closed:
+            # Used outside the app lifespan (e.g. scripts)
+            await self.start()
+        async with self.session.get(f"{self.base_url}{path}", params=params) as response:
+            if response.status == 200:
+                return await response.json()
+            if response.status == 429:
+                self.credit_budget.record_upstream_rate_limit()
+            error_text = await response.text()
+            print(f"CoinMarketCap API error ({response.status}): {error_text}")
+            return None
+    
+    def _publish_quote(self, symbol: str, quote: Dict, convert: str):
+        """Share a USD quote with the process-wide market snapshot"""
+        if convert.upper() != 'USD':
+            return
+        market_snapshot.update(symbol, {
+            "price": quote['price'],
+            "change_24h": quote['percent_change_24h'],
+            "volume_24h": quote['volume_24h'],
+            "market_cap": quote['market_cap'],
+            "quote_last_updated": quote['last_updated']
+        }, source="coinmarketcap")
+    
+    @staticmethod
+    def _credits_for(symbol_count: int) -> int:
+        """quotes/latest costs 1 credit per 100 symbols (per convert currency)"""
+        return math.ceil(symbol_count / 100)
+    
+    def _stale_quote(self, symbol: str, convert: str) -> Optional[Dict]:
+        """An expired cached quote, if it is no older than max_stale_seconds"""
+        age = self.quote_cache.age((symbol, convert))
+        if age is None or age > self.max_stale_seconds:
+            return None
+        return self.quote_cache.get((symbol, convert), allow_stale=True)
+    
+    def _serve_stale(self, symbols: List[str], convert: str) -> Dict[str, Dict]:
+        quotes = {}
+        for sym in symbols:
+            crypto_data = self._stale_quote(sym, convert)
+            if crypto_data is not None:
+                quotes[sym] = crypto_data
+        self.cache_stats["stale_served"] += len(quotes)
+        return quotes
+    
+    async def _fetch_quotes(self, symbols: List[str], convert: str, priority: Optional[str] = None) -> Optional[Dict[str, Dict]]:
+        """
+        Fetch quotes for symbols in one upstream call and cache them
+        
+        If the credit budget refuses the call, recently expired cached quotes are
+        served instead.
+        
+        Returns:
+            Symbol -> CMC cryptocurrency entry for the symbols CMC knows, or None on failure
+        """
+        if not self.credit_budget.try_spend("cryptocurrency/quotes/latest", self._credits_for(len(symbols)), priority):
+            self.cache_stats["throttled_calls"] += 1
+            stale = self._serve_stale(symbols, convert)
+            print(f"⏳ CoinMarketCap credit budget reached ({priority or request_priority.get()}); served {len(stale)}/{len(symbols)} stale quotes")
+            return stale or None
+        
+        params = {
+            'symbol': ','.join(symbols),
+            'convert': convert,
+            # Unknown symbols are left out of the response instead of failing the whole call
+            'skip_invalid': 'true'
+        }
+        data = await self._get_json("/cryptocurrency/quotes/latest", params)
+        self.cache_stats["upstream_calls"] += 1
+        self.cache_stats["credits_used"] += self._credits_for(len(symbols))
+        if data is None or 'data' not in data:
+            return None
+        
+        quotes = {}
+        for sym in symbols:
+            crypto_data = data['data'].get(sym)
+            if crypto_data is None:
+                self.unknown_symbols.set(sym, True)
+                continue
+            # Some plans return a list of matches per symbol; the first is the highest ranked
+            if isinstance(crypto_data, list):
+                crypto_data = crypto_data[0]
+            quotes[sym] = crypto_data
+            self.quote_cache.set((sym, convert), crypto_data)
+            self._publish_quote(sym, crypto_data['quote'][convert], convert)
+        return quotes
+    
+    async def _fetch_quote_batch(self, key: tuple, symbols: List[str]) -> List[Optional[Dict]]:
+        """MicroBatcher flush: one upstream call for every symbol requested in the window"""
+        convert, priority = key
+        fetched = await self._fetch_quotes(list(dict.fromkeys(symbols)), convert, priority)
+        if fetched is None:
+            raise RuntimeError("CoinMarketCap quote request failed")
+        return [fetched.get(sym) for sym in symbols]
+    
+    async def _get_quotes(self, symbols: List[str], convert: str = 'USD') -> Optional[Dict[str, Dict]]:
+        """
+        Get quotes from the cache, fetching only symbols missing from it
+        
+        Symbols recently found unknown to CMC are skipped. Background lookups reuse
+        quotes up to background_quote_max_age old. Near the credit limit,
+        recently expired quotes are served instead of being refetched. When the
+        fetch for some missing symbols fails (upstream error or credit budget), the
+        quotes that were found are returned, with recently expired ones standing in
+        for the failed symbols where available. Returns None only if nothing could
+        be served at all.
+        """
+        convert = convert.upper()
+        priority = request_priority.get()
+        prefer_stale = self.credit_budget.near_limit(priority)
+        background = priority == "background"
+        requested = list(dict.fromkeys(s.upper() for s in symbols))
+        quotes, missing = {}, []
+        for sym in requested:
+            self.cache_stats["lookups"] += 1
+            if self.unknown_symbols.get(sym) is not None:
+                self.cache_stats["negative_hits"] += 1
+                continue
+            cached = self.quote_cache.get((sym, convert))
+            if cached is None and background:
+                age = self.quote_cache.age((sym, convert))
+                if age is not None and age <= self.background_quote_max_age:
+                    cached = self.quote_cache.get((sym, convert), allow_stale=True)
+            if cached is None and prefer_stale:
+                cached = self._stale_quote(sym, convert)
+                if cached is not None:
+                    self.cache_stats["stale_served"] += 1
+            if cached is not None:
+                quotes[sym] = cached
+            else:
+                missing.append(sym)
+        
+        if missing and background:
+            # One call costs the same for up to 100 symbols: refresh the whole set together,
+            # so its quotes expire together instead of each triggering its own call
+            refresh = [sym for sym in quotes if sym not in missing]
+            if len(missing) + len(refresh) <= 100:
+                missing += refresh
+        if missing:
+            # Batches are per priority so each is charged against its own share of the budget
+            fetched = await asyncio.gather(
+                *(self.quote_batcher.submit((convert, priority), sym) for sym in missing),
+                return_exceptions=True
+            )
+            failed = []
+            for sym, crypto_data in zip(missing, fetched):
+                if isinstance(crypto_data, Exception):
+                    failed.append(sym)
+                elif crypto_data is not None:
+                    quotes[sym] = crypto_data
+            if failed:
+                stale = self._serve_stale(failed, convert)
+                quotes.update(stale)
+                print(f"⚠️ CoinMarketCap fetch failed for {len(failed)} symbols; served {len(stale)} stale quotes")
+                if not quotes:
+                    return None
+        self.cache_stats["credits_saved"] += self._credits_for(len(requested)) - self._credits_for(len(missing))
+        return quotes
+    
+    def get_cache_stats(self) -> Dict:
+        """Get quote cache hit ratio and credit savings"""
+        stats = self.quote_cache.get_stats()
+        lookups = self.cache_stats["lookups"]
+        served = stats["hits"] + self.cache_stats["negative_hits"]
+        return {
+            **self.cache_stats,
+            "quote_ttl_seconds": self.quote_cache.default_ttl,
+            "cached_quotes": stats["entries"],
+            "quote_hits": stats["hits"],
+            "quote_misses": stats["misses"],
+            "unknown_symbols": self.unknown_symbols.get_stats()["entries"],
+            "hit_ratio": round(served / lookups, 3) if lookups else 0.0,
+            "batching": self.quote_batcher.get_stats(),
+            "symbol_index": self.symbol_index.get_stats()
+        }
+    
+    def get_credit_stats(self) -> Dict:
+        """Get credit usage against the plan limits and throttle events"""
+        return {
+            **self.credit_budget.get_stats(),
+            "background_quote_max_age_seconds": round(self.background_quote_max_age, 1),
+            "throttled_calls": self.cache_stats["throttled_calls"],
+            "stale_served": self.cache_stats["stale_served"],
+            "max_stale_seconds": self.max_stale_seconds
+        }
     
     async def get_latest_price(self, symbol: str, convert: str = 'USD') -> Optional[Dict]:
         """
@@ -43,37 +316,25 @@ class CoinMarketCapService:
             Dictionary with price data
         """
         try:
-            url = f"{self.base_url}/cryptocurrency/quotes/latest"
-            params = {
-                'symbol': symbol.upper(),
-                'convert': convert.upper()
-            }
+            quotes = await self._get_quotes([symbol], convert)
+            
+            if quotes and symbol.upper() in quotes:
+                crypto_data = quotes[symbol.upper()]
+                quote = crypto_data['quote'][convert.upper()]
+                
+                return {
+                    "symbol": symbol.upper(),
+                    "name": crypto_data['name'],
+                    "price": quote['price'],
+                    "volume_24h": quote['volume_24h'],
+                    "market_cap": quote['market_cap'],
+                    "percent_change_1h": quote['percent_change_1h'],
+                    "percent_change_24h": quote['percent_change_24h'],
+                    "percent_change_7d": quote['percent_change_7d'],
+                    "last_updated": quote['last_updated'],
+                    "success": True
+                }
             
-            async with aiohttp.ClientSession() as session:
-                async with session.get(url, headers=self.headers, params=params) as response:
-                    if response.status == 200:
-                        data = await response.json()
-                        
-                        if 'data' in data and symbol.upper() in data['data']:
-                            crypto_data = data['data'][symbol.upper()]
-                            quote = crypto_data['quote'][convert.upper()]
-                            
-                            return {
-                                "symbol": symbol.upper(),
-                                "name": crypto_data['name'],
-                                "price": quote['price'],
-                                "volume_24h": quote['volume_24h'],
-                                "market_cap": quote['market_cap'],
-                                "percent_change_1h": quote['percent_change_1h'],
-                                "percent_change_24h": quote['percent_change_24h'],
-                                "percent_change_7d": quote['percent_change_7d'],
-                                "last_updated": quote['last_updated'],
-                                "success": True
-                            }
-                    else:
-                        error_text = await response.text()
-                        print(f"CoinMarketCap API error ({response.status}): {error_text}")
-                        
             return None
             
         except Exception as e:
@@ -92,39 +353,25 @@ class CoinMarketCapService:
             Dictionary with prices for all symbols
         """
         try:
-            url = f"{self.base_url}/cryptocurrency/quotes/latest"
-            params = {
-                'symbol': ','.join([s.upper() for s in symbols]),
-                'convert': convert.upper()
-            }
+            quotes = await self._get_quotes(symbols, convert)
+            if quotes is None:
+                return None
             
-            async with aiohttp.ClientSession() as session:
-                async with session.get(url, headers=self.headers, params=params) as response:
-                    if response.status == 200:
-                        data = await response.json()
-                        
-                        result = {}
-                        if 'data' in data:
-                            for symbol in symbols:
-                                sym = symbol.upper()
-                                if sym in data['data']:
-                                    crypto_data = data['data'][sym]
-                                    quote = crypto_data['quote'][convert.upper()]
-                                    
-                                    result[sym] = {
-                                        "name": crypto_data['name'],
-                                        "price": quote['price'],
-                                        "percent_change_24h": quote['percent_change_24h'],
-                                        "market_cap": quote['market_cap'],
-                                        "volume_24h": quote['volume_24h']
-                                    }
-                        
-                        return {
-                            "data": result,
-                            "success": True
-                        }
-                    
-            return None
+            result = {}
+            for sym, crypto_data in quotes.items():
+                quote = crypto_data['quote'][convert.upper()]
+                result[sym] = {
+                    "name": crypto_data['name'],
+                    "price": quote['price'],
+                    "percent_change_24h": quote['percent_change_24h'],
+                    "market_cap": quote['market_cap'],
+                    "volume_24h": quote['volume_24h']
+                }
+            
+            return {
+                "data": result,
+                "success": True
+            }
             
         except Exception as e:
             print(f"Error fetching multiple prices: {e}")
@@ -138,26 +385,33 @@ class CoinMarketCapService:
             Dictionary with global market data
         """
         try:
-            url = f"{self.base_url}/global-metrics/quotes/latest"
+            cached = self.global_metrics_cache.get("global")
+            if cached is not None:
+                return cached
+            if not self.credit_budget.try_spend("global-metrics/quotes/latest", 1):
+                self.cache_stats["throttled_calls"] += 1
+                stale = self.global_metrics_cache.get("global", allow_stale=True)
+                if stale is not None:
+                    self.cache_stats["stale_served"] += 1
+                return stale
             
-            async with aiohttp.ClientSession() as session:
-                async with session.get(url, headers=self.headers) as response:
-                    if response.status == 200:
-                        data = await response.json()
-                        
-                        if 'data' in data:
-                            metrics = data['data']
-                            quote = metrics['quote']['USD']
-                            
-                            return {
-                                "total_market_cap": quote['total_market_cap'],
-                                "total_volume_24h": quote['total_volume_24h'],
-                                "btc_dominance": metrics['btc_dominance'],
-                                "eth_dominance": metrics['eth_dominance'],
-                                "active_cryptocurrencies": metrics['active_cryptocurrencies'],
-                                "last_updated": metrics['last_updated'],
-                                "success": True
-                            }
+            data = await self._get_json("/global-metrics/quotes/latest")
+            
+            if data and 'data' in data:
+                metrics = data['data']
+                quote = metrics['quote']['USD']
+                
+                result = {
+                    "total_market_cap": quote['total_market_cap'],
+                    "total_volume_24h": quote['total_volume_24h'],
+                    "btc_dominance": metrics['btc_dominance'],
+                    "eth_dominance": metrics['eth_dominance'],
+                    "active_cryptocurrencies": metrics['active_cryptocurrencies'],
+                    "last_updated": metrics['last_updated'],
+                    "success": True
+                }
+                self.global_metrics_cache.set("global", result)
+                return result
             
             return None
             
@@ -165,40 +419,78 @@ class CoinMarketCapService:
             print(f"Error fetching global metrics: {e}")
             return None
     
-    async def search_cryptocurrency(self, query: str) -> Optional[List[Dict]]:
+    def _schedule_symbol_refresh(self):
+        """Refresh the symbol map in the background if it is missing or older than the refresh interval"""
+        age = self.symbol_index.age_seconds()
+        if age is not None and age < self.symbol_map_refresh_seconds:
+            return
+        if self._symbol_refresh_task is None or self._symbol_refresh_task.done():
+            self._symbol_refresh_task = asyncio.create_task(self.refresh_symbol_index(priority="background"))
+    
+    async def refresh_symbol_index(self, priority: Optional[str] = None) -> bool:
+        """
+        Download the full active symbol map, rebuild the index and save a snapshot
+        
+        Returns:
+            True if the index was rebuilt
+        """
+        async with self._symbol_refresh_lock:
+            age = self.symbol_index.age_seconds()
+            if age is not None and age < self.symbol_map_refresh_seconds:
+                # Refreshed while this caller waited for the lock
+                return True
+            
+            started = time.monotonic()
+            entries, start, page_size = [], 1, 5000
+            try:
+                while True:
+                    # cryptocurrency/map costs 1 credit per 5000 entries
+                    if not self.credit_budget.try_spend("cryptocurrency/map", 1, priority):
+                        self.cache_stats["throttled_calls"] += 1
+                        print("⏳ CoinMarketCap credit budget reached; symbol map refresh postponed")
+                        return False
+                    params = {'listing_status': 'active', 'sort': 'cmc_rank', 'start': start, 'limit': page_size}
+                    data = await self._get_json("/cryptocurrency/map", params)
+                    if data is None or 'data' not in data:
+                        return False
+                    entries.extend(data['data'])
+                    if len(data['data']) < page_size:
+                        break
+                    start += page_size
+            except Exception as e:
+                print(f"Error refreshing symbol map: {e}")
+                return False
+            
+            self.symbol_index.build(entries)
+            try:
+                self.symbol_index.save(self.symbol_map_path)
+            except OSError as e:
+                print(f"Could not save symbol map snapshot: {e}")
+            print(f"🔎 Symbol index rebuilt with {len(entries)} symbols in {time.monotonic() - started:.1f}s")
+            return True
+    
+    async def search_cryptocurrency(self, query: str, limit: int = 10) -> Optional[List[Dict]]:
         """
         Search for cryptocurrencies by name or symbol
         
+        Answered from the local symbol index (prefix and fuzzy matches, ranked by
+        CMC rank) without spending credits. The map is only downloaded here if no
+        snapshot has been loaded yet.
+        
         Args:
             query: Search query
+            limit: Maximum number of results
         
         Returns:
             List of matching cryptocurrencies
         """
         try:
-            url = f"{self.base_url}/cryptocurrency/map"
-            params = {
-                'symbol': query.upper()
-            }
-            
-            async with aiohttp.ClientSession() as session:
-                async with session.get(url, headers=self.headers, params=params) as response:
-                    if response.status == 200:
-                        data = await response.json()
-                        
-                        if 'data' in data:
-                            results = []
-                            for crypto in data['data'][:10]:  # Limit to top 10 results
-                                results.append({
-                                    "id": crypto['id'],
-                                    "name": crypto['name'],
-                                    "symbol": crypto['symbol'],
-                                    "rank": crypto.get('rank', None)
-                                })
-                            
-                            return results
+            if not self.symbol_index.loaded:
+                await self.refresh_symbol_index()
+            else:
+                self._schedule_symbol_refresh()
             
-            return []
+            return self.symbol_index.search(query, limit)
             
         except Exception as e:
             print(f"Error searching cryptocurrency: {e}")
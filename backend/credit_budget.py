@@ -0,0 +1,134 @@
+"""
+API Credit Budget
+Tracks per-minute and daily API credit use and decides which requests may spend credits
+"""
+
+import os
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Any, Dict
+
+# Priority of the work running in the current task: "interactive" (user requests) or "background"
+request_priority: ContextVar[str] = ContextVar("request_priority", default="interactive")
+
+@contextmanager
+def background_priority():
+    """Mark API calls made inside the block as background work"""
+    token = request_priority.set("background")
+    try:
+        yield
+    finally:
+        request_priority.reset(token)
+
+class CreditBudget:
+    """
+    Credit accounting against a plan's per-minute and daily limits.
+
+    Interactive requests may use the full budget. Background requests are held
+    to background_share of it, so refreshes never starve user requests. Above
+    soft_limit_share of either limit callers should prefer stale cached data.
+    The daily window resets at UTC midnight, like CoinMarketCap's.
+    """
+
+    def __init__(self, per_minute: int, per_day: int, background_share: float = 0.6, soft_limit_share: float = 0.8):
+        self.per_minute = per_minute
+        self.per_day = per_day
+        self.background_share = background_share
+        self.soft_limit_share = soft_limit_share
+
+        # (monotonic time, credits) spent in the last minute
+        self._minute_window: deque = deque()
+        self._day = self._utc_day()
+        self.used_today = 0
+
+        # Statistics
+        self.credits_by_endpoint: Dict[str, int] = {}
+        self.calls_by_priority: Dict[str, int] = {"interactive": 0, "background": 0}
+        self.throttled_by_priority: Dict[str, int] = {"interactive": 0, "background": 0}
+        self.upstream_rate_limited = 0
+
+    @classmethod
+    def from_env(cls, prefix: str, per_minute: int, per_day: int) -> "CreditBudget":
+        return cls(
+            per_minute=int(os.getenv(f"{prefix}_CREDITS_PER_MINUTE", str(per_minute))),
+            per_day=int(os.getenv(f"{prefix}_CREDITS_PER_DAY", str(per_day))),
+            background_share=float(os.getenv(f"{prefix}_BACKGROUND_SHARE", "0.6")),
+            soft_limit_share=float(os.getenv(f"{prefix}_SOFT_LIMIT_SHARE", "0.8"))
+        )
+
+    @staticmethod
+    def _utc_day() -> str:
+        return datetime.now(timezone.utc).strftime("%Y-%m-%d")
+
+    def _roll_windows(self):
+        cutoff = time.monotonic() - 60
+        while self._minute_window and self._minute_window[0][0] <= cutoff:
+            self._minute_window.popleft()
+        today = self._utc_day()
+        if today != self._day:
+            self._day = today
+            self.used_today = 0
+
+    @property
+    def used_this_minute(self) -> int:
+        self._roll_windows()
+        return sum(credits for _, credits in self._minute_window)
+
+    def _limits(self, priority: str):
+        share = 1.0 if priority == "interactive" else self.background_share
+        return self.per_minute * share, self.per_day * share
+
+    def near_limit(self, priority: str = None) -> bool:
+        """Whether usage is past the soft limit for this priority"""
+        minute_limit, day_limit = self._limits(priority or request_priority.get())
+        return (self.used_this_minute >= minute_limit * self.soft_limit_share
+                or self.used_today >= day_limit * self.soft_limit_share)
+
+    def background_refresh_seconds(self, credits_per_refresh: float = 1.0) -> float:
+        """
+        Shortest interval between background refreshes costing credits_per_refresh
+        that keeps them under the soft limit of the background share all day
+        """
+        minute_limit, day_limit = self._limits("background")
+        return max(60 * credits_per_refresh / minute_limit, 86400 * credits_per_refresh / day_limit) / self.soft_limit_share
+
+    def try_spend(self, endpoint: str, credits: int, priority: str = None) -> bool:
+        """
+        Spend credits for one call if the budget allows it
+
+        Returns:
+            False (and counts a throttle event) if the call would exceed the budget
+        """
+        priority = priority or request_priority.get()
+        minute_limit, day_limit = self._limits(priority)
+        if self.used_this_minute + credits > minute_limit or self.used_today + credits > day_limit:
+            self.throttled_by_priority[priority] = self.throttled_by_priority.get(priority, 0) + 1
+            return False
+
+        self._minute_window.append((time.monotonic(), credits))
+        self.used_today += credits
+        self.credits_by_endpoint[endpoint] = self.credits_by_endpoint.get(endpoint, 0) + credits
+        self.calls_by_priority[priority] = self.calls_by_priority.get(priority, 0) + 1
+        return True
+
+    def record_upstream_rate_limit(self):
+        """Count a rate limit response from the API itself (our accounting drifted)"""
+        self.upstream_rate_limited += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get credit usage and throttle statistics"""
+        return {
+            "per_minute_limit": self.per_minute,
+            "per_day_limit": self.per_day,
+            "background_share": self.background_share,
+            "used_this_minute": self.used_this_minute,
+            "used_today": self.used_today,
+            "credits_by_endpoint": dict(self.credits_by_endpoint),
+            "calls_by_priority": dict(self.calls_by_priority),
+            "throttled_by_priority": dict(self.throttled_by_priority),
+            "upstream_rate_limited": self.upstream_rate_limited,
+            "near_limit": self.near_limit("interactive")
+        }
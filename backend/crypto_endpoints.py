@@ -1,9 +1,10 @@
-from fastapi import APIRouter, HTTPException, Depends
-from typing import List, Dict, Optional
+from fastapi import APIRouter, HTTPException, Depends, Query, Response
+from typing import List, Dict, Optional, Literal
 from coinmarketcap_service import CoinMarketCapService
-from portfolio_service import PortfolioService
-from agent_service import TradingStrategyAgent
-from models import Strategy
+from portfolio_service import PortfolioService, HistoryUnavailableError
+from risk_analysis_service import RiskAnalysisService
+from models import PortfolioCreate, LotCreate, TransactionImport, BatchValuationRequest
+import asyncio
 import datetime
 
 
@@ -20,6 +21,9 @@ def get_portfolio_service():
 def get_trading_agent():
     raise NotImplementedError("TradingStrategyAgent dependency not injected")
 
+def get_risk_analysis_service():
+    raise NotImplementedError("RiskAnalysisService dependency not injected")
+
 
 @router.get("/crypto/price/{symbol}")
 async def get_crypto_price(
@@ -58,6 +62,26 @@ async def get_multiple_crypto_prices(
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.get("/crypto/cache/stats")
+async def get_crypto_cache_stats(
+    cmc_service: CoinMarketCapService = Depends(get_coinmarketcap_service)
+):
+    """Get CoinMarketCap quote cache hit ratio and credits saved"""
+    if not cmc_service:
+        raise HTTPException(status_code=503, detail="CoinMarketCap service unavailable")
+    
+    return cmc_service.get_cache_stats()
+
+@router.get("/crypto/credits")
+async def get_crypto_credit_stats(
+    cmc_service: CoinMarketCapService = Depends(get_coinmarketcap_service)
+):
+    """Get CoinMarketCap credit usage against the plan limits and throttle events"""
+    if not cmc_service:
+        raise HTTPException(status_code=503, detail="CoinMarketCap service unavailable")
+    
+    return cmc_service.get_credit_stats()
+
 @router.get("/crypto/global")
 async def get_global_crypto_metrics(
     cmc_service: CoinMarketCapService = Depends(get_coinmarketcap_service)
@@ -78,91 +102,221 @@ async def get_global_crypto_metrics(
 @router.get("/crypto/search/{query}")
 async def search_cryptocurrency(
     query: str,
+    limit: int = Query(10, ge=1, le=50),
     cmc_service: CoinMarketCapService = Depends(get_coinmarketcap_service)
 ):
-    """Search for cryptocurrencies by name or symbol"""
+    """Search for cryptocurrencies by name or symbol (prefix and fuzzy matches, ranked by CMC rank)"""
     if not cmc_service:
         raise HTTPException(status_code=503, detail="CoinMarketCap service unavailable")
     
     try:
-        results = await cmc_service.search_cryptocurrency(query)
+        results = await cmc_service.search_cryptocurrency(query, limit)
         return {"results": results, "count": len(results)}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/portfolio/value")
 async def get_portfolio_value(
+    portfolio_id: Optional[str] = None,
+    portfolio_service: PortfolioService = Depends(get_portfolio_service)
+):
+    """Get current portfolio value calculated from real-time prices (default portfolio unless portfolio_id is given)"""
+    if not portfolio_service:
+        raise HTTPException(status_code=503, detail="Portfolio service unavailable")
+    
+    try:
+        return await portfolio_service.calculate_portfolio_value(portfolio_id)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+@router.get("/portfolios")
+async def list_portfolios(
+    portfolio_service: PortfolioService = Depends(get_portfolio_service)
+):
+    """List stored portfolios with their position counts"""
+    if not portfolio_service:
+        raise HTTPException(status_code=503, detail="Portfolio service unavailable")
+    
+    return {"portfolios": await asyncio.to_thread(portfolio_service.store.list_portfolios)}
+
+@router.post("/portfolios")
+async def create_portfolio(
+    request: PortfolioCreate,
+    portfolio_service: PortfolioService = Depends(get_portfolio_service)
+):
+    """Create an empty portfolio"""
+    if not portfolio_service:
+        raise HTTPException(status_code=503, detail="Portfolio service unavailable")
+    
+    try:
+        return await asyncio.to_thread(portfolio_service.store.create_portfolio, request.id, request.name)
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+@router.delete("/portfolios/{portfolio_id}")
+async def delete_portfolio(
+    portfolio_id: str,
+    portfolio_service: PortfolioService = Depends(get_portfolio_service)
+):
+    """Delete a portfolio with its lots and transactions"""
+    if not portfolio_service:
+        raise HTTPException(status_code=503, detail="Portfolio service unavailable")
+    if portfolio_id == portfolio_service.default_portfolio_id:
+        raise HTTPException(status_code=409, detail="The default portfolio cannot be deleted")
+    
+    if not await asyncio.to_thread(portfolio_service.store.delete_portfolio, portfolio_id):
+        raise HTTPException(status_code=404, detail=f"Portfolio '{portfolio_id}' does not exist")
+    return {"deleted": portfolio_id}
+
+@router.post("/portfolios/value/batch")
+async def value_portfolios_batch(
+    request: BatchValuationRequest,
+    portfolio_service: PortfolioService = Depends(get_portfolio_service)
+):
+    """Value many portfolios with one batched price lookup"""
+    if not portfolio_service:
+        raise HTTPException(status_code=503, detail="Portfolio service unavailable")
+    
+    portfolio_ids = list(dict.fromkeys(request.portfolio_ids))
+    valuations = await portfolio_service.value_portfolios(portfolio_ids)
+    if valuations is None:
+        raise HTTPException(status_code=502, detail="Failed to fetch prices")
+    return {"portfolios": valuations, "count": len(valuations)}
+
+@router.get("/portfolios/{portfolio_id}/lots")
+async def get_portfolio_lots(
+    portfolio_id: str,
     portfolio_service: PortfolioService = Depends(get_portfolio_service)
 ):
-    """Get current portfolio value calculated from real-time prices"""
+    """Get the open lots of a portfolio"""
     if not portfolio_service:
         raise HTTPException(status_code=503, detail="Portfolio service unavailable")
+    if not await asyncio.to_thread(portfolio_service.store.portfolio_exists, portfolio_id):
+        raise HTTPException(status_code=404, detail=f"Portfolio '{portfolio_id}' does not exist")
     
-    return await portfolio_service.calculate_portfolio_value()
+    return {"portfolio_id": portfolio_id, "lots": await asyncio.to_thread(portfolio_service.store.get_lots, portfolio_id)}
+
+@router.post("/portfolios/{portfolio_id}/lots")
+async def add_portfolio_lot(
+    portfolio_id: str,
+    request: LotCreate,
+    portfolio_service: PortfolioService = Depends(get_portfolio_service)
+):
+    """Add a lot to a portfolio directly, without a transaction"""
+    if not portfolio_service:
+        raise HTTPException(status_code=503, detail="Portfolio service unavailable")
+    if not await asyncio.to_thread(portfolio_service.store.portfolio_exists, portfolio_id):
+        raise HTTPException(status_code=404, detail=f"Portfolio '{portfolio_id}' does not exist")
+    
+    try:
+        lot_id = await asyncio.to_thread(
+            portfolio_service.store.add_lot, portfolio_id, request.symbol, request.quantity, request.cost_basis, request.acquired_at
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"portfolio_id": portfolio_id, "lot_id": lot_id}
+
+@router.get("/portfolios/{portfolio_id}/transactions")
+async def get_portfolio_transactions(
+    portfolio_id: str,
+    limit: int = Query(100, ge=1, le=1000),
+    portfolio_service: PortfolioService = Depends(get_portfolio_service)
+):
+    """Get the most recent imported transactions of a portfolio"""
+    if not portfolio_service:
+        raise HTTPException(status_code=503, detail="Portfolio service unavailable")
+    
+    return {"portfolio_id": portfolio_id, "transactions": await asyncio.to_thread(portfolio_service.store.get_transactions, portfolio_id, limit)}
+
+@router.post("/portfolios/{portfolio_id}/transactions")
+async def import_portfolio_transactions(
+    portfolio_id: str,
+    request: TransactionImport,
+    portfolio_service: PortfolioService = Depends(get_portfolio_service)
+):
+    """Import buy/sell transactions; buys open lots, sells close lots FIFO"""
+    if not portfolio_service:
+        raise HTTPException(status_code=503, detail="Portfolio service unavailable")
+    
+    try:
+        return await asyncio.to_thread(
+            portfolio_service.store.import_transactions, portfolio_id, [tx.dict() for tx in request.transactions]
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 @router.get("/portfolio/history")
 async def get_portfolio_history(
     period: str = '1Y',
+    max_points: Optional[int] = Query(None, ge=10, le=10000),
+    method: Literal["lttb", "minmax"] = "lttb",
     portfolio_service: PortfolioService = Depends(get_portfolio_service)
 ):
-    """Get historical portfolio value"""
+    """Get historical portfolio value, optionally downsampled to max_points for charting"""
     if not portfolio_service:
         raise HTTPException(status_code=503, detail="Portfolio service unavailable")
     
-    return await portfolio_service.get_portfolio_history(period)
+    # Already serialized; skips re-encoding thousands of points per request
+    payload = await portfolio_service.get_portfolio_history_json(period, max_points, method)
+    return Response(content=payload, media_type="application/json")
+
+@router.get("/crypto/history/{symbol}")
+async def get_crypto_price_history(
+    symbol: str,
+    period: str = '1Y',
+    max_points: Optional[int] = Query(None, ge=10, le=10000),
+    method: Literal["lttb", "minmax"] = "lttb",
+    portfolio_service: PortfolioService = Depends(get_portfolio_service)
+):
+    """Get daily closing prices of a cryptocurrency, optionally downsampled to max_points for charting"""
+    if not portfolio_service:
+        raise HTTPException(status_code=503, detail="Portfolio service unavailable")
+    
+    payload = await portfolio_service.get_price_history_json(symbol, period, max_points, method)
+    return Response(content=payload, media_type="application/json")
+
+@router.get("/portfolio/risk-metrics")
+async def get_portfolio_risk_metrics(
+    portfolio_id: Optional[str] = None,
+    period: str = '1Y',
+    confidence: float = Query(0.95, gt=0.5, lt=1.0),
+    window: int = Query(30, ge=5, le=365),
+    portfolio_service: PortfolioService = Depends(get_portfolio_service)
+):
+    """Get volatility, historical/parametric VaR and CVaR, correlation, beta and per-holding risk contribution"""
+    if not portfolio_service:
+        raise HTTPException(status_code=503, detail="Portfolio service unavailable")
+    if portfolio_id and not await asyncio.to_thread(portfolio_service.store.portfolio_exists, portfolio_id):
+        raise HTTPException(status_code=404, detail=f"Portfolio '{portfolio_id}' does not exist")
+
+    try:
+        return await portfolio_service.get_risk_metrics(portfolio_id, period, confidence, window)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except HistoryUnavailableError as e:
+        raise HTTPException(status_code=502, detail=str(e))
 
 @router.get("/portfolio/risk-analysis")
 async def get_portfolio_risk_analysis(
-    trading_agent: TradingStrategyAgent = Depends(get_trading_agent),
-    portfolio_service: PortfolioService = Depends(get_portfolio_service)
+    force: bool = False,
+    risk_analysis_service: RiskAnalysisService = Depends(get_risk_analysis_service)
 ):
-    """Get AI-generated risk analysis for the portfolio"""
-    if not trading_agent:
-        raise HTTPException(status_code=503, detail="Trading agent unavailable")
+    """
+    Get AI-generated risk analysis for the portfolio
+    
+    Served from the precomputed summary with its age; force=true recomputes it now.
+    """
+    if not risk_analysis_service:
+        raise HTTPException(status_code=503, detail="Risk analysis service unavailable")
     
     try:
-        # Get current holdings
-        portfolio_value = await portfolio_service.calculate_portfolio_value()
-        holdings = [p["symbol"] for p in portfolio_value["positions"]]
-        holdings_str = ", ".join(holdings)
-        
-        # Construct prompt
-        prompt = f"Analyze the market risk for a crypto portfolio containing: {holdings_str}. Focus on recent market news and volatility. Provide a concise 1-2 sentence risk summary."
-        
-        # Use agent to get analysis with web search
-        # We use a dummy strategy object as it's required by the chat method
-        from models import RiskProfile, StrategyLogic
-        dummy_strategy = Strategy(
-            strategy_id="portfolio_risk",
-            name="Portfolio Risk Analysis",
-            description="AI-powered portfolio risk analysis",
-            risk_profile=RiskProfile(
-                max_position_pct=100.0,
-                stop_loss_pct=0.0,
-                take_profit_pct=0.0
-            ),
-            logic=[]
-        )
-        
-        analysis = await trading_agent.chat(
-            message=prompt,
-            strategy=dummy_strategy,
-            market="crypto",
-            include_market_data=True,
-            include_web_search=True
-        )
-        
-        return {
-            "analysis": analysis,
-            "timestamp": datetime.datetime.now().strftime("%d%b %Y %H%M").lower()
-        }
-        
+        return await risk_analysis_service.get_analysis(force=force)
     except Exception as e:
         print(f"Risk analysis error: {e}")
         import traceback
         traceback.print_exc()
-        # Fallback if agent fails
+        # Fallback if the summary could not be computed
         return {
-            "analysis": "Market volatility remains high. Diversification recommended.",
+            "analysis": RiskAnalysisService.FALLBACK_ANALYSIS,
             "timestamp": datetime.datetime.now().strftime("%d%b %Y %H%M").lower()
         }
@@ -5,8 +5,10 @@ Provides real-time news and sentiment from Web, Twitter/X, and Reddit
 
 import os
 import asyncio
-from typing import Optional, Dict
+from typing import Any, Optional, Dict, Tuple
 from desearch_py import Desearch
+from response_cache import TTLCache
+from llm_recorder import llm_recorder
 
 class DesearchService:
     """
@@ -20,12 +22,22 @@ class DesearchService:
         
         self.client = Desearch(api_key)
         self.available = True
+        
+        # News per (symbol, timeframe): fresh for NEWS_CACHE_TTL_SECONDS, then served stale
+        # while a background refresh runs, up to NEWS_CACHE_MAX_STALE_SECONDS old
+        self.news_cache = TTLCache(max_entries=256, default_ttl=float(os.getenv("NEWS_CACHE_TTL_SECONDS", "300")))
+        self.news_max_stale_seconds = float(os.getenv("NEWS_CACHE_MAX_STALE_SECONDS", "3600"))
+        self._news_refreshes: Dict[Tuple[str, str], asyncio.Task] = {}
+        self.background_refreshes = 0
         print("Desearch service initialized successfully")
     
     async def get_market_news(self, symbol: str, timeframe: str = 'PAST_24_HOURS') -> Optional[Dict]:
         """
         Get real-time news and sentiment for a trading symbol
         
+        Results are cached per (symbol, timeframe). A stale entry is returned immediately
+        and refreshed in the background; concurrent misses share one search.
+        
         Args:
             symbol: Trading symbol (e.g., 'BTC-USD', 'AAPL', 'ETH')
             timeframe: Time filter ('PAST_HOUR', 'PAST_6_HOURS', 'PAST_24_HOURS')
@@ -33,6 +45,54 @@ class DesearchService:
         Returns:
             Dictionary with summary, sources, and sentiment data
         """
+        key = (symbol, timeframe)
+        cached = self.news_cache.get(key, allow_stale=True)
+        if cached is not None:
+            age = self.news_cache.age(key)
+            if age < self.news_cache.default_ttl:
+                return cached
+            if age < self.news_max_stale_seconds:
+                if key not in self._news_refreshes:
+                    self.background_refreshes += 1
+                self._refresh_market_news(key)
+                return cached
+        
+        # Shielded so a caller that times out does not cancel the shared search
+        return await asyncio.shield(self._refresh_market_news(key))
+    
+    def _refresh_market_news(self, key: Tuple[str, str]) -> asyncio.Task:
+        """Start a news search for key, or join the one already running"""
+        task = self._news_refreshes.get(key)
+        if task is None:
+            task = asyncio.create_task(self._fetch_and_cache_market_news(*key))
+            self._news_refreshes[key] = task
+            task.add_done_callback(lambda _: self._news_refreshes.pop(key, None))
+        return task
+    
+    async def _fetch_and_cache_market_news(self, symbol: str, timeframe: str) -> Dict:
+        result = await self._fetch_market_news(symbol, timeframe)
+        # Failures are not cached; a stale entry keeps being served instead
+        if result.get("success"):
+            self.news_cache.set((symbol, timeframe), result)
+        return result
+    
+    def get_cache_stats(self) -> Dict[str, Any]:
+        """Get news cache statistics"""
+        return {
+            **self.news_cache.get_stats(),
+            "background_refreshes": self.background_refreshes,
+            "searches_in_flight": len(self._news_refreshes)
+        }
+    
+    async def _fetch_market_news(self, symbol: str, timeframe: str) -> Dict:
+        """Run the Desearch AI search for a symbol, through the record/replay layer"""
+        return await llm_recorder.call(
+            "desearch.news",
+            {"symbol": symbol, "timeframe": timeframe},
+            lambda: self._search_market_news(symbol, timeframe)
+        )
+    
+    async def _search_market_news(self, symbol: str, timeframe: str) -> Dict:
         try:
             # Clean symbol for better search results
             clean_symbol = symbol.replace('-USD', '').replace('-', ' ')
@@ -79,6 +139,13 @@ class DesearchService:
         Returns:
             Dictionary with search results
         """
+        return await llm_recorder.call(
+            "desearch.search",
+            {"query": query, "timeframe": timeframe},
+            lambda: self._search_trading_topic(query, timeframe)
+        )
+    
+    async def _search_trading_topic(self, query: str, timeframe: str) -> Dict:
         try:
             # Wrap synchronous API call in asyncio.to_thread to avoid blocking
             result = await asyncio.to_thread(
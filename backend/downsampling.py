@@ -0,0 +1,72 @@
+"""
+Series Downsampling
+Visually faithful point reduction for long chart series (LTTB and min/max bucketing)
+"""
+
+import numpy as np
+
+METHODS = ("lttb", "minmax")
+
+def lttb_indices(x: np.ndarray, y: np.ndarray, threshold: int) -> np.ndarray:
+    """
+    Largest-Triangle-Three-Buckets: indices of threshold points that keep the series' shape
+
+    The first and last points are always kept. The points in between are split
+    into threshold - 2 buckets, and from each bucket the point forming the largest
+    triangle with the previously kept point and the next bucket's average is kept.
+    """
+    n = len(y)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    # threshold - 2 buckets over points 1..n-2; edges are strictly increasing since threshold < n
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+    indices = np.empty(threshold, dtype=np.int64)
+    indices[0], indices[-1] = 0, n - 1
+    kept = 0
+    for bucket in range(threshold - 2):
+        start, end = edges[bucket], edges[bucket + 1]
+        if bucket + 2 < len(edges):
+            next_start, next_end = edges[bucket + 1], edges[bucket + 2]
+        else:
+            next_start, next_end = n - 1, n
+        avg_x = x[next_start:next_end].mean()
+        avg_y = y[next_start:next_end].mean()
+        areas = np.abs(
+            (x[kept] - avg_x) * (y[start:end] - y[kept])
+            - (x[kept] - x[start:end]) * (avg_y - y[kept])
+        )
+        kept = start + int(np.argmax(areas))
+        indices[bucket + 1] = kept
+    return indices
+
+def minmax_indices(y: np.ndarray, max_points: int) -> np.ndarray:
+    """Indices of the lowest and highest point of each bucket, plus the endpoints, in order"""
+    n = len(y)
+    if max_points >= n or max_points < 4:
+        return np.arange(n)
+
+    buckets = (max_points - 2) // 2
+    edges = np.linspace(1, n - 1, buckets + 1).astype(np.int64)
+    picked = [0, n - 1]
+    for start, end in zip(edges[:-1], edges[1:]):
+        if end > start:
+            segment = y[start:end]
+            picked.append(start + int(np.argmin(segment)))
+            picked.append(start + int(np.argmax(segment)))
+    return np.unique(np.array(picked, dtype=np.int64))
+
+def downsample_indices(x: np.ndarray, y: np.ndarray, max_points: int, method: str = "lttb") -> np.ndarray:
+    """
+    Indices of at most max_points points to draw in place of the whole series
+
+    Args:
+        x: Point positions (e.g. timestamps), increasing
+        y: Point values
+        method: "lttb" (shape preserving, default) or "minmax" (keeps every extreme)
+    """
+    if method not in METHODS:
+        raise ValueError(f"Unknown downsampling method: {method}")
+    if method == "minmax":
+        return minmax_indices(y, max_points)
+    return lttb_indices(x, y, max_points)
@@ -0,0 +1,301 @@
+"""
+Holdings Store
+SQLite persistence for portfolios, their lots with cost basis, and imported transactions
+"""
+
+import os
+import sqlite3
+import threading
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS portfolios (
+    id TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    created_at TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS lots (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    portfolio_id TEXT NOT NULL REFERENCES portfolios(id) ON DELETE CASCADE,
+    symbol TEXT NOT NULL,
+    quantity REAL NOT NULL,
+    cost_basis REAL NOT NULL,
+    acquired_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_lots_portfolio ON lots (portfolio_id, symbol, acquired_at);
+CREATE TABLE IF NOT EXISTS transactions (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    portfolio_id TEXT NOT NULL REFERENCES portfolios(id) ON DELETE CASCADE,
+    external_id TEXT,
+    symbol TEXT NOT NULL,
+    side TEXT NOT NULL CHECK (side IN ('buy', 'sell')),
+    quantity REAL NOT NULL,
+    price REAL NOT NULL,
+    fee REAL NOT NULL DEFAULT 0,
+    realized_pl REAL,
+    executed_at TEXT NOT NULL,
+    UNIQUE (portfolio_id, external_id)
+);
+"""
+
+# Seeded into an empty store so the dashboard has something to show
+DEMO_HOLDINGS = [
+    {"symbol": "BTC", "quantity": 0.5, "avg_price": 65000.00},
+    {"symbol": "ETH", "quantity": 5.0, "avg_price": 3500.00},
+    {"symbol": "SOL", "quantity": 100.0, "avg_price": 120.00},
+    {"symbol": "AVAX", "quantity": 50.0, "avg_price": 35.00},
+    {"symbol": "DOT", "quantity": 200.0, "avg_price": 7.50}
+]
+
+class HoldingsStore:
+    """
+    Portfolios made of lots (quantity and per-unit cost basis per purchase).
+
+    Imported buys open lots; sells close the oldest lots first (FIFO) and record
+    the realized P&L on the transaction. Transactions with an external_id are
+    imported once per portfolio, so re-importing a broker export is harmless.
+    Positions are aggregated in SQL, one row per symbol.
+    """
+
+    DEFAULT_PORTFOLIO = "default"
+
+    def __init__(self, path: Optional[str] = None, seed_demo: bool = True):
+        self.path = path or os.getenv("HOLDINGS_DB_PATH", "./portfolio_data/holdings.db")
+        if self.path != ":memory:":
+            Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        # One connection shared by the event loop and worker threads, serialized by the lock
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA foreign_keys = ON")
+            self._conn.execute("PRAGMA journal_mode = WAL")
+            self._conn.executescript(SCHEMA)
+
+        if seed_demo and not self.list_portfolios():
+            self.create_portfolio(self.DEFAULT_PORTFOLIO, "Demo Portfolio")
+            for holding in DEMO_HOLDINGS:
+                self.add_lot(self.DEFAULT_PORTFOLIO, holding["symbol"], holding["quantity"], holding["avg_price"])
+            print("💼 Holdings store seeded with demo portfolio")
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    # Portfolios
+
+    def create_portfolio(self, portfolio_id: str, name: Optional[str] = None) -> Dict[str, Any]:
+        """Create a portfolio; raises ValueError if the id is taken"""
+        created_at = datetime.now().isoformat()
+        try:
+            with self._lock, self._conn:
+                self._conn.execute(
+                    "INSERT INTO portfolios (id, name, created_at) VALUES (?, ?, ?)",
+                    (portfolio_id, name or portfolio_id, created_at)
+                )
+        except sqlite3.IntegrityError:
+            raise ValueError(f"Portfolio '{portfolio_id}' already exists")
+        return {"id": portfolio_id, "name": name or portfolio_id, "created_at": created_at}
+
+    def list_portfolios(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            rows = self._conn.execute(
+                """
+                SELECT p.id, p.name, p.created_at, COUNT(DISTINCT l.symbol) AS positions
+                FROM portfolios p LEFT JOIN lots l ON l.portfolio_id = p.id
+                GROUP BY p.id ORDER BY p.created_at
+                """
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def portfolio_exists(self, portfolio_id: str) -> bool:
+        with self._lock:
+            return self._conn.execute("SELECT 1 FROM portfolios WHERE id = ?", (portfolio_id,)).fetchone() is not None
+
+    def delete_portfolio(self, portfolio_id: str) -> bool:
+        with self._lock, self._conn:
+            return self._conn.execute("DELETE FROM portfolios WHERE id = ?", (portfolio_id,)).rowcount > 0
+
+    # Lots and positions
+
+    @staticmethod
+    def _utc_timestamp(value: Optional[str] = None) -> str:
+        """
+        ISO timestamp in UTC, so stored timestamps sort in time order as text
+
+        Naive timestamps are taken as UTC; unparseable ones raise ValueError.
+        """
+        if not value:
+            return datetime.now(timezone.utc).isoformat()
+        try:
+            parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+        except ValueError:
+            raise ValueError(f"Invalid timestamp: {value}")
+        if parsed.tzinfo is None:
+            parsed = parsed.replace(tzinfo=timezone.utc)
+        return parsed.astimezone(timezone.utc).isoformat()
+
+    def add_lot(self, portfolio_id: str, symbol: str, quantity: float, cost_basis: float, acquired_at: Optional[str] = None) -> int:
+        """Add a lot directly (without a transaction record); returns the lot id"""
+        with self._lock, self._conn:
+            return self._insert_lot(portfolio_id, symbol, quantity, cost_basis, self._utc_timestamp(acquired_at))
+
+    def _insert_lot(self, portfolio_id: str, symbol: str, quantity: float, cost_basis: float, acquired_at: str) -> int:
+        if quantity <= 0:
+            raise ValueError("Lot quantity must be positive")
+        cursor = self._conn.execute(
+            "INSERT INTO lots (portfolio_id, symbol, quantity, cost_basis, acquired_at) VALUES (?, ?, ?, ?, ?)",
+            (portfolio_id, symbol.upper(), quantity, cost_basis, acquired_at)
+        )
+        return cursor.lastrowid
+
+    def get_lots(self, portfolio_id: str) -> List[Dict[str, Any]]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, symbol, quantity, cost_basis, acquired_at FROM lots WHERE portfolio_id = ? ORDER BY symbol, acquired_at, id",
+                (portfolio_id,)
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def get_positions_many(self, portfolio_ids: List[str]) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Aggregated positions of several portfolios in one query
+
+        Returns:
+            Portfolio id -> [{symbol, quantity, avg_price, lots}] (empty list for unknown ids)
+        """
+        positions: Dict[str, List[Dict[str, Any]]] = {portfolio_id: [] for portfolio_id in portfolio_ids}
+        if not portfolio_ids:
+            return positions
+        placeholders = ",".join("?" * len(portfolio_ids))
+        with self._lock:
+            rows = self._conn.execute(
+                f"""
+                SELECT portfolio_id, symbol, SUM(quantity) AS quantity,
+                       SUM(quantity * cost_basis) / SUM(quantity) AS avg_price, COUNT(*) AS lots
+                FROM lots WHERE portfolio_id IN ({placeholders})
+                GROUP BY portfolio_id, symbol ORDER BY portfolio_id, MIN(id)
+                """,
+                list(portfolio_ids)
+            ).fetchall()
+        for row in rows:
+            positions[row["portfolio_id"]].append({
+                "symbol": row["symbol"],
+                "quantity": row["quantity"],
+                "avg_price": row["avg_price"],
+                "lots": row["lots"]
+            })
+        return positions
+
+    def get_positions(self, portfolio_id: str) -> List[Dict[str, Any]]:
+        return self.get_positions_many([portfolio_id])[portfolio_id]
+
+    # Transactions
+
+    def import_transactions(self, portfolio_id: str, transactions: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Import buy/sell transactions in execution order, in one database transaction
+
+        Each transaction has symbol, side, quantity, price and optionally fee,
+        executed_at and external_id. Fees are added to the cost basis of buys and
+        subtracted from the proceeds of sells. A sell larger than the open lots
+        raises ValueError and nothing is imported.
+
+        Execution times are compared as UTC (naive ones are taken as UTC).
+        Transactions without one are stamped with the import time, so they come
+        after the dated ones, in the order they were submitted.
+        """
+        summary = {"imported": 0, "duplicates": 0, "lots_opened": 0, "lots_closed": 0, "realized_pl": 0.0}
+        imported_at = self._utc_timestamp()
+        stamped = [
+            (self._utc_timestamp(tx.get("executed_at")) if tx.get("executed_at") else imported_at, index, tx)
+            for index, tx in enumerate(transactions)
+        ]
+        # Ties keep submission order
+        ordered = sorted(stamped, key=lambda item: (datetime.fromisoformat(item[0]), item[1]))
+        with self._lock, self._conn:
+            if self._conn.execute("SELECT 1 FROM portfolios WHERE id = ?", (portfolio_id,)).fetchone() is None:
+                raise ValueError(f"Portfolio '{portfolio_id}' does not exist")
+
+            for executed_at, _, tx in ordered:
+                symbol = tx["symbol"].upper()
+                side = tx["side"].lower()
+                quantity, price, fee = float(tx["quantity"]), float(tx["price"]), float(tx.get("fee") or 0.0)
+                external_id = tx.get("external_id")
+                if side not in ("buy", "sell") or quantity <= 0:
+                    raise ValueError(f"Invalid transaction: {tx}")
+
+                if external_id is not None and self._conn.execute(
+                    "SELECT 1 FROM transactions WHERE portfolio_id = ? AND external_id = ?", (portfolio_id, external_id)
+                ).fetchone() is not None:
+                    summary["duplicates"] += 1
+                    continue
+
+                realized_pl = None
+                if side == "buy":
+                    self._insert_lot(portfolio_id, symbol, quantity, price + fee / quantity, executed_at)
+                    summary["lots_opened"] += 1
+                else:
+                    realized_pl, closed = self._close_lots_fifo(portfolio_id, symbol, quantity, price - fee / quantity)
+                    summary["lots_closed"] += closed
+                    summary["realized_pl"] += realized_pl
+
+                self._conn.execute(
+                    """
+                    INSERT INTO transactions (portfolio_id, external_id, symbol, side, quantity, price, fee, realized_pl, executed_at)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    """,
+                    (portfolio_id, external_id, symbol, side, quantity, price, fee, realized_pl, executed_at)
+                )
+                summary["imported"] += 1
+        return summary
+
+    def _close_lots_fifo(self, portfolio_id: str, symbol: str, quantity: float, net_price: float):
+        """Reduce the oldest lots by quantity; returns (realized P&L, lots fully closed)"""
+        lots = self._conn.execute(
+            "SELECT id, quantity, cost_basis FROM lots WHERE portfolio_id = ? AND symbol = ? ORDER BY acquired_at, id",
+            (portfolio_id, symbol)
+        ).fetchall()
+        if sum(lot["quantity"] for lot in lots) + 1e-12 < quantity:
+            raise ValueError(f"Cannot sell {quantity} {symbol}: only {sum(lot['quantity'] for lot in lots)} held")
+
+        remaining, realized_pl, closed = quantity, 0.0, 0
+        for lot in lots:
+            if remaining <= 1e-12:
+                break
+            used = min(lot["quantity"], remaining)
+            realized_pl += used * (net_price - lot["cost_basis"])
+            remaining -= used
+            if lot["quantity"] - used <= 1e-12:
+                self._conn.execute("DELETE FROM lots WHERE id = ?", (lot["id"],))
+                closed += 1
+            else:
+                self._conn.execute("UPDATE lots SET quantity = ? WHERE id = ?", (lot["quantity"] - used, lot["id"]))
+        return realized_pl, closed
+
+    def get_transactions(self, portfolio_id: str, limit: int = 100) -> List[Dict[str, Any]]:
+        with self._lock:
+            rows = self._conn.execute(
+                """
+                SELECT id, external_id, symbol, side, quantity, price, fee, realized_pl, executed_at
+                FROM transactions WHERE portfolio_id = ? ORDER BY executed_at DESC, id DESC LIMIT ?
+                """,
+                (portfolio_id, limit)
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def get_realized_pl(self, portfolio_ids: List[str]) -> Dict[str, float]:
+        """Total realized P&L per portfolio"""
+        if not portfolio_ids:
+            return {}
+        placeholders = ",".join("?" * len(portfolio_ids))
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT portfolio_id, COALESCE(SUM(realized_pl), 0) AS realized FROM transactions WHERE portfolio_id IN ({placeholders}) GROUP BY portfolio_id",
+                list(portfolio_ids)
+            ).fetchall()
+        realized = {portfolio_id: 0.0 for portfolio_id in portfolio_ids}
+        realized.update({row["portfolio_id"]: row["realized"] for row in rows})
+        return realized
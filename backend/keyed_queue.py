@@ -0,0 +1,82 @@
+"""
+Latest-Wins Keyed Work Queue
+Holds at most one pending item per key so consumers always work on the newest data
+"""
+
+import asyncio
+import time
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+class LatestWinsQueue:
+    """
+    Pending-work queue keyed by e.g. strategy_id.
+
+    Putting an item for a key that already has pending work replaces the pending
+    item (the older one is counted as superseded). Keys are handed out by
+    staleness: the key whose pending work has waited longest goes first, and a
+    key is not handed out again until task_done() is called for it.
+    """
+
+    def __init__(self):
+        # key -> (item, first_enqueued_at)
+        self._pending: Dict[Hashable, Tuple[Any, float]] = {}
+        self._in_flight = set()
+        self._changed = asyncio.Event()
+
+        # Statistics
+        self.enqueued = 0
+        self.superseded = 0
+        self.completed = 0
+        self.superseded_by_key: Dict[Hashable, int] = {}
+
+    def put(self, key: Hashable, item: Any) -> Optional[Any]:
+        """
+        Queue an item for key, replacing any pending item for the same key
+
+        Returns:
+            The superseded item, or None
+        """
+        self.enqueued += 1
+        previous = self._pending.get(key)
+        if previous is not None:
+            self.superseded += 1
+            self.superseded_by_key[key] = self.superseded_by_key.get(key, 0) + 1
+            # Keep the original wait time so a busy key is not starved by its own updates
+            self._pending[key] = (item, previous[1])
+        else:
+            self._pending[key] = (item, time.monotonic())
+        self._changed.set()
+        return previous[0] if previous is not None else None
+
+    async def get(self) -> Tuple[Hashable, Any]:
+        """
+        Wait for the stalest pending key that is not already being processed
+        """
+        while True:
+            ready = [(enqueued_at, key) for key, (_, enqueued_at) in self._pending.items() if key not in self._in_flight]
+            if ready:
+                _, key = min(ready, key=lambda entry: entry[0])
+                item, _ = self._pending.pop(key)
+                self._in_flight.add(key)
+                return key, item
+            self._changed.clear()
+            await self._changed.wait()
+
+    def task_done(self, key: Hashable):
+        """Mark processing of key as finished so its next pending item can be handed out"""
+        self._in_flight.discard(key)
+        self.completed += 1
+        self._changed.set()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get queue statistics"""
+        now = time.monotonic()
+        return {
+            "pending": len(self._pending),
+            "in_flight": len(self._in_flight),
+            "enqueued": self.enqueued,
+            "superseded": self.superseded,
+            "completed": self.completed,
+            "superseded_by_key": dict(self.superseded_by_key),
+            "oldest_pending_seconds": round(max((now - t for _, t in self._pending.values()), default=0.0), 3)
+        }
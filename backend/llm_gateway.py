@@ -0,0 +1,288 @@
+"""
+LLM Gateway
+Admission control for LLM calls: concurrency cap, request/token rate limits, retries with backoff and a circuit breaker
+"""
+
+import os
+import time
+import random
+import asyncio
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, Optional
+import openai
+from openai.types.chat import ChatCompletion, ChatCompletionChunk
+from llm_recorder import llm_recorder, chat_request_fields
+
+class LLMUnavailableError(Exception):
+    """Raised when the circuit breaker is open and the provider is not being called"""
+
+class TokenBucket:
+    """
+    Token bucket refilled continuously at rate_per_minute, holding at most capacity.
+
+    acquire() waits until enough tokens are available; requests larger than the
+    capacity are clamped so they can still pass once the bucket is full.
+    """
+
+    def __init__(self, rate_per_minute: float, capacity: Optional[float] = None):
+        self.rate_per_second = rate_per_minute / 60.0
+        self.capacity = capacity if capacity is not None else rate_per_minute
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate_per_second)
+        self.updated_at = now
+
+    async def acquire(self, amount: float = 1.0) -> float:
+        """
+        Take amount tokens, waiting for the bucket to refill if needed
+
+        Returns:
+            Seconds spent waiting
+        """
+        amount = min(amount, self.capacity)
+        waited = 0.0
+        # The lock keeps waiters in arrival order
+        async with self._lock:
+            self._refill()
+            while self.tokens < amount:
+                delay = (amount - self.tokens) / self.rate_per_second
+                await asyncio.sleep(delay)
+                waited += delay
+                self._refill()
+            self.tokens -= amount
+        return waited
+
+    def refund(self, amount: float):
+        """Return tokens that were reserved but not used"""
+        if amount > 0:
+            self._refill()
+            self.tokens = min(self.capacity, self.tokens + amount)
+
+class CircuitBreaker:
+    """
+    Closed -> open after failure_threshold consecutive failures. While open, calls
+    are rejected immediately; after reset_timeout one trial call is let through
+    (half-open) and its outcome closes or re-opens the circuit.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self._trial_in_flight = False
+
+        # Statistics
+        self.times_opened = 0
+
+    def allow(self) -> bool:
+        """Whether a call may go to the provider now"""
+        if self.state == "closed":
+            return True
+        if self.state == "open" and time.monotonic() - self.opened_at >= self.reset_timeout:
+            self.state = "half_open"
+        if self.state == "half_open" and not self._trial_in_flight:
+            self._trial_in_flight = True
+            return True
+        return False
+
+    def is_available(self) -> bool:
+        """Whether a call would be allowed, without claiming the half-open trial"""
+        if self.state == "closed":
+            return True
+        if self.state == "half_open":
+            return not self._trial_in_flight
+        return time.monotonic() - self.opened_at >= self.reset_timeout
+
+    def record_success(self):
+        self.state = "closed"
+        self.consecutive_failures = 0
+        self._trial_in_flight = False
+
+    def release_trial(self):
+        """End a half-open trial without an outcome, so the next call can be the trial"""
+        self._trial_in_flight = False
+
+    def record_failure(self):
+        self.consecutive_failures += 1
+        self._trial_in_flight = False
+        if self.state == "half_open" or self.consecutive_failures >= self.failure_threshold:
+            if self.state != "open":
+                self.times_opened += 1
+                print(f"🔌 LLM circuit breaker opened after {self.consecutive_failures} consecutive failures")
+            self.state = "open"
+            self.opened_at = time.monotonic()
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "state": self.state,
+            "consecutive_failures": self.consecutive_failures,
+            "times_opened": self.times_opened,
+            "open_for_seconds": round(time.monotonic() - self.opened_at, 1) if self.state == "open" else 0.0
+        }
+
+class LLMGateway:
+    """
+    Single entry point for chat completion calls.
+
+    Every call passes, in order: the concurrency cap, the circuit breaker (fails
+    fast while the provider is unhealthy), and the request and token rate limits.
+    Rate limiting (429), server errors (5xx), timeouts and connection errors are
+    retried with jittered exponential backoff, honoring Retry-After. Other client
+    errors are raised immediately and leave the breaker as it is. A failed attempt's
+    token reservation is refunded, so retries do not drain the token budget.
+    """
+
+    def __init__(self, client, model: str, max_concurrency: int = 8):
+        self.client = client
+        self.model = model
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+        self.request_bucket = TokenBucket(float(os.getenv("LLM_REQUESTS_PER_MINUTE", "500")))
+        self.token_bucket = TokenBucket(float(os.getenv("LLM_TOKENS_PER_MINUTE", "150000")))
+        self.max_retries = int(os.getenv("LLM_MAX_RETRIES", "3"))
+        self.retry_base_delay = float(os.getenv("LLM_RETRY_BASE_DELAY", "0.5"))
+        self.retry_max_delay = float(os.getenv("LLM_RETRY_MAX_DELAY", "8"))
+        self.breaker = CircuitBreaker(
+            failure_threshold=int(os.getenv("LLM_BREAKER_FAILURE_THRESHOLD", "5")),
+            reset_timeout=float(os.getenv("LLM_BREAKER_RESET_SECONDS", "30"))
+        )
+
+        # Statistics
+        self.stats = {
+            "calls": 0,
+            "attempts": 0,
+            "retries": 0,
+            "succeeded": 0,
+            "failed": 0,
+            "rejected_circuit_open": 0,
+            "rate_limit_wait_seconds": 0.0
+        }
+
+    @staticmethod
+    def _is_retryable(error: Exception) -> bool:
+        if isinstance(error, (openai.APITimeoutError, openai.APIConnectionError, openai.RateLimitError)):
+            return True
+        return isinstance(error, openai.APIStatusError) and error.status_code >= 500
+
+    def _retry_delay(self, attempt: int, error: Exception) -> float:
+        """Full-jitter exponential backoff, or the server's Retry-After if it asks for longer"""
+        delay = random.uniform(0, min(self.retry_max_delay, self.retry_base_delay * (2 ** attempt)))
+        response = getattr(error, "response", None)
+        retry_after = response.headers.get("retry-after") if response is not None else None
+        try:
+            return max(delay, min(self.retry_max_delay, float(retry_after))) if retry_after else delay
+        except ValueError:
+            return delay
+
+    def available(self) -> bool:
+        """Whether the provider is currently considered healthy enough to call"""
+        return self.breaker.is_available()
+
+    async def _admit(self, estimated_tokens: int):
+        if not self.breaker.allow():
+            self.stats["rejected_circuit_open"] += 1
+            raise LLMUnavailableError("LLM provider unavailable (circuit breaker open)")
+        waited = await self.request_bucket.acquire(1)
+        waited += await self.token_bucket.acquire(estimated_tokens)
+        self.stats["rate_limit_wait_seconds"] += waited
+
+    async def _create(self, **kwargs):
+        """Create a completion on the client, through the record/replay layer"""
+        request = chat_request_fields(kwargs)
+        create = lambda: self.client.chat.completions.create(model=self.model, **kwargs)
+        if kwargs.get("stream"):
+            return await llm_recorder.stream(
+                "chat.completions.stream", request, create,
+                serialize=lambda chunk: chunk.model_dump(),
+                deserialize=ChatCompletionChunk.model_validate
+            )
+        return await llm_recorder.call(
+            "chat.completions", request, create,
+            serialize=lambda response: response.model_dump(),
+            deserialize=ChatCompletion.model_validate
+        )
+
+    async def _call_with_retries(self, estimated_tokens: int, **kwargs):
+        """Admit and create a completion, retrying transient failures"""
+        self.stats["calls"] += 1
+        attempt = 0
+        while True:
+            await self._admit(estimated_tokens)
+            self.stats["attempts"] += 1
+            try:
+                return await self._create(**kwargs)
+            except Exception as e:
+                self.token_bucket.refund(estimated_tokens)
+                if not self._is_retryable(e):
+                    # The provider answered, it just rejected this request: says nothing about its health
+                    self.breaker.release_trial()
+                    self.stats["failed"] += 1
+                    raise
+                self.breaker.record_failure()
+                if attempt >= self.max_retries or not self.breaker.is_available():
+                    self.stats["failed"] += 1
+                    raise
+                delay = self._retry_delay(attempt, e)
+                print(f"⏳ LLM call failed ({type(e).__name__}), retrying in {delay:.2f}s")
+                self.stats["retries"] += 1
+                attempt += 1
+                await asyncio.sleep(delay)
+
+    async def complete(self, timeout: float, estimated_tokens: int = 0, **kwargs):
+        """
+        Run a chat completion through admission control
+
+        Args:
+            timeout: Per-attempt timeout in seconds
+            estimated_tokens: Prompt plus max completion tokens, reserved from the token budget
+        """
+        async with self.semaphore:
+            response = await self._call_with_retries(estimated_tokens, timeout=timeout, **kwargs)
+        self.breaker.record_success()
+        self.stats["succeeded"] += 1
+        usage = getattr(response, "usage", None)
+        if usage is not None:
+            self.token_bucket.refund(estimated_tokens - usage.total_tokens)
+        return response
+
+    @asynccontextmanager
+    async def stream(self, timeout: float, estimated_tokens: int = 0, **kwargs) -> AsyncIterator[Any]:
+        """
+        Open a streamed chat completion through admission control
+
+        Only opening the stream is retried; a failure once tokens are flowing is
+        raised to the caller (and counted against the breaker). The stream is
+        closed on exit.
+        """
+        async with self.semaphore:
+            stream = await self._call_with_retries(estimated_tokens, timeout=timeout, stream=True, **kwargs)
+            failed = False
+            try:
+                yield stream
+            except Exception as e:
+                failed = self._is_retryable(e)
+                raise
+            finally:
+                # A consumer closing the stream early still got a healthy response
+                if failed:
+                    self.breaker.record_failure()
+                else:
+                    self.breaker.record_success()
+                    self.stats["succeeded"] += 1
+                await stream.close()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get gateway statistics"""
+        return {
+            **self.stats,
+            "rate_limit_wait_seconds": round(self.stats["rate_limit_wait_seconds"], 3),
+            "requests_per_minute": round(self.request_bucket.rate_per_second * 60),
+            "tokens_per_minute": round(self.token_bucket.rate_per_second * 60),
+            "circuit_breaker": self.breaker.get_stats(),
+            "recorder": llm_recorder.get_stats()
+        }
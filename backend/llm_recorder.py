@@ -0,0 +1,313 @@
+"""
+LLM and Search Call Recorder
+Records request/response pairs with timing and replays them deterministically for offline runs and benchmarks
+
+Configured with environment variables:
+    LLM_RECORD_MODE   off (default) | record | replay
+    LLM_CASSETTE      JSONL file holding the recordings (default ./recordings/cassette.jsonl)
+    REPLAY_LATENCY    recorded (default) | none | fixed:<s> | uniform:<min>,<max> | lognormal:<median>,<sigma>
+    REPLAY_SEED       seed for synthetic latency (default 0)
+"""
+
+import os
+import json
+import time
+import random
+import asyncio
+import hashlib
+import threading
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+# Upstream (recorded or replayed) call latencies of the current task, collected when a benchmark sets a list
+upstream_latency: ContextVar[Optional[List[float]]] = ContextVar("upstream_latency", default=None)
+
+def _note_upstream_latency(seconds: float):
+    spent = upstream_latency.get()
+    if spent is not None:
+        spent.append(seconds)
+
+class ReplayMissError(Exception):
+    """Raised in replay mode when the cassette has no recording for a call kind"""
+
+def request_key(kind: str, request: Dict[str, Any]) -> str:
+    """Stable hash of a call kind and its request parameters"""
+    canonical = json.dumps({"kind": kind, "request": request}, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(canonical.encode()).hexdigest()[:16]
+
+def chat_request_fields(kwargs: Dict[str, Any]) -> Dict[str, Any]:
+    """The chat completion parameters that identify a call (not model, timeout or stream)"""
+    return {k: kwargs.get(k) for k in ("messages", "response_format", "max_tokens", "temperature")}
+
+def load_cassette(path: str) -> List[Dict[str, Any]]:
+    cassette = Path(path)
+    if not cassette.exists():
+        return []
+    with open(cassette) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+class CassetteIndex:
+    """
+    Looks up recordings for replay.
+
+    Exact request matches are served first, in recorded order (cycling when
+    exhausted). Requests that differ from every recording, e.g. because the
+    prompt embeds live prices, get the next recording of the same kind.
+    """
+
+    def __init__(self, entries: List[Dict[str, Any]]):
+        self.by_key: Dict[str, List[Dict[str, Any]]] = {}
+        self.by_kind: Dict[str, List[Dict[str, Any]]] = {}
+        for entry in entries:
+            self.by_key.setdefault(entry["key"], []).append(entry)
+            self.by_kind.setdefault(entry["kind"], []).append(entry)
+        self._key_cursor: Dict[str, int] = {}
+        self._kind_cursor: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+        # Statistics
+        self.exact_matches = 0
+        self.fallback_matches = 0
+
+    def __len__(self) -> int:
+        return sum(len(entries) for entries in self.by_kind.values())
+
+    @staticmethod
+    def _next(entries: List[Dict[str, Any]], cursors: Dict[str, int], name: str) -> Dict[str, Any]:
+        position = cursors.get(name, 0)
+        cursors[name] = position + 1
+        return entries[position % len(entries)]
+
+    def lookup(self, kind: str, key: str) -> Dict[str, Any]:
+        with self._lock:
+            if key in self.by_key:
+                self.exact_matches += 1
+                return self._next(self.by_key[key], self._key_cursor, key)
+            if kind in self.by_kind:
+                self.fallback_matches += 1
+                return self._next(self.by_kind[kind], self._kind_cursor, kind)
+        raise ReplayMissError(f"No recording of kind '{kind}' in cassette")
+
+class LatencyModel:
+    """Replay latency: the recorded value or a synthetic distribution"""
+
+    def __init__(self, spec: str = "recorded", seed: int = 0):
+        self.spec = spec
+        self._random = random.Random(seed)
+        name, _, params = spec.partition(":")
+        self.name = name
+        self.params = [float(p) for p in params.split(",")] if params else []
+        if name not in ("recorded", "none", "fixed", "uniform", "lognormal"):
+            raise ValueError(f"Unknown replay latency model: {spec}")
+
+    def sample(self, recorded: float) -> float:
+        if self.name == "recorded":
+            return recorded
+        if self.name == "none":
+            return 0.0
+        if self.name == "fixed":
+            return self.params[0]
+        if self.name == "uniform":
+            return self._random.uniform(self.params[0], self.params[1])
+        # lognormal:<median>,<sigma>
+        return self._random.lognormvariate(0.0, self.params[1]) * self.params[0]
+
+class CallRecorder:
+    """
+    Wraps outbound LLM and search calls.
+
+    off:    calls go straight through
+    record: calls go through and each request/response pair is appended to the cassette
+    replay: calls are answered from the cassette after the configured latency
+    """
+
+    def __init__(self, mode: str = "off", cassette_path: str = "./recordings/cassette.jsonl", latency: str = "recorded", seed: int = 0):
+        if mode not in ("off", "record", "replay"):
+            raise ValueError(f"Unknown record mode: {mode}")
+        self.mode = mode
+        self.cassette_path = Path(cassette_path)
+        self.latency = LatencyModel(latency, seed)
+        self.index = CassetteIndex(load_cassette(cassette_path)) if mode == "replay" else None
+        self._write_lock = threading.Lock()
+
+        # Statistics
+        self.recorded = 0
+        self.replayed = 0
+        self.replayed_latency_seconds = 0.0
+
+        if mode == "record":
+            self.cassette_path.parent.mkdir(parents=True, exist_ok=True)
+        if mode != "off":
+            print(f"🎞️ LLM/search calls in {mode} mode ({self.cassette_path})")
+
+    @classmethod
+    def from_env(cls) -> "CallRecorder":
+        return cls(
+            mode=os.getenv("LLM_RECORD_MODE", "off").lower(),
+            cassette_path=os.getenv("LLM_CASSETTE", "./recordings/cassette.jsonl"),
+            latency=os.getenv("REPLAY_LATENCY", "recorded"),
+            seed=int(os.getenv("REPLAY_SEED", "0"))
+        )
+
+    def _append(self, kind: str, key: str, request: Dict[str, Any], response: Any, latency: float, **extra):
+        entry = {
+            "kind": kind,
+            "key": key,
+            "request": request,
+            "response": response,
+            "latency_seconds": round(latency, 4),
+            "recorded_at": time.time(),
+            **extra
+        }
+        line = json.dumps(entry, default=str)
+        with self._write_lock:
+            with open(self.cassette_path, "a") as f:
+                f.write(line + "\n")
+            self.recorded += 1
+
+    async def _wait_replay_latency(self, recorded: float) -> float:
+        delay = self.latency.sample(recorded)
+        if delay > 0:
+            await asyncio.sleep(delay)
+        self.replayed += 1
+        self.replayed_latency_seconds += delay
+        _note_upstream_latency(delay)
+        return delay
+
+    async def call(
+        self,
+        kind: str,
+        request: Dict[str, Any],
+        fn: Callable[[], Awaitable[Any]],
+        serialize: Callable[[Any], Any] = lambda response: response,
+        deserialize: Callable[[Any], Any] = lambda data: data
+    ) -> Any:
+        """
+        Run, record or replay one call
+
+        Args:
+            kind: Call kind (e.g. "chat.completions", "desearch.news")
+            request: Parameters identifying the call
+            fn: Performs the real call
+            serialize/deserialize: Convert the response to and from JSON-compatible data
+        """
+        if self.mode == "off":
+            return await fn()
+
+        key = request_key(kind, request)
+        if self.mode == "replay":
+            entry = self.index.lookup(kind, key)
+            await self._wait_replay_latency(entry["latency_seconds"])
+            return deserialize(entry["response"])
+
+        started = time.monotonic()
+        response = await fn()
+        latency = time.monotonic() - started
+        _note_upstream_latency(latency)
+        self._append(kind, key, request, serialize(response), latency)
+        return response
+
+    async def stream(
+        self,
+        kind: str,
+        request: Dict[str, Any],
+        fn: Callable[[], Awaitable[Any]],
+        serialize: Callable[[Any], Any],
+        deserialize: Callable[[Any], Any]
+    ) -> Any:
+        """
+        Run, record or replay a streamed call
+
+        The returned object is async-iterable and has an async close(), like the
+        SDK's stream. Recordings keep each chunk with its delay after the previous one.
+        """
+        if self.mode == "off":
+            return await fn()
+
+        key = request_key(kind, request)
+        if self.mode == "replay":
+            entry = self.index.lookup(kind, key)
+            return ReplayStream(self, entry, deserialize)
+        return RecordingStream(self, kind, key, request, await fn(), serialize)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get recorder statistics"""
+        stats = {
+            "mode": self.mode,
+            "cassette": str(self.cassette_path),
+            "latency_model": self.latency.spec,
+            "recorded": self.recorded,
+            "replayed": self.replayed,
+            "replayed_latency_seconds": round(self.replayed_latency_seconds, 3)
+        }
+        if self.index is not None:
+            stats.update({
+                "cassette_entries": len(self.index),
+                "exact_matches": self.index.exact_matches,
+                "fallback_matches": self.index.fallback_matches
+            })
+        return stats
+
+class RecordingStream:
+    """Passes a live stream through and records its chunks when it ends"""
+
+    def __init__(self, recorder: CallRecorder, kind: str, key: str, request: Dict[str, Any], stream, serialize):
+        self._recorder = recorder
+        self._kind = kind
+        self._key = key
+        self._request = request
+        self._stream = stream
+        self._serialize = serialize
+        self._chunks: List[Dict[str, Any]] = []
+        self._started = time.monotonic()
+        self._last = self._started
+        self._closed = False
+
+    async def __aiter__(self):
+        async for chunk in self._stream:
+            now = time.monotonic()
+            self._chunks.append({"delay_seconds": round(now - self._last, 4), "chunk": self._serialize(chunk)})
+            self._last = now
+            yield chunk
+
+    async def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        await self._stream.close()
+        if self._chunks:
+            latency = time.monotonic() - self._started
+            _note_upstream_latency(latency)
+            self._recorder._append(
+                self._kind, self._key, self._request, self._chunks,
+                latency, first_chunk_seconds=self._chunks[0]["delay_seconds"]
+            )
+
+class ReplayStream:
+    """Replays recorded chunks, spreading the sampled latency like the original stream"""
+
+    def __init__(self, recorder: CallRecorder, entry: Dict[str, Any], deserialize):
+        self._recorder = recorder
+        self._entry = entry
+        self._deserialize = deserialize
+
+    async def __aiter__(self):
+        chunks = self._entry["response"]
+        recorded_total = self._entry["latency_seconds"]
+        total = self._recorder.latency.sample(recorded_total)
+        scale = total / recorded_total if recorded_total > 0 else 0.0
+        for item in chunks:
+            delay = item["delay_seconds"] * scale
+            if delay > 0:
+                await asyncio.sleep(delay)
+            yield self._deserialize(item["chunk"])
+        self._recorder.replayed += 1
+        self._recorder.replayed_latency_seconds += total
+        _note_upstream_latency(total)
+
+    async def close(self):
+        pass
+
+# Global recorder instance, configured from the environment
+llm_recorder = CallRecorder.from_env()
@@ -1,5 +1,7 @@
-from fastapi import FastAPI, HTTPException, WebSocket, WebSocketDisconnect, Depends
+from fastapi import FastAPI, HTTPException, WebSocket, WebSocketDisconnect, Depends, Request, Query
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
 from models import Strategy, PerformanceData, AnalysisResult, ChatRequest
 from agent_service import TradingStrategyAgent
 from performance_analyzer import PerformanceAnalyzer
@@ -7,15 +9,45 @@ from yfinance_data_generator import YFinanceDataGenerator
 from scheduler_service import get_scheduler
 from websocket_manager import websocket_manager
 from coinmarketcap_service import CoinMarketCapService
+from market_snapshot import market_snapshot
 
 import os
+import json
+import asyncio
+import uuid
+from contextlib import asynccontextmanager, aclosing
+from datetime import datetime
 from pathlib import Path
 from dotenv import load_dotenv
 
 env_path = Path(__file__).parent / ".env"
 load_dotenv(dotenv_path=env_path)
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Shared CoinMarketCap HTTP session (pooled keep-alive connections)
+    if coinmarketcap:
+        await coinmarketcap.start()
+    # Start performance monitoring; file-triggered analyses run on the server's event loop
+    performance_analyzer.start_monitoring(asyncio.get_running_loop())
+    print("Performance monitoring started - drop JSON files in ./performance_data/")
+    # Generated records go straight to the analyzer; files are still written for history
+    yfinance_generator.attach_sink(performance_analyzer.submit_record)
+    scheduler.yfinance_generator.attach_sink(performance_analyzer.submit_record)
+    # Portfolio risk summary is precomputed and served from memory
+    if risk_analysis_service:
+        risk_analysis_service.start()
+    yield
+    if risk_analysis_service:
+        await risk_analysis_service.stop()
+    if price_feed:
+        await price_feed.stop()
+    performance_analyzer.stop_monitoring()
+    await trading_agent.aclose()
+    if coinmarketcap:
+        await coinmarketcap.close()
+
+app = FastAPI(lifespan=lifespan)
 
 # Configure CORS
 app.add_middleware(
@@ -51,8 +83,20 @@ if coinmarketcap:
     from portfolio_service import PortfolioService
     portfolio_service = PortfolioService(coinmarketcap)
 
+# Initialize background portfolio risk analysis
+risk_analysis_service = None
+if portfolio_service:
+    from risk_analysis_service import RiskAnalysisService
+    risk_analysis_service = RiskAnalysisService(trading_agent, portfolio_service)
+
+# Initialize live price feed (server push over /ws instead of dashboard polling)
+price_feed = None
+if coinmarketcap:
+    from price_feed import PriceFeed
+    price_feed = PriceFeed(coinmarketcap, portfolio_service)
+
 # Dependency providers
-from crypto_endpoints import router as crypto_router, get_coinmarketcap_service, get_portfolio_service, get_trading_agent
+from crypto_endpoints import router as crypto_router, get_coinmarketcap_service, get_portfolio_service, get_trading_agent, get_risk_analysis_service
 
 def get_cmc_service_impl():
     return coinmarketcap
@@ -63,13 +107,17 @@ def get_portfolio_service_impl():
 def get_trading_agent_impl():
     return trading_agent
 
+def get_risk_analysis_service_impl():
+    return risk_analysis_service
+
 # Include crypto router with dependencies
 app.include_router(
     crypto_router,
     dependencies=[
         Depends(get_cmc_service_impl),
         Depends(get_portfolio_service_impl),
-        Depends(get_trading_agent_impl)
+        Depends(get_trading_agent_impl),
+        Depends(get_risk_analysis_service_impl)
     ]
 )
 
@@ -78,27 +126,91 @@ app.include_router(
 app.dependency_overrides[get_coinmarketcap_service] = get_cmc_service_impl
 app.dependency_overrides[get_portfolio_service] = get_portfolio_service_impl
 app.dependency_overrides[get_trading_agent] = get_trading_agent_impl
+app.dependency_overrides[get_risk_analysis_service] = get_risk_analysis_service_impl
 
 
 # Initialize scheduler service
 scheduler = get_scheduler(interval_minutes=5, symbols=['BTC-USD', 'ETH-USD', 'AAPL', 'TSLA'])
 
-# Start performance monitoring
-performance_analyzer.start_monitoring()
-print("Performance monitoring started - drop JSON files in ./performance_data/")
+async def stream_chat_to_websocket(websocket: WebSocket, request_id: str, chat_request: ChatRequest):
+    """Forward chat tokens to one WebSocket client as they arrive"""
+    chunks = []
+    try:
+        # aclosing() stops the upstream completion as soon as we stop consuming it
+        async with aclosing(trading_agent.chat_stream(
+            chat_request.message,
+            chat_request.strategy,
+            chat_request.market,
+            chat_request.includeMarketData,
+            chat_request.includeWebSearch
+        )) as tokens:
+            async for token in tokens:
+                chunks.append(token)
+                if not await websocket_manager.send_json({"type": "chat_token", "request_id": request_id, "token": token}, websocket):
+                    return
+        await websocket_manager.send_json({"type": "chat_done", "request_id": request_id, "response": "".join(chunks)}, websocket)
+    except asyncio.CancelledError:
+        raise
+    except Exception as e:
+        print(f"Error streaming chat: {e}")
+        await websocket_manager.send_json({"type": "chat_error", "request_id": request_id, "error": str(e)}, websocket)
 
 @app.websocket("/ws")
 async def websocket_endpoint(websocket: WebSocket):
-    """WebSocket endpoint for real-time strategy updates"""
+    """WebSocket endpoint for real-time strategy updates and streaming chat"""
     await websocket_manager.connect(websocket)
+    chat_tasks = {}
     try:
         while True:
             # Keep the connection alive and handle any incoming messages
             data = await websocket.receive_text()
-            # Echo back or handle client messages if needed
-            await websocket_manager.send_personal_message(f"Server received: {data}", websocket)
+            try:
+                message = json.loads(data)
+            except json.JSONDecodeError:
+                message = None
+            
+            if isinstance(message, dict) and message.get("type") == "chat":
+                # {"type": "chat", "request_id": ..., "request": ChatRequest}; request_id is generated when missing
+                request_id = str(message.get("request_id") or uuid.uuid4())
+                if request_id in chat_tasks:
+                    await websocket_manager.send_json({"type": "chat_error", "request_id": request_id, "error": "request_id is already streaming"}, websocket)
+                    continue
+                try:
+                    chat_request = ChatRequest(**(message.get("request") or {}))
+                except (ValidationError, TypeError) as e:
+                    await websocket_manager.send_json({"type": "chat_error", "request_id": request_id, "error": f"Invalid chat request: {e}"}, websocket)
+                    continue
+                task = asyncio.create_task(stream_chat_to_websocket(websocket, request_id, chat_request))
+                chat_tasks[request_id] = task
+                task.add_done_callback(lambda _, rid=request_id: chat_tasks.pop(rid, None))
+            elif isinstance(message, dict) and message.get("type") == "chat_cancel":
+                task = chat_tasks.get(str(message.get("request_id")))
+                if task:
+                    task.cancel()
+            elif isinstance(message, dict) and message.get("type") == "subscribe_prices":
+                # {"type": "subscribe_prices", "symbols": [...]} or {"type": "subscribe_prices", "portfolio": true}
+                symbols = message.get("symbols")
+                if not price_feed:
+                    await websocket_manager.send_json({"type": "feed_error", "error": "Price feed unavailable"}, websocket)
+                elif symbols is not None and not (isinstance(symbols, list) and all(isinstance(s, str) for s in symbols)):
+                    await websocket_manager.send_json({"type": "feed_error", "error": "symbols must be a list of strings"}, websocket)
+                else:
+                    await price_feed.subscribe(websocket, symbols, bool(message.get("portfolio")))
+            elif isinstance(message, dict) and message.get("type") == "unsubscribe_prices":
+                if price_feed:
+                    price_feed.unsubscribe(websocket)
+            else:
+                # Echo back or handle client messages if needed
+                await websocket_manager.send_personal_message(f"Server received: {data}", websocket)
     except WebSocketDisconnect:
+        pass
+    finally:
+        # Stop generating for a client that is gone, however the loop ended
         websocket_manager.disconnect(websocket)
+        for task in list(chat_tasks.values()):
+            task.cancel()
+        if price_feed:
+            price_feed.unsubscribe(websocket)
 
 @app.get("/")
 async def root():
@@ -128,8 +240,80 @@ async def chat_with_agent(request: ChatRequest):
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/chat/stream")
+async def chat_with_agent_stream(request: ChatRequest, http_request: Request):
+    """Stream the chat response as Server-Sent Events, one event per token"""
+    async def event_stream():
+        try:
+            # aclosing() stops the upstream completion as soon as the client goes away
+            async with aclosing(trading_agent.chat_stream(
+                request.message,
+                request.strategy,
+                request.market,
+                request.includeMarketData,
+                request.includeWebSearch
+            )) as tokens:
+                async for token in tokens:
+                    if await http_request.is_disconnected():
+                        return
+                    yield f"data: {json.dumps({'token': token})}\n\n"
+            yield "event: done\ndata: {}\n\n"
+        except Exception as e:
+            print(f"Error streaming chat: {e}")
+            yield f"event: error\ndata: {json.dumps({'error': str(e)})}\n\n"
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.get("/chat/cache")
+async def get_chat_cache_stats():
+    """Get chat response cache statistics"""
+    try:
+        return trading_agent.chat_cache.get_stats()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/agent/usage")
+async def get_agent_token_usage():
+    """Get prompt and completion token usage per LLM call kind"""
+    try:
+        return {
+            "analysis_prompt_budget": trading_agent.analysis_prompt_budget,
+            "chat_prompt_budget": trading_agent.chat_prompt_budget,
+            "usage": trading_agent.get_token_usage(),
+            "context_sources": trading_agent.get_context_stats()
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/agent/gateway")
+async def get_llm_gateway_status():
+    """Get LLM gateway rate limit, retry and circuit breaker statistics"""
+    try:
+        return trading_agent.gateway.get_stats()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
 # Removed: Use /yfinance/market/{symbol} for real-time market data instead
 
+@app.get("/market/snapshot")
+async def get_market_snapshot():
+    """Get the latest shared quotes used as live context for the agent"""
+    return {
+        "quotes": market_snapshot.get_all(),
+        "stats": market_snapshot.get_stats()
+    }
+
+@app.get("/market/feed")
+async def get_price_feed_status():
+    """Get live price feed pollers, subscribers and update counts"""
+    if not price_feed:
+        raise HTTPException(status_code=503, detail="Price feed unavailable")
+    return price_feed.get_stats()
+
 @app.get("/market-summary")
 async def get_market_summary():
     try:
@@ -156,6 +340,59 @@ async def get_recent_analyses(hours: int = 24):
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/performance/history")
+async def get_performance_history(date: str, strategy_id: str = None, limit: int = Query(500, ge=1, le=5000)):
+    """Get the analyzed performance records of a day (YYYY-MM-DD), including compacted days"""
+    try:
+        day = datetime.strptime(date, "%Y-%m-%d")
+    except ValueError:
+        raise HTTPException(status_code=422, detail="date must be YYYY-MM-DD")
+    
+    def read_day():
+        records = []
+        for record in performance_analyzer.store.iter_day_records(day):
+            if strategy_id and record["performance"].get("strategy", {}).get("strategy_id") != strategy_id:
+                continue
+            records.append(record)
+            if len(records) >= limit:
+                break
+        return records
+    
+    try:
+        records = await asyncio.to_thread(read_day)
+        return {"date": date, "records": records, "count": len(records)}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/performance/backfill")
+async def start_performance_backfill(concurrency: int = 4, force: bool = False):
+    """Analyze all existing performance files in the background, resuming from the last checkpoint"""
+    try:
+        started = performance_analyzer.start_backfill(concurrency=concurrency, force=force)
+        return {
+            "message": "Backfill started" if started else "Backfill is already running",
+            "status": performance_analyzer.get_backfill_status()
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/performance/backfill/status")
+async def get_performance_backfill_status():
+    """Get progress and throughput of the current backfill run"""
+    try:
+        return performance_analyzer.get_backfill_status()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/performance/compact")
+async def compact_performance_data(retention_days: int = None):
+    """Compact performance data partitions older than the retention window into daily archives"""
+    try:
+        summary = await asyncio.to_thread(performance_analyzer.store.compact, retention_days)
+        return {"message": "Performance data compacted", **summary}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
 @app.get("/performance/status")
 async def get_performance_status():
     """Get status of performance monitoring system"""
@@ -163,7 +400,10 @@ async def get_performance_status():
         return {
             "monitoring": performance_analyzer.observer is not None and performance_analyzer.observer.is_alive(),
             "watch_directory": str(performance_analyzer.watch_directory),
-            "cached_analyses": len(performance_analyzer.performance_cache)
+            "cached_analyses": len(performance_analyzer.performance_cache),
+            "batching": performance_analyzer.batcher.get_stats(),
+            "ingestion": performance_analyzer.get_ingest_stats(),
+            "prescreen": performance_analyzer.prescreen.get_stats()
         }
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -0,0 +1,120 @@
+"""
+Live Market Snapshot
+Process-wide latest quotes, written by whichever component fetches prices and read with zero I/O
+"""
+
+import os
+import time
+import threading
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+class MarketSnapshot:
+    """
+    Latest known quote per symbol and source.
+
+    Writers (yfinance generator, CoinMarketCap service) call update() after every
+    fetch. Readers get the merged view of a symbol: fields from the most recently
+    updated source win, and fields only another source provides (e.g. RSI from
+    yfinance) are kept while that source's entry is within max_age_seconds.
+
+    Staleness policy: entries younger than fresh_seconds are fresh, entries up to
+    max_age_seconds are returned flagged "stale", older entries are ignored.
+    Symbols are normalized so "BTC-USD" (yfinance) and "BTC" (CoinMarketCap) share an entry.
+    """
+
+    def __init__(self, fresh_seconds: Optional[float] = None, max_age_seconds: Optional[float] = None):
+        self.fresh_seconds = fresh_seconds if fresh_seconds is not None else float(os.getenv("MARKET_SNAPSHOT_FRESH_SECONDS", "120"))
+        self.max_age_seconds = max_age_seconds if max_age_seconds is not None else float(os.getenv("MARKET_SNAPSHOT_MAX_AGE_SECONDS", "1800"))
+        # symbol -> source -> (fields, updated_at_monotonic, updated_at_wall)
+        self._quotes: Dict[str, Dict[str, tuple]] = {}
+        # Writers may run in worker threads (e.g. yfinance calls)
+        self._lock = threading.Lock()
+
+        # Statistics
+        self.updates = 0
+        self.reads = 0
+        self.fresh_reads = 0
+        self.stale_reads = 0
+        self.missed_reads = 0
+
+    @staticmethod
+    def normalize_symbol(symbol: str) -> str:
+        symbol = symbol.upper()
+        return symbol[:-4] if symbol.endswith("-USD") else symbol
+
+    def update(self, symbol: str, fields: Dict[str, Any], source: str):
+        """Record the latest quote for symbol from source"""
+        key = self.normalize_symbol(symbol)
+        with self._lock:
+            self._quotes.setdefault(key, {})[source] = (dict(fields), time.monotonic(), datetime.now().isoformat())
+            self.updates += 1
+
+    def _merge(self, key: str, now: float) -> Optional[Dict[str, Any]]:
+        entries = [
+            (source, fields, updated, updated_wall)
+            for source, (fields, updated, updated_wall) in self._quotes.get(key, {}).items()
+            if now - updated <= self.max_age_seconds
+        ]
+        if not entries:
+            return None
+
+        # Oldest first so the freshest source's fields win
+        entries.sort(key=lambda entry: entry[2])
+        merged: Dict[str, Any] = {}
+        for _, fields, _, _ in entries:
+            merged.update(fields)
+
+        source, _, updated, updated_wall = entries[-1]
+        age = now - updated
+        merged.update({
+            "symbol": key,
+            "source": source,
+            "sources": [entry[0] for entry in entries],
+            "updated_at": updated_wall,
+            "age_seconds": round(age, 1),
+            "stale": age > self.fresh_seconds
+        })
+        return merged
+
+    def get(self, symbol: str) -> Optional[Dict[str, Any]]:
+        """
+        Get the merged quote for symbol
+
+        Returns:
+            Quote fields plus source, updated_at, age_seconds and stale, or None if
+            no source has a quote younger than max_age_seconds
+        """
+        with self._lock:
+            quote = self._merge(self.normalize_symbol(symbol), time.monotonic())
+            self.reads += 1
+            if quote is None:
+                self.missed_reads += 1
+            elif quote["stale"]:
+                self.stale_reads += 1
+            else:
+                self.fresh_reads += 1
+        return quote
+
+    def get_all(self) -> List[Dict[str, Any]]:
+        """Get merged quotes for every symbol that has a usable entry"""
+        now = time.monotonic()
+        with self._lock:
+            quotes = [self._merge(key, now) for key in sorted(self._quotes)]
+        return [quote for quote in quotes if quote is not None]
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get snapshot statistics"""
+        return {
+            "symbols": len(self._quotes),
+            "fresh_seconds": self.fresh_seconds,
+            "max_age_seconds": self.max_age_seconds,
+            "updates": self.updates,
+            "reads": self.reads,
+            "fresh_reads": self.fresh_reads,
+            "stale_reads": self.stale_reads,
+            "missed_reads": self.missed_reads
+        }
+
+# Global market snapshot instance
+market_snapshot = MarketSnapshot()
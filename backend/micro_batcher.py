@@ -0,0 +1,94 @@
+"""
+Micro-Batching Helper
+Collects work submitted under the same key over a short window and processes it with one call
+"""
+
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Tuple
+
+class MicroBatcher:
+    """
+    Groups items submitted under the same key within a time window (or until a
+    maximum batch size is reached) and hands each group to a single flush call.
+
+    The flush callable receives (key, items) and must return one result per item,
+    in order. Each caller of submit() gets the result for its own item.
+    """
+
+    def __init__(
+        self,
+        flush: Callable[[Hashable, List[Any]], Awaitable[List[Any]]],
+        window_seconds: float = 2.0,
+        max_batch_size: int = 10
+    ):
+        self._flush = flush
+        self.window_seconds = window_seconds
+        self.max_batch_size = max(1, max_batch_size)
+
+        self._pending: Dict[Hashable, List[Tuple[Any, asyncio.Future]]] = {}
+        self._timers: Dict[Hashable, asyncio.Task] = {}
+        self._running = set()
+
+        # Statistics
+        self.items_submitted = 0
+        self.batches_flushed = 0
+
+    async def submit(self, key: Hashable, item: Any) -> Any:
+        """
+        Add an item to the pending batch for key and wait for its result
+        """
+        future = asyncio.get_running_loop().create_future()
+        batch = self._pending.setdefault(key, [])
+        batch.append((item, future))
+        self.items_submitted += 1
+
+        if len(batch) >= self.max_batch_size or self.window_seconds <= 0:
+            self._dispatch(key)
+        elif key not in self._timers:
+            self._timers[key] = asyncio.create_task(self._flush_after_window(key))
+
+        return await future
+
+    async def _flush_after_window(self, key: Hashable):
+        await asyncio.sleep(self.window_seconds)
+        self._timers.pop(key, None)
+        self._dispatch(key)
+
+    def _dispatch(self, key: Hashable):
+        """Move the pending batch for key into a flush task"""
+        timer = self._timers.pop(key, None)
+        if timer:
+            timer.cancel()
+
+        batch = self._pending.pop(key, None)
+        if not batch:
+            return
+
+        task = asyncio.create_task(self._run_batch(key, batch))
+        self._running.add(task)
+        task.add_done_callback(self._running.discard)
+
+    async def _run_batch(self, key: Hashable, batch: List[Tuple[Any, asyncio.Future]]):
+        self.batches_flushed += 1
+        try:
+            results = await self._flush(key, [item for item, _ in batch])
+            if len(results) != len(batch):
+                raise ValueError(f"Batch flush returned {len(results)} results for {len(batch)} items")
+            for (_, future), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get batching statistics"""
+        return {
+            "window_seconds": self.window_seconds,
+            "max_batch_size": self.max_batch_size,
+            "items_submitted": self.items_submitted,
+            "batches_flushed": self.batches_flushed,
+            "avg_batch_size": round(self.items_submitted / self.batches_flushed, 2) if self.batches_flushed else 0.0,
+            "pending_keys": len(self._pending)
+        }
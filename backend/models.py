@@ -41,3 +41,28 @@ class ChatRequest(BaseModel):
     market: Literal["crypto", "stock", "future", "forex"] = "crypto"
     includeMarketData: bool = False
     includeWebSearch: bool = False
+
+class PortfolioCreate(BaseModel):
+    id: str
+    name: Optional[str] = None
+
+class LotCreate(BaseModel):
+    symbol: str
+    quantity: float
+    cost_basis: float  # per unit
+    acquired_at: Optional[str] = None
+
+class Transaction(BaseModel):
+    symbol: str
+    side: Literal["buy", "sell"]
+    quantity: float
+    price: float
+    fee: float = 0.0
+    executed_at: Optional[str] = None
+    external_id: Optional[str] = None  # broker id; transactions already imported with it are skipped
+
+class TransactionImport(BaseModel):
+    transactions: List[Transaction]
+
+class BatchValuationRequest(BaseModel):
+    portfolio_ids: List[str]
@@ -0,0 +1,170 @@
+"""
+Local OpenAI-Compatible Stub Server
+Serves canned chat completions so the agent can be exercised without the real API
+
+Run with:
+    uvicorn openai_stub:app --port 8001
+and start the backend with OPENAI_BASE_URL=http://localhost:8001/v1
+
+With STUB_CASSETTE set to a recording made with LLM_RECORD_MODE=record, the stub
+replays the recorded completions instead (latency per REPLAY_LATENCY, see llm_recorder.py).
+
+Faults can be injected at startup (STUB_ERROR_RATE, STUB_RATE_LIMIT_RATE, STUB_OUTAGE)
+or at runtime with POST /stub/faults, e.g. {"outage": true} to simulate a provider outage.
+"""
+
+import os
+import json
+import time
+import asyncio
+import uuid
+import random
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+from llm_recorder import CassetteIndex, LatencyModel, chat_request_fields, load_cassette, request_key
+
+app = FastAPI()
+
+# Simulated generation time per request, in seconds
+STUB_LATENCY_SECONDS = float(os.getenv("STUB_LATENCY_SECONDS", "0.5"))
+# Simulated time to first token for streamed requests, in seconds
+STUB_FIRST_TOKEN_SECONDS = float(os.getenv("STUB_FIRST_TOKEN_SECONDS", "0.1"))
+
+# Replay of recorded completions
+STUB_CASSETTE = os.getenv("STUB_CASSETTE")
+cassette = CassetteIndex(load_cassette(STUB_CASSETTE)) if STUB_CASSETTE else None
+replay_latency = LatencyModel(os.getenv("REPLAY_LATENCY", "recorded"), int(os.getenv("REPLAY_SEED", "0")))
+
+# Fault injection
+faults = {
+    # Fraction of requests answered with a 500
+    "error_rate": float(os.getenv("STUB_ERROR_RATE", "0")),
+    # Fraction of requests answered with a 429 and Retry-After
+    "rate_limit_rate": float(os.getenv("STUB_RATE_LIMIT_RATE", "0")),
+    "retry_after_seconds": float(os.getenv("STUB_RETRY_AFTER_SECONDS", "1")),
+    # Every request fails with a 503
+    "outage": os.getenv("STUB_OUTAGE", "false").lower() == "true"
+}
+fault_stats = {"requests": 0, "errors": 0, "rate_limited": 0, "outage_rejections": 0}
+
+def _injected_fault():
+    """Return an error response if a fault should be injected for this request"""
+    fault_stats["requests"] += 1
+    if faults["outage"]:
+        fault_stats["outage_rejections"] += 1
+        return JSONResponse(status_code=503, content={"error": {"message": "Stub outage", "type": "server_error"}})
+    roll = random.random()
+    if roll < faults["rate_limit_rate"]:
+        fault_stats["rate_limited"] += 1
+        return JSONResponse(
+            status_code=429,
+            content={"error": {"message": "Stub rate limit", "type": "rate_limit_error"}},
+            headers={"Retry-After": str(faults["retry_after_seconds"])}
+        )
+    if roll < faults["rate_limit_rate"] + faults["error_rate"]:
+        fault_stats["errors"] += 1
+        return JSONResponse(status_code=500, content={"error": {"message": "Stub server error", "type": "server_error"}})
+    return None
+
+def _completion_text(body: dict) -> str:
+    """Pick a canned reply matching the requested response format"""
+    if (body.get("response_format") or {}).get("type") == "json_object":
+        return json.dumps({
+            "action": "keep",
+            "feedback": "Stub analysis: performance is within expected bounds.",
+            "new_strategy": None
+        })
+    return "Stub response: market conditions look stable for this strategy."
+
+def _usage(body: dict, text: str) -> dict:
+    prompt_chars = sum(len(str(m.get("content", ""))) for m in body.get("messages", []))
+    prompt_tokens = prompt_chars // 4
+    completion_tokens = len(text) // 4
+    return {
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": completion_tokens,
+        "total_tokens": prompt_tokens + completion_tokens
+    }
+
+def _stream_chunks(body: dict, text: str):
+    """Stream the reply as OpenAI-style SSE chunks, one word at a time"""
+    async def generate():
+        completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+        words = text.split(" ")
+        await asyncio.sleep(STUB_FIRST_TOKEN_SECONDS)
+        for i, word in enumerate(words):
+            chunk = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": body.get("model", "stub"),
+                "choices": [{
+                    "index": 0,
+                    "delta": {"content": word if i == 0 else f" {word}"},
+                    "finish_reason": None
+                }]
+            }
+            yield f"data: {json.dumps(chunk)}\n\n"
+            await asyncio.sleep(max(0.0, STUB_LATENCY_SECONDS - STUB_FIRST_TOKEN_SECONDS) / len(words))
+        yield "data: [DONE]\n\n"
+    
+    return StreamingResponse(generate(), media_type="text/event-stream")
+
+async def _replay(body: dict):
+    """Serve a recorded completion, streamed with the recorded chunk pacing"""
+    kind = "chat.completions.stream" if body.get("stream") else "chat.completions"
+    entry = cassette.lookup(kind, request_key(kind, chat_request_fields(body)))
+    total = replay_latency.sample(entry["latency_seconds"])
+    
+    if not body.get("stream"):
+        await asyncio.sleep(total)
+        return entry["response"]
+    
+    async def generate():
+        recorded_total = entry["latency_seconds"]
+        scale = total / recorded_total if recorded_total > 0 else 0.0
+        for item in entry["response"]:
+            await asyncio.sleep(item["delay_seconds"] * scale)
+            yield f"data: {json.dumps(item['chunk'])}\n\n"
+        yield "data: [DONE]\n\n"
+    
+    return StreamingResponse(generate(), media_type="text/event-stream")
+
+@app.post("/v1/chat/completions")
+async def chat_completions(request: Request):
+    body = await request.json()
+    fault = _injected_fault()
+    if fault is not None:
+        return fault
+    
+    if cassette is not None:
+        return await _replay(body)
+    
+    text = _completion_text(body)
+    if body.get("stream"):
+        return _stream_chunks(body, text)
+    
+    await asyncio.sleep(STUB_LATENCY_SECONDS)
+    return {
+        "id": f"chatcmpl-{uuid.uuid4().hex}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": body.get("model", "stub"),
+        "choices": [{
+            "index": 0,
+            "message": {"role": "assistant", "content": text},
+            "finish_reason": "stop"
+        }],
+        "usage": _usage(body, text)
+    }
+
+@app.post("/stub/faults")
+async def set_faults(request: Request):
+    """Update fault injection settings; returns the settings now in effect"""
+    updates = await request.json()
+    faults.update({k: v for k, v in updates.items() if k in faults})
+    return {"faults": faults, "stats": fault_stats}
+
+@app.get("/stub/faults")
+async def get_faults():
+    return {"faults": faults, "stats": fault_stats}
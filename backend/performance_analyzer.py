@@ -7,6 +7,8 @@ import os
 import json
 import asyncio
 import threading
+import time
+from contextlib import nullcontext
 from datetime import datetime, timedelta
 from typing import Dict, List, Any, Optional
 from pathlib import Path
@@ -14,6 +16,10 @@ from watchdog.observers import Observer
 from watchdog.events import FileSystemEventHandler
 from models import Strategy, PerformanceData, AnalysisResult
 from websocket_manager import websocket_manager
+from micro_batcher import MicroBatcher
+from performance_store import PerformanceStore
+from keyed_queue import LatestWinsQueue
+from prescreen import PreScreen
 
 class PerformanceFileHandler(FileSystemEventHandler):
     """
@@ -28,6 +34,9 @@ class PerformanceFileHandler(FileSystemEventHandler):
             # Ignore analysis files to prevent infinite loop
             if '_analysis.json' in event.src_path:
                 return
+            # Already handed to the analyzer in memory by an in-process producer
+            if self.analyzer.is_ingested_in_process(event.src_path):
+                return
             print(f"New performance file detected: {event.src_path}")
             # Schedule analysis using thread-safe approach
             self._schedule_analysis(event.src_path)
@@ -37,50 +46,88 @@ class PerformanceFileHandler(FileSystemEventHandler):
             # Ignore analysis files to prevent infinite loop
             if '_analysis.json' in event.src_path:
                 return
+            # Already handed to the analyzer in memory by an in-process producer
+            if self.analyzer.is_ingested_in_process(event.src_path):
+                return
             print(f"Performance file updated: {event.src_path}")
             # Schedule analysis using thread-safe approach
             self._schedule_analysis(event.src_path)
     
     def _schedule_analysis(self, file_path):
         """Schedule analysis in a thread-safe manner"""
-        def run_analysis():
-            # Create a new event loop for this thread if one doesn't exist
-            try:
-                loop = asyncio.get_event_loop()
-            except RuntimeError:
-                loop = asyncio.new_event_loop()
-                asyncio.set_event_loop(loop)
-            
-            try:
-                loop.run_until_complete(self.analyzer.process_performance_file(file_path))
-            except Exception as e:
-                print(f"Error processing file {file_path}: {e}")
-        
-        # Run in a separate thread to avoid blocking the file watcher
-        thread = threading.Thread(target=run_analysis, daemon=True)
-        thread.start()
+        # Watchdog calls us from its own thread; the analysis runs on the analyzer's event loop
+        self.analyzer.submit_file(file_path)
 
 class PerformanceAnalyzer:
     """
     Real performance data analyzer using SpoonOS
     """
     
-    def __init__(self, trading_agent, watch_directory: str = "./performance_data"):
+    def __init__(
+        self,
+        trading_agent,
+        watch_directory: str = "./performance_data",
+        batch_window_seconds: float = 2.0,
+        max_batch_size: int = 10,
+        analysis_workers: int = 2
+    ):
         self.trading_agent = trading_agent
         self.watch_directory = Path(watch_directory)
-        self.watch_directory.mkdir(exist_ok=True)
+        self.store = PerformanceStore(watch_directory)
         
         # File monitoring
         self.observer = None
         self.file_handler = PerformanceFileHandler(self)
+        self.loop = None
+        
+        # Backfill and manual runs: records for the same strategy arriving within the
+        # window share one LLM call. Live records skip it (see _run_analysis_worker).
+        self.batcher = MicroBatcher(
+            self._analyze_batch,
+            window_seconds=batch_window_seconds,
+            max_batch_size=max_batch_size
+        )
+        
+        # Live work (file watcher and in-process producers): at most one pending
+        # record per strategy, newer records replace stale ones
+        self.work_queue = LatestWinsQueue()
+        self.analysis_workers = analysis_workers
+        self._workers = []
+        
+        # Rule-based fast path: only material changes go to the LLM
+        self.prescreen = PreScreen()
         
         # Performance metrics cache
         self.performance_cache = {}
         
-    def start_monitoring(self):
+        # In-process ingestion (records handed over without a disk round-trip)
+        self._inprocess_paths: Dict[str, float] = {}
+        self.ingest_stats = {
+            "records_ingested": 0,
+            "records_dequeued": 0,
+            "total_queue_latency_ms": 0.0,
+            "max_queue_latency_ms": 0.0
+        }
+        
+        # Bulk backfill state
+        self.backfill_task = None
+        # Bounds LLM reviews in flight while a backfill runs (None otherwise)
+        self._llm_slots: Optional[asyncio.Semaphore] = None
+        self.backfill_status = self._new_backfill_status()
+        
+    def start_monitoring(self, loop: Optional[asyncio.AbstractEventLoop] = None):
         """
         Start monitoring the performance data directory
+        
+        Args:
+            loop: Event loop that runs file-triggered analyses (e.g. the server's loop).
+                  A dedicated background loop is started if none is given.
         """
+        self.loop = loop or self._start_analysis_loop()
+        self._workers = [
+            asyncio.run_coroutine_threadsafe(self._run_analysis_worker(), self.loop)
+            for _ in range(max(1, self.analysis_workers))
+        ]
         self.observer = Observer()
         self.observer.schedule(
             self.file_handler, 
@@ -98,17 +145,112 @@ class PerformanceAnalyzer:
             self.observer.stop()
             self.observer.join()
             print("Stopped performance file monitoring")
+        for worker in self._workers:
+            worker.cancel()
+        self._workers = []
+    
+    def _start_analysis_loop(self) -> asyncio.AbstractEventLoop:
+        loop = asyncio.new_event_loop()
+        thread = threading.Thread(target=loop.run_forever, daemon=True)
+        thread.start()
+        return loop
     
-    async def process_performance_file(self, file_path: str) -> Optional[AnalysisResult]:
+    def submit_file(self, file_path: str):
         """
-        Process a performance JSON file and trigger SpoonOS analysis
+        Queue analysis of a performance file from any thread
+        """
+        def log_failure(future):
+            if not future.cancelled() and future.exception():
+                print(f"Error processing file {file_path}: {future.exception()}")
+        
+        future = asyncio.run_coroutine_threadsafe(self._enqueue_file(file_path), self.loop)
+        future.add_done_callback(log_failure)
+    
+    def submit_record(self, performance_data: dict, file_path: Optional[str] = None) -> bool:
+        """
+        Hand a performance record straight to the analyzer, from any thread
+        
+        Args:
+            performance_data: Performance record (same structure as a performance file)
+            file_path: Path the record is (or will be) persisted to; the file watcher
+                       ignores it and the analysis result is saved next to it
+        
+        Returns:
+            False if the analyzer is not running, so the producer should fall back to the file watcher
+        """
+        if self.loop is None or not self.loop.is_running():
+            return False
+        
+        if file_path:
+            now = time.monotonic()
+            # Forget paths whose watchdog events are long gone
+            for path, added_at in list(self._inprocess_paths.items()):
+                if now - added_at > 60:
+                    self._inprocess_paths.pop(path, None)
+            self._inprocess_paths[os.path.abspath(file_path)] = now
+        
+        self.loop.call_soon_threadsafe(self._enqueue_record, performance_data, file_path, time.perf_counter())
+        return True
+    
+    def is_ingested_in_process(self, file_path: str) -> bool:
+        """Check whether a file's record was already delivered through submit_record"""
+        return os.path.abspath(file_path) in self._inprocess_paths
+    
+    async def _enqueue_file(self, file_path: str):
+        performance_data = await self._load_performance_file(file_path)
+        if performance_data is not None:
+            self._enqueue_record(performance_data, file_path, time.perf_counter())
+    
+    def _enqueue_record(self, performance_data: dict, file_path: Optional[str], enqueued_at: float):
+        """Put a live record on the work queue, superseding any pending record of its strategy"""
+        self.ingest_stats["records_ingested"] += 1
+        strategy_id = performance_data.get('strategy', {}).get('strategy_id', 'unknown')
+        superseded = self.work_queue.put(strategy_id, (performance_data, file_path, enqueued_at))
+        if superseded is not None:
+            stale_path = superseded[1]
+            print(f"⏭️  Skipping stale performance record for {strategy_id}: "
+                  f"{Path(stale_path).name if stale_path else 'in-process record'} superseded by newer data")
+    
+    async def _run_analysis_worker(self):
+        """
+        Analyze live records, stalest strategy first
+        
+        Live analysis is deliberately unbatched. The work queue already keeps only
+        the newest pending record per strategy, so a batch would only ever hold
+        one record and the batching window would add its full delay to every
+        live analysis. Superseded records are dropped rather than reviewed together.
+        """
+        while True:
+            strategy_id, (performance_data, file_path, enqueued_at) = await self.work_queue.get()
+            try:
+                latency_ms = (time.perf_counter() - enqueued_at) * 1000
+                self.ingest_stats["records_dequeued"] += 1
+                self.ingest_stats["total_queue_latency_ms"] += latency_ms
+                self.ingest_stats["max_queue_latency_ms"] = max(self.ingest_stats["max_queue_latency_ms"], latency_ms)
+                
+                await self.process_performance_record(performance_data, file_path, batch=False)
+            finally:
+                self.work_queue.task_done(strategy_id)
+    
+    def get_ingest_stats(self) -> Dict[str, Any]:
+        """Get live ingestion and work queue statistics"""
+        dequeued = self.ingest_stats["records_dequeued"]
+        return {
+            "records_ingested": self.ingest_stats["records_ingested"],
+            "records_dequeued": dequeued,
+            "avg_queue_latency_ms": round(self.ingest_stats["total_queue_latency_ms"] / dequeued, 3) if dequeued else 0.0,
+            "max_queue_latency_ms": round(self.ingest_stats["max_queue_latency_ms"], 3),
+            "work_queue": self.work_queue.get_stats()
+        }
+    
+    async def _load_performance_file(self, file_path: str, settle_delay: float = 1.0) -> Optional[dict]:
+        """
+        Read a performance JSON file, reporting I/O and decode errors to the frontend
         """
         try:
-            # Broadcast analysis status
-            await websocket_manager.broadcast_analysis_status("analyzing", f"Analyzing performance file: {Path(file_path).name}")
-            
             # Wait a bit for file to be fully written
-            await asyncio.sleep(1)
+            if settle_delay > 0:
+                await asyncio.sleep(settle_delay)
             
             try:
                 with open(file_path, 'r') as f:
@@ -123,63 +265,175 @@ class PerformanceAnalyzer:
                 return None
             
             print(f"📈 Processing performance file: {file_path}")
+            return performance_data
             
-            # Extract strategy and performance information
-            strategy_data = performance_data.get('strategy', {})
-            metrics = performance_data.get('performance', performance_data.get('metrics', {}))
+        except Exception as e:
+            print(f"Error processing performance file {file_path}: {e}")
+            await websocket_manager.broadcast_analysis_status("idle", f"Analysis failed: {str(e)}")
+            return None
+    
+    async def process_performance_file(self, file_path: str, settle_delay: float = 1.0) -> Optional[AnalysisResult]:
+        """
+        Process a performance JSON file and trigger SpoonOS analysis
+        
+        Args:
+            file_path: Path to the performance JSON file
+            settle_delay: Seconds to wait for a freshly created file to be fully written
+                          (backfill passes 0 since existing files are already complete)
+        """
+        performance_data = await self._load_performance_file(file_path, settle_delay)
+        if performance_data is None:
+            return None
+        return await self.process_performance_record(performance_data, file_path)
+    
+    async def process_performance_record(self, performance_data: dict, file_path: Optional[str] = None, batch: bool = True) -> Optional[AnalysisResult]:
+        """
+        Trigger SpoonOS analysis for an already loaded performance record
+        
+        Args:
+            performance_data: Performance record
+            file_path: Where the record lives on disk; the analysis result is saved next to it
+            batch: Wait for other records of the same strategy and analyze them together
+        
+        Returns:
+            The analysis result, or None if the record could not be analyzed (including
+            when the LLM was unavailable and only a fallback keep was broadcast)
+        """
+        try:
+            strategy_data, strategy, performance = self._parse_performance_data(performance_data)
             
-            # Create Strategy object
-            strategy = Strategy(
-                strategy_id=strategy_data.get('strategy_id', 'unknown'),
-                name=strategy_data.get('name', 'Unknown Strategy'),
-                risk_profile=strategy_data.get('risk_profile', {
-                    'max_position_pct': 0.2,
-                    'stop_loss_pct': 0.03,
-                    'take_profit_pct': 0.06
-                }),
-                logic=strategy_data.get('logic', [])
-            )
+            if file_path is None:
+                file_path = str(self.store.path_for(f"inprocess_{strategy.strategy_id}_{datetime.now():%Y%m%d_%H%M%S_%f}.json"))
             
-            # Create PerformanceData object
-            performance = PerformanceData(
-                timestamp=metrics.get('timestamp', datetime.now().isoformat()),
-                market=metrics.get('market', 'BTC-USD'),
-                strategy_id=strategy.strategy_id,
-                signal=metrics.get('signal', 'NONE'),
-                price=float(metrics.get('price', 0)),
-                qty=float(metrics.get('qty', 0)),
-                position_after=float(metrics.get('position_after', 0)),
-                pnl_realized=float(metrics.get('pnl_realized', 0)),
-                pnl_unrealized=float(metrics.get('pnl_unrealized', 0))
-            )
+            # Broadcast analysis status
+            await websocket_manager.broadcast_analysis_status("analyzing", f"Analyzing performance file: {Path(file_path).name}")
             
-            # Trigger SpoonOS analysis
-            analysis_result = await self.trading_agent.analyze_strategy(strategy, performance)
+            record = {
+                'file_path': file_path,
+                'performance_data': performance_data,
+                'strategy_data': strategy_data,
+                'strategy': strategy,
+                'performance': performance,
+                'portfolio_metrics': performance_data.get('portfolio_metrics')
+            }
             
-            # Save analysis result
-            await self.save_analysis_result(file_path, analysis_result, performance_data)
+            # Trigger SpoonOS analysis, batched with other pending records of this strategy
+            if batch:
+                return await self.batcher.submit(strategy.strategy_id, record)
+            return (await self._analyze_batch(strategy.strategy_id, [record]))[0]
+            
+        except Exception as e:
+            print(f"Error processing performance record {file_path}: {e}")
+            await websocket_manager.broadcast_analysis_status("idle", f"Analysis failed: {str(e)}")
+            return None
+    
+    def _parse_performance_data(self, performance_data: dict):
+        """
+        Build Strategy and PerformanceData objects from a raw performance record
+        """
+        # Extract strategy and performance information
+        strategy_data = performance_data.get('strategy', {})
+        metrics = performance_data.get('performance', performance_data.get('metrics', {}))
+        
+        # Create Strategy object
+        strategy = Strategy(
+            strategy_id=strategy_data.get('strategy_id', 'unknown'),
+            name=strategy_data.get('name', 'Unknown Strategy'),
+            risk_profile=strategy_data.get('risk_profile', {
+                'max_position_pct': 0.2,
+                'stop_loss_pct': 0.03,
+                'take_profit_pct': 0.06
+            }),
+            logic=strategy_data.get('logic', [])
+        )
+        
+        # Create PerformanceData object
+        performance = PerformanceData(
+            timestamp=metrics.get('timestamp', datetime.now().isoformat()),
+            market=metrics.get('market', 'BTC-USD'),
+            strategy_id=strategy.strategy_id,
+            signal=metrics.get('signal', 'NONE'),
+            price=float(metrics.get('price', 0)),
+            qty=float(metrics.get('qty', 0)),
+            position_after=float(metrics.get('position_after', 0)),
+            pnl_realized=float(metrics.get('pnl_realized', 0)),
+            pnl_unrealized=float(metrics.get('pnl_unrealized', 0))
+        )
+        
+        return strategy_data, strategy, performance
+    
+    async def _review_with_llm(self, strategy_id: str, records: List[Dict[str, Any]]) -> AnalysisResult:
+        """One LLM review of a batch (sorted oldest first); raises on failure"""
+        latest = records[-1]
+        if len(records) == 1:
+            return await self.trading_agent.analyze_strategy(latest['strategy'], latest['performance'], raise_on_error=True)
+        print(f"📦 Analyzing {len(records)} batched performance records for {strategy_id}")
+        return await self.trading_agent.analyze_strategy_batch(
+            latest['strategy'],
+            [r['performance'] for r in records],
+            raise_on_error=True
+        )
+    
+    async def _analyze_batch(self, strategy_id: str, records: List[Dict[str, Any]]) -> List[Optional[AnalysisResult]]:
+        """
+        Analyze a batch of performance records for one strategy with a single LLM call
+        and fan the result out to every file in the batch
+        
+        A fallback keep (LLM unavailable) is broadcast but not saved, and None is
+        returned for its records, so backfill counts them as failed and retries them.
+        """
+        records = sorted(records, key=lambda r: r['performance'].timestamp)
+        latest = records[-1]
+        
+        escalation = self.prescreen.screen(strategy_id, records)
+        if escalation is None:
+            print(f"⚡ Pre-screen: no material change for {strategy_id}, skipping LLM review")
+            analysis_result = self.prescreen.local_keep(strategy_id)
+            reviewed_by = "prescreen"
+        elif not self.trading_agent.gateway.available():
+            # Circuit open: answer locally and keep the baseline so the review happens later
+            print(f"🔌 LLM unavailable, keeping {strategy_id} without review ({escalation})")
+            analysis_result = self.prescreen.fallback_keep(escalation)
+            reviewed_by = "fallback"
+        else:
+            try:
+                async with (self._llm_slots or nullcontext()):
+                    analysis_result = await self._review_with_llm(strategy_id, records)
+                reviewed_by = "llm"
+                # Only a real review moves the baseline
+                self.prescreen.record_review(strategy_id, latest['performance'], latest['portfolio_metrics'])
+            except Exception as e:
+                # Keep the baseline so the next update escalates again
+                print(f"⚠️ LLM review failed for {strategy_id}, keeping without review: {e}")
+                analysis_result = self.prescreen.fallback_keep(escalation)
+                reviewed_by = "fallback"
+        
+        for record in records:
+            file_path = record['file_path']
+            
+            # Save analysis result; a fallback is not one, the record still needs a review
+            if reviewed_by != "fallback":
+                await self.save_analysis_result(file_path, analysis_result, record['performance_data'], reviewed_by)
             
             # Cache the results
             self.performance_cache[file_path] = {
-                'performance_data': performance_data,
+                'performance_data': record['performance_data'],
                 'analysis_result': analysis_result,
+                'reviewed_by': reviewed_by,
                 'processed_at': datetime.now().isoformat()
             }
             
             print(f"✅ Analysis complete for {Path(file_path).name}: Action = {analysis_result.action.upper()}")
-            
-            # Broadcast strategy update to frontend
-            await self._broadcast_strategy_update(strategy_data, analysis_result)
-            
-            # Broadcast analysis completion
-            await websocket_manager.broadcast_analysis_status("idle", f"Analysis complete: {analysis_result.action.upper()}")
-            
-            return analysis_result
-            
-        except Exception as e:
-            print(f"Error processing performance file {file_path}: {e}")
-            await websocket_manager.broadcast_analysis_status("idle", f"Analysis failed: {str(e)}")
-            return None
+        
+        # Broadcast strategy update to frontend
+        await self._broadcast_strategy_update(latest['strategy_data'], analysis_result)
+        
+        # Broadcast analysis completion
+        await websocket_manager.broadcast_analysis_status("idle", f"Analysis complete: {analysis_result.action.upper()}")
+        
+        if reviewed_by == "fallback":
+            return [None] * len(records)
+        return [analysis_result] * len(records)
     
     async def _broadcast_strategy_update(self, old_strategy_data: dict, analysis_result: AnalysisResult):
         """
@@ -207,7 +461,7 @@ class PerformanceAnalyzer:
         except Exception as e:
             print(f"Error broadcasting strategy update: {e}")
     
-    async def save_analysis_result(self, original_file: str, result: AnalysisResult, original_data: dict):
+    async def save_analysis_result(self, original_file: str, result: AnalysisResult, original_data: dict, reviewed_by: str = "llm"):
         """
         Save the analysis result alongside the original performance data
         """
@@ -220,6 +474,7 @@ class PerformanceAnalyzer:
             analysis_data = {
                 'original_file': str(original_path),
                 'analyzed_at': datetime.now().isoformat(),
+                'reviewed_by': reviewed_by,
                 'analysis_result': {
                     'action': result.action,
                     'feedback': result.feedback,
@@ -251,7 +506,8 @@ class PerformanceAnalyzer:
                     'file': file_path,
                     'processed_at': cached_data['processed_at'],
                     'action': cached_data['analysis_result'].action,
-                    'feedback': cached_data['analysis_result'].feedback
+                    'feedback': cached_data['analysis_result'].feedback,
+                    'reviewed_by': cached_data.get('reviewed_by', 'llm')
                 })
         
         return sorted(recent_analyses, key=lambda x: x['processed_at'], reverse=True)
@@ -260,14 +516,163 @@ class PerformanceAnalyzer:
         """
         Process any existing performance files in the directory
         """
-        json_files = list(self.watch_directory.glob("*.json"))
+        return await self.backfill()
+    
+    def _new_backfill_status(self) -> Dict[str, Any]:
+        return {
+            "running": False,
+            "total": 0,
+            "pending": 0,
+            "completed": 0,
+            "skipped": 0,
+            "failed": 0,
+            "concurrency": 0,
+            "started_at": None,
+            "finished_at": None,
+            "elapsed_seconds": 0.0,
+            "files_per_minute": 0.0,
+            "eta_seconds": None
+        }
+    
+    @staticmethod
+    def _analysis_file_for(json_file: Path) -> Path:
+        return json_file.parent / f"{json_file.stem}_analysis.json"
+    
+    def _load_checkpoint(self, checkpoint_path: Path) -> set:
+        """Read the set of files completed by previous backfill runs"""
+        if not checkpoint_path.exists():
+            return set()
+        with open(checkpoint_path, 'r') as f:
+            return {line.strip() for line in f if line.strip()}
+    
+    def get_backfill_status(self) -> Dict[str, Any]:
+        """
+        Get progress and throughput of the current (or last) backfill run
+        """
+        status = dict(self.backfill_status)
+        if status["running"] and status["started_at"]:
+            elapsed = (datetime.now() - datetime.fromisoformat(status["started_at"])).total_seconds()
+            processed = status["completed"] + status["failed"]
+            rate = processed / elapsed if elapsed > 0 else 0.0
+            status["elapsed_seconds"] = round(elapsed, 1)
+            status["files_per_minute"] = round(rate * 60, 2)
+            status["eta_seconds"] = round(status["pending"] / rate, 1) if rate > 0 else None
+        return status
+    
+    async def backfill(self, concurrency: int = 4, checkpoint_file: Optional[str] = None, force: bool = False) -> Dict[str, Any]:
+        """
+        Analyze all existing performance files with bounded concurrency
+        
+        Completed files are appended to a checkpoint file, so an interrupted run
+        resumes where it stopped. Files that already have an analysis result are skipped.
+        
+        Args:
+            concurrency: Maximum number of LLM analyses in flight (live analyses included
+                         while the backfill runs); each one may cover up to
+                         max_batch_size files of the same strategy
+            checkpoint_file: Checkpoint path (defaults to .backfill_checkpoint in the watch directory)
+            force: Re-analyze every file, ignoring the checkpoint and existing results
+        
+        Returns:
+            Final backfill status
+        """
+        # No .json suffix, so the file watcher never picks the checkpoint up
+        checkpoint_path = Path(checkpoint_file) if checkpoint_file else self.watch_directory / ".backfill_checkpoint"
+        if force and checkpoint_path.exists():
+            checkpoint_path.unlink()
+        done = self._load_checkpoint(checkpoint_path)
+        
+        # Only raw partitions inside the retention window are scanned; older days are compacted
+        json_files = list(self.store.iter_performance_files())
         if not json_files:
             print(f"No existing performance files found in {self.watch_directory}")
-            return
-        
-        print(f"Found {len(json_files)} existing performance files to analyze")
+            return self.get_backfill_status()
         
+        pending = []
+        skipped = 0
         for json_file in json_files:
-            if not json_file.name.endswith('_analysis.json'):  # Skip analysis files
-                await self.process_performance_file(str(json_file))
+            if not force and (str(json_file) in done or self._analysis_file_for(json_file).exists()):
+                skipped += 1
+            else:
+                pending.append(json_file)
+        
+        status = self._new_backfill_status()
+        status.update({
+            "running": True,
+            "total": len(json_files),
+            "pending": len(pending),
+            "skipped": skipped,
+            "concurrency": concurrency,
+            "started_at": datetime.now().isoformat()
+        })
+        self.backfill_status = status
+        print(f"Backfill: {len(json_files)} performance files, {skipped} already analyzed, {len(pending)} to go (concurrency={concurrency})")
+        
+        # Admit enough files for every analysis slot to fill a whole batch; the LLM
+        # slots, not the files admitted, bound the analyses in flight
+        semaphore = asyncio.Semaphore(max(1, concurrency) * self.batcher.max_batch_size)
+        self._llm_slots = asyncio.Semaphore(max(1, concurrency))
+        
+        with open(checkpoint_path, 'a') as checkpoint:
+            async def run_one(json_file: Path):
+                async with semaphore:
+                    result = await self.process_performance_file(str(json_file), settle_delay=0)
+                status["pending"] -= 1
+                if result is None:
+                    status["failed"] += 1
+                else:
+                    status["completed"] += 1
+                    checkpoint.write(f"{json_file}\n")
+                    checkpoint.flush()
+                
+                processed = status["completed"] + status["failed"]
+                if processed % 10 == 0 or status["pending"] == 0:
+                    progress = self.get_backfill_status()
+                    print(f"Backfill progress: {processed}/{len(pending)} "
+                          f"({progress['files_per_minute']} files/min, ETA {progress['eta_seconds']}s)")
+            
+            try:
+                await asyncio.gather(*(run_one(f) for f in pending))
+            finally:
+                self._llm_slots = None
+                final = self.get_backfill_status()
+                status.update({
+                    "running": False,
+                    "finished_at": datetime.now().isoformat(),
+                    "elapsed_seconds": final["elapsed_seconds"],
+                    "files_per_minute": final["files_per_minute"],
+                    "eta_seconds": None
+                })
+        
+        print(f"✅ Backfill finished: {status['completed']} analyzed, {status['failed']} failed, "
+              f"{status['skipped']} skipped in {status['elapsed_seconds']}s")
+        return dict(status)
+    
+    def start_backfill(self, concurrency: int = 4, force: bool = False) -> bool:
+        """
+        Start a backfill run as a background task on the running event loop
+        
+        Returns:
+            False if a backfill is already running
+        """
+        if self.backfill_task and not self.backfill_task.done():
+            return False
+        self.backfill_task = asyncio.create_task(self.backfill(concurrency=concurrency, force=force))
+        return True
+
+
+if __name__ == "__main__":
+    import argparse
+    from dotenv import load_dotenv
+    from agent_service import TradingStrategyAgent
+    
+    parser = argparse.ArgumentParser(description="Backfill analyses for existing performance files")
+    parser.add_argument("--directory", default="./performance_data", help="Performance data directory")
+    parser.add_argument("--concurrency", type=int, default=4, help="Maximum concurrent LLM analyses")
+    parser.add_argument("--checkpoint", default=None, help="Checkpoint file path")
+    parser.add_argument("--force", action="store_true", help="Re-analyze files that already have results")
+    args = parser.parse_args()
     
+    load_dotenv(dotenv_path=Path(__file__).parent / ".env")
+    analyzer = PerformanceAnalyzer(TradingStrategyAgent(), watch_directory=args.directory)
+    asyncio.run(analyzer.backfill(concurrency=args.concurrency, checkpoint_file=args.checkpoint, force=args.force))
@@ -0,0 +1,221 @@
+"""
+Performance Data Store
+Time-partitioned layout (YYYY/MM/DD/HH) for performance JSON files with rotation and compression
+"""
+
+import gzip
+import json
+import os
+import shutil
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, Any, Iterator, List, Optional, Tuple
+
+class PerformanceStore:
+    """
+    Stores performance files in hourly partitions under the data root and compacts
+    analyzed files of days older than the retention window into one gzip JSON-lines
+    archive per day, so directory listings, file watching and backfill scans stay bounded.
+    """
+
+    ARCHIVE_SUFFIX = ".jsonl.gz"
+
+    def __init__(self, root: str = "./performance_data", retention_days: int = 2):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.retention_days = retention_days
+
+    def partition_for(self, when: Optional[datetime] = None) -> Path:
+        """Get (and create) the hourly partition directory for a point in time"""
+        when = when or datetime.now()
+        partition = self.root / f"{when:%Y}" / f"{when:%m}" / f"{when:%d}" / f"{when:%H}"
+        partition.mkdir(parents=True, exist_ok=True)
+        return partition
+
+    def path_for(self, filename: str, when: Optional[datetime] = None) -> Path:
+        """Get the path a new performance file should be written to"""
+        return self.partition_for(when) / filename
+
+    @staticmethod
+    def _numeric_dirs(path: Path) -> List[Path]:
+        if not path.is_dir():
+            return []
+        return sorted(p for p in path.iterdir() if p.is_dir() and p.name.isdigit())
+
+    def _iter_day_dirs(self) -> Iterator[Tuple[datetime, Path]]:
+        """Yield (date, directory) for every raw day partition, oldest first"""
+        for year_dir in self._numeric_dirs(self.root):
+            for month_dir in self._numeric_dirs(year_dir):
+                for day_dir in self._numeric_dirs(month_dir):
+                    try:
+                        day = datetime(int(year_dir.name), int(month_dir.name), int(day_dir.name))
+                    except ValueError:
+                        continue
+                    yield day, day_dir
+
+    def iter_performance_files(self) -> Iterator[Path]:
+        """
+        Yield raw performance files oldest partition first, skipping analysis results
+
+        Legacy files written flat into the data root are included first.
+        """
+        for json_file in sorted(self.root.glob("*.json")):
+            if not json_file.name.endswith('_analysis.json'):
+                yield json_file
+
+        for _, day_dir in self._iter_day_dirs():
+            for hour_dir in self._numeric_dirs(day_dir):
+                for json_file in sorted(hour_dir.glob("*.json")):
+                    if not json_file.name.endswith('_analysis.json'):
+                        yield json_file
+
+    def archive_path_for(self, day: datetime) -> Path:
+        return self.root / f"{day:%Y}" / f"{day:%m}" / f"{day:%d}{self.ARCHIVE_SUFFIX}"
+
+    def migrate_flat_files(self) -> int:
+        """
+        Move legacy flat files from the data root into partitions by modification time
+        """
+        moved = 0
+        for json_file in sorted(self.root.glob("*.json")):
+            if json_file.name.endswith('_analysis.json'):
+                continue
+            partition = self.partition_for(datetime.fromtimestamp(json_file.stat().st_mtime))
+            # Keep the analysis result next to its performance file
+            analysis_file = json_file.parent / f"{json_file.stem}_analysis.json"
+            if analysis_file.exists():
+                shutil.move(str(analysis_file), str(partition / analysis_file.name))
+            shutil.move(str(json_file), str(partition / json_file.name))
+            moved += 1
+        return moved
+
+    def compact(self, retention_days: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Compact every analyzed performance file in day partitions older than the
+        retention window into a single gzip JSON-lines archive per day (one line
+        per performance file, with its analysis) and remove the raw files
+
+        Files without an analysis result stay in their partition until backfill
+        has analyzed them; the day is compacted on a later run.
+
+        Returns:
+            Summary of what was compacted
+        """
+        retention_days = self.retention_days if retention_days is None else retention_days
+        cutoff = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0) - timedelta(days=retention_days)
+
+        migrated = self.migrate_flat_files()
+        days_compacted = 0
+        files_compacted = 0
+        files_deferred = 0
+
+        for day, day_dir in list(self._iter_day_dirs()):
+            if day >= cutoff:
+                continue
+
+            archive_path = self.archive_path_for(day)
+            records = []
+            compacted_paths = []
+            for hour_dir in self._numeric_dirs(day_dir):
+                for json_file in sorted(hour_dir.glob("*.json")):
+                    if json_file.name.endswith('_analysis.json'):
+                        continue
+                    analysis_file = json_file.parent / f"{json_file.stem}_analysis.json"
+                    if not analysis_file.exists():
+                        files_deferred += 1
+                        continue
+                    record = self._read_record(json_file, analysis_file)
+                    if record is None:
+                        files_deferred += 1
+                        continue
+                    records.append(record)
+                    compacted_paths.extend([json_file, analysis_file])
+
+            if records:
+                # Merge into an existing archive, so re-running after a partial compaction
+                # keeps earlier records without writing the same file twice
+                archived_files = set()
+                tmp_path = archive_path.with_name(archive_path.name + ".tmp")
+                with gzip.open(tmp_path, 'wt', encoding='utf-8') as out:
+                    if archive_path.exists():
+                        with gzip.open(archive_path, 'rt', encoding='utf-8') as existing:
+                            for line in existing:
+                                if not line.strip():
+                                    continue
+                                archived_files.add(json.loads(line).get("file"))
+                                out.write(line if line.endswith("\n") else line + "\n")
+                    for record in records:
+                        if record["file"] in archived_files:
+                            continue
+                        archived_files.add(record["file"])
+                        out.write(json.dumps(record, separators=(',', ':'), default=str) + "\n")
+                os.replace(tmp_path, archive_path)
+                for path in compacted_paths:
+                    path.unlink(missing_ok=True)
+                files_compacted += len(records)
+
+            # Drop the day only once nothing raw is left in it
+            if not any(p.is_file() for p in day_dir.rglob("*")):
+                shutil.rmtree(day_dir)
+                days_compacted += 1
+            elif records:
+                days_compacted += 1
+
+        if days_compacted or migrated or files_deferred:
+            print(f"🗜️  Compacted {files_compacted} performance files from {days_compacted} days "
+                  f"(migrated {migrated} legacy files, {files_deferred} unanalyzed files kept)")
+
+        return {
+            "days_compacted": days_compacted,
+            "files_compacted": files_compacted,
+            "files_deferred": files_deferred,
+            "legacy_files_migrated": migrated,
+            "retention_days": retention_days
+        }
+
+    def _read_record(self, json_file: Path, analysis_file: Path) -> Optional[Dict[str, Any]]:
+        """An analyzed performance file as an archive record, or None if unreadable"""
+        try:
+            with open(json_file, 'r') as f:
+                performance = json.load(f)
+            with open(analysis_file, 'r') as f:
+                analysis = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            print(f"Skipping unreadable performance file {json_file}: {e}")
+            return None
+        return {
+            "file": str(json_file.relative_to(self.root)),
+            "performance": performance,
+            "analysis": analysis.get('analysis_result'),
+            "reviewed_by": analysis.get('reviewed_by'),
+            "analyzed_at": analysis.get('analyzed_at')
+        }
+
+    def iter_day_records(self, day: datetime) -> Iterator[Dict[str, Any]]:
+        """
+        Yield every analyzed performance record of a day, whether compacted or not
+
+        Archived records come first, then analyzed files still in the day's
+        partitions; unanalyzed files are left out.
+        """
+        yield from self.iter_archived_records(day)
+        day_dir = self.root / f"{day:%Y}" / f"{day:%m}" / f"{day:%d}"
+        for hour_dir in self._numeric_dirs(day_dir):
+            for json_file in sorted(hour_dir.glob("*.json")):
+                if json_file.name.endswith('_analysis.json'):
+                    continue
+                analysis_file = json_file.parent / f"{json_file.stem}_analysis.json"
+                if analysis_file.exists():
+                    record = self._read_record(json_file, analysis_file)
+                    if record is not None:
+                        yield record
+
+    def iter_archived_records(self, day: datetime) -> Iterator[Dict[str, Any]]:
+        """Yield the records stored in a compacted day archive"""
+        archive_path = self.archive_path_for(day)
+        if not archive_path.exists():
+            return
+        with gzip.open(archive_path, 'rt', encoding='utf-8') as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
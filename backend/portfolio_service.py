@@ -1,186 +1,447 @@
+import os
+import json
 import asyncio
 from typing import List, Dict, Optional
 from datetime import datetime
 from coinmarketcap_service import CoinMarketCapService
+from holdings_store import HoldingsStore
+from response_cache import TTLCache
+from downsampling import downsample_indices
+from risk_analytics import compute_risk_metrics
 import yfinance as yf
 import pandas as pd
+import numpy as np
+
+class HistoryUnavailableError(Exception):
+    """Raised when the daily closes needed for a calculation could not be downloaded"""
 
 class PortfolioService:
     """
-    Service for managing user portfolio and calculating real-time value
+    Service for managing user portfolios and calculating real-time value
+    
+    Holdings live in the HoldingsStore; get_holdings() reads the default portfolio.
     """
     
-    def __init__(self, cmc_service: CoinMarketCapService):
+    def __init__(self, cmc_service: CoinMarketCapService, holdings_store: Optional[HoldingsStore] = None):
         self.cmc_service = cmc_service
-        # Hardcoded positions for demonstration
-        # In a real app, this would come from a database
-        self.holdings = [
-            {"symbol": "BTC", "quantity": 0.5, "avg_price": 65000.00},
-            {"symbol": "ETH", "quantity": 5.0, "avg_price": 3500.00},
-            {"symbol": "SOL", "quantity": 100.0, "avg_price": 120.00},
-            {"symbol": "AVAX", "quantity": 50.0, "avg_price": 35.00},
-            {"symbol": "DOT", "quantity": 200.0, "avg_price": 7.50}
-        ]
-        print("PortfolioService initialized with demo holdings")
+        self.store = holdings_store or HoldingsStore()
+        self.default_portfolio_id = HoldingsStore.DEFAULT_PORTFOLIO
+        # Daily closes per (tickers, yfinance period), refreshed incrementally once a day. Bounded,
+        # since /crypto/history adds a frame per symbol asked for; a frame's lock goes with it
+        # once no request holds or waits for it. Freshness is tracked by fetched_on, the TTL
+        # only ages out frames nobody asks for.
+        self._history_locks: Dict[tuple, asyncio.Lock] = {}
+        self._history_lock_users: Dict[tuple, int] = {}
+        self._history_frames = TTLCache(
+            max_entries=int(os.getenv("HISTORY_MAX_FRAMES", "128")),
+            default_ttl=7 * 86400,
+            on_evict=lambda key, _: self._drop_idle_history_lock(key)
+        )
+        self._history_version = 0
+        # Serialized history responses per series, period and resolution, with the frame version they came from
+        self._history_json = TTLCache(max_entries=256, default_ttl=86400)
+        # Risk metrics per portfolio and parameters, with the frame versions they came from
+        self._risk_metrics = TTLCache(max_entries=64, default_ttl=86400)
+        self.risk_benchmark = os.getenv("RISK_BENCHMARK_SYMBOL", "BTC").upper()
+        print(f"PortfolioService initialized with holdings store {self.store.path}")
+
+    async def get_holdings(self, portfolio_id: Optional[str] = None) -> List[Dict]:
+        """Positions of a portfolio (default: the default portfolio): [{symbol, quantity, avg_price, lots}]"""
+        return await asyncio.to_thread(self.store.get_positions, portfolio_id or self.default_portfolio_id)
 
-    async def calculate_portfolio_value(self) -> Dict:
+    async def get_realized_pl(self, portfolio_id: Optional[str] = None) -> float:
+        """Total realized P&L of a portfolio's imported sells (default: the default portfolio)"""
+        portfolio_id = portfolio_id or self.default_portfolio_id
+        return (await asyncio.to_thread(self.store.get_realized_pl, [portfolio_id]))[portfolio_id]
+
+    async def calculate_portfolio_value(self, portfolio_id: Optional[str] = None) -> Dict:
         """
         Calculate current portfolio value based on real-time prices
         
+        Args:
+            portfolio_id: Portfolio to value (default: the default portfolio)
+        
         Returns:
             Dictionary with total value, 24h change, and detailed positions
         """
+        portfolio_id = portfolio_id or self.default_portfolio_id
+        if not await asyncio.to_thread(self.store.portfolio_exists, portfolio_id):
+            raise ValueError(f"Portfolio '{portfolio_id}' does not exist")
         try:
-            # Get symbols list
-            symbols = [h["symbol"] for h in self.holdings]
-            
-            # Fetch current prices
-            prices_response = await self.cmc_service.get_multiple_prices(symbols)
-            
-            if not prices_response or not prices_response.get("success"):
+            valuations = await self.value_portfolios([portfolio_id])
+            if valuations is None:
                 # Fallback to mock data if API fails
                 print("Failed to fetch prices, using fallback data")
                 return self._get_fallback_data()
-            
-            market_data = prices_response["data"]
-            
-            total_value = 0.0
-            total_cost_basis = 0.0
-            positions = []
-            
-            for holding in self.holdings:
-                symbol = holding["symbol"]
-                quantity = holding["quantity"]
-                avg_price = holding["avg_price"]
-                
-                if symbol in market_data:
-                    data = market_data[symbol]
-                    current_price = data["price"]
-                    percent_change_24h = data["percent_change_24h"]
-                    
-                    position_value = quantity * current_price
-                    cost_basis = quantity * avg_price
-                    
-                    total_value += position_value
-                    total_cost_basis += cost_basis
-                    
-                    positions.append({
-                        "symbol": symbol,
-                        "quantity": quantity,
-                        "value": position_value,
-                        "current_price": current_price,
-                        "avg_price": avg_price,
-                        "percent_change_24h": percent_change_24h,
-                        "unrealized_pl": position_value - cost_basis,
-                        "unrealized_pl_percent": ((current_price - avg_price) / avg_price) * 100
-                    })
-            
-            # Calculate total portfolio change
-            total_unrealized_pl = total_value - total_cost_basis
-            total_change_percent = (total_unrealized_pl / total_cost_basis) * 100 if total_cost_basis > 0 else 0
-            
-            # Calculate 24h change (weighted average of individual 24h changes)
-            # This is an approximation. A more accurate way would be comparing to portfolio value 24h ago.
-            # For now, we'll use the weighted average of 24h percent changes.
-            weighted_change_sum = sum(p["percent_change_24h"] * p["value"] for p in positions)
-            total_change_24h = weighted_change_sum / total_value if total_value > 0 else 0
-            
-            return {
-                "total_value": total_value,
-                "total_change_24h": total_change_24h,
-                "total_unrealized_pl": total_unrealized_pl,
-                "total_change_percent": total_change_percent,
-                "positions": positions,
-                "last_updated": datetime.utcnow().isoformat() + "Z"
-            }
+            return valuations[portfolio_id]
             
         except Exception as e:
             print(f"Error calculating portfolio value: {e}")
             return self._get_fallback_data()
 
-    async def get_portfolio_history(self, period: str = '1Y') -> List[Dict]:
+    async def value_portfolios(self, portfolio_ids: List[str]) -> Optional[Dict[str, Dict]]:
         """
-        Get historical portfolio value based on current holdings
-        Note: This assumes constant holdings over time (simplified)
+        Value several portfolios with one batched quote lookup for all their symbols
+        
+        Returns:
+            Portfolio id -> valuation, or None if prices could not be fetched
+        """
+        positions = await asyncio.to_thread(self.store.get_positions_many, portfolio_ids)
+        realized = await asyncio.to_thread(self.store.get_realized_pl, portfolio_ids)
+        symbols = list(dict.fromkeys(h["symbol"] for holdings in positions.values() for h in holdings))
+        market_data: Dict[str, Dict] = {}
+        if symbols:
+            prices_response = await self.cmc_service.get_multiple_prices(symbols)
+            if not prices_response or not prices_response.get("success"):
+                return None
+            market_data = prices_response["data"]
+        return {
+            portfolio_id: self.value_holdings(market_data, holdings, realized[portfolio_id])
+            for portfolio_id, holdings in positions.items()
+        }
+
+    def value_holdings(self, market_data: Dict[str, Dict], holdings: List[Dict], realized_pl: float = 0.0) -> Dict:
+        """
+        Value holdings from already fetched prices, column-wise over NumPy arrays
         
         Args:
-            period: Time period (1M, 6M, YTD, 1Y, 5Y, MAX)
-            
+            market_data: Symbol -> price data, as returned by get_multiple_prices
+            holdings: Positions to value (see get_holdings)
+            realized_pl: Realized P&L of the portfolio's closed lots (see get_realized_pl)
+        
         Returns:
-            List of data points {date, value}
+            Dictionary with total value, 24h change, unrealized and realized P&L, and detailed positions
         """
-        try:
-            # Map period to yfinance format
-            period_map = {
-                '1M': '1mo',
-                '6M': '6mo',
-                'YTD': 'ytd',
-                '1Y': '1y',
-                '5Y': '5y',
-                'MAX': 'max'
+        # Positions without a price are left out, as before
+        priced = [h for h in holdings if h["symbol"] in market_data]
+        symbols = [h["symbol"] for h in priced]
+        quantities = np.array([h["quantity"] for h in priced], dtype=float)
+        avg_prices = np.array([h["avg_price"] for h in priced], dtype=float)
+        prices = np.array([market_data[s]["price"] for s in symbols], dtype=float)
+        changes_24h = np.array([market_data[s]["percent_change_24h"] for s in symbols], dtype=float)
+        
+        values = quantities * prices
+        cost_bases = quantities * avg_prices
+        unrealized = values - cost_bases
+        unrealized_pct = np.divide((prices - avg_prices) * 100, avg_prices, out=np.zeros_like(prices), where=avg_prices > 0)
+        
+        total_value = float(values.sum())
+        total_cost_basis = float(cost_bases.sum())
+        
+        # Calculate total portfolio change
+        total_unrealized_pl = total_value - total_cost_basis
+        total_change_percent = (total_unrealized_pl / total_cost_basis) * 100 if total_cost_basis > 0 else 0
+        
+        # Calculate 24h change (weighted average of individual 24h changes)
+        # This is an approximation. A more accurate way would be comparing to portfolio value 24h ago.
+        total_change_24h = float(changes_24h @ values) / total_value if total_value > 0 else 0
+        
+        columns = zip(symbols, quantities.tolist(), values.tolist(), prices.tolist(), avg_prices.tolist(),
+                      changes_24h.tolist(), unrealized.tolist(), unrealized_pct.tolist())
+        positions = [
+            {
+                "symbol": symbol,
+                "quantity": quantity,
+                "value": value,
+                "current_price": price,
+                "avg_price": avg_price,
+                "percent_change_24h": change_24h,
+                "unrealized_pl": pl,
+                "unrealized_pl_percent": pl_pct
             }
-            yf_period = period_map.get(period, '1y')
-            
-            # Prepare symbols for yfinance (append -USD for crypto)
-            tickers = [f"{h['symbol']}-USD" for h in self.holdings]
-            
-            # Fetch historical data in batch
+            for symbol, quantity, value, price, avg_price, change_24h, pl, pl_pct in columns
+        ]
+        
+        return {
+            "total_value": total_value,
+            "total_change_24h": total_change_24h,
+            "total_unrealized_pl": total_unrealized_pl,
+            "total_change_percent": total_change_percent,
+            "total_realized_pl": realized_pl,
+            "positions": positions,
+            "last_updated": datetime.utcnow().isoformat() + "Z"
+        }
+
+    # Portfolio history period -> yfinance period
+    PERIOD_MAP = {
+        '1M': '1mo',
+        '6M': '6mo',
+        'YTD': 'ytd',
+        '1Y': '1y',
+        '5Y': '5y',
+        'MAX': 'max'
+    }
+    # yfinance period -> how far back the cached frame is kept after an incremental refresh
+    PERIOD_OFFSETS = {
+        '1mo': pd.DateOffset(months=1),
+        '6mo': pd.DateOffset(months=6),
+        '1y': pd.DateOffset(years=1),
+        '5y': pd.DateOffset(years=5)
+    }
+
+    @staticmethod
+    def _download_closes(tickers: List[str], **kwargs) -> pd.DataFrame:
+        """Daily closes with one column per ticker (blocking; run in a thread)"""
+        hist_data = yf.download(tickers=tickers, interval="1d", progress=False, **kwargs)
+        if hist_data.empty:
+            return pd.DataFrame(columns=tickers)
+        # yfinance structure varies depending on number of tickers
+        if len(tickers) > 1 or isinstance(hist_data.columns, pd.MultiIndex):
+            closes = hist_data['Close']
+        else:
+            closes = hist_data[['Close']]
+            closes.columns = tickers
+        return closes.reindex(columns=tickers)
+
+    def _trim_to_period(self, closes: pd.DataFrame, yf_period: str) -> pd.DataFrame:
+        if closes.empty or yf_period == 'max':
+            return closes
+        today = pd.Timestamp.today().normalize()
+        cutoff = pd.Timestamp(year=today.year, month=1, day=1) if yf_period == 'ytd' else today - self.PERIOD_OFFSETS[yf_period]
+        if closes.index.tz is not None:
+            cutoff = cutoff.tz_localize(closes.index.tz)
+        return closes[closes.index >= cutoff]
+
+    async def _history_closes(self, tickers: List[str], yf_period: str) -> pd.DataFrame:
+        """Daily closes for tickers over yf_period (see _history_frame)"""
+        return (await self._history_frame(tickers, yf_period))["closes"]
+
+    async def _history_frame(self, tickers: List[str], yf_period: str) -> Dict:
+        """
+        Daily closes for tickers over yf_period with their version, cached per (tickers, period)
+
+        The first request downloads the whole period. Later days only download
+        bars from the last cached date on, replacing that date's (then partial) bar.
+        
+        Returns:
+            {"closes", "fetched_on", "version"}; version changes whenever the closes do
+        
+        Raises:
+            HistoryUnavailableError: The first download failed or returned no closes
+        """
+        key = (tuple(tickers), yf_period)
+        lock = self._history_locks.setdefault(key, asyncio.Lock())
+        # Counted rather than lock.locked(): right after a release the lock reads
+        # unlocked while the woken waiter has not taken it yet
+        self._history_lock_users[key] = self._history_lock_users.get(key, 0) + 1
+        try:
+            async with lock:
+                return await self._refresh_history_frame(key, tickers, yf_period)
+        finally:
+            self._history_lock_users[key] -= 1
+            if not self._history_lock_users[key]:
+                del self._history_lock_users[key]
+            # A failed first download leaves no frame; do not keep its lock around
+            if self._history_frames.get(key, allow_stale=True) is None:
+                self._drop_idle_history_lock(key)
+
+    def _drop_idle_history_lock(self, key: tuple):
+        """Forget a key's lock unless a request holds or waits for it"""
+        if key not in self._history_lock_users:
+            self._history_locks.pop(key, None)
+
+    async def _refresh_history_frame(self, key: tuple, tickers: List[str], yf_period: str) -> Dict:
+        today = datetime.now().date()
+        cached = self._history_frames.get(key, allow_stale=True)
+        if cached is not None and cached["fetched_on"] == today:
+            return cached
+
+        if cached is None:
             # Use asyncio.to_thread since yfinance is synchronous
-            hist_data = await asyncio.to_thread(
-                yf.download, 
-                tickers=tickers, 
-                period=yf_period, 
-                interval="1d", 
-                progress=False
-            )
-            
-            if hist_data.empty:
-                return []
-            
-            # Calculate portfolio value for each day
-            # hist_data['Close'] contains columns for each ticker
-            # Note: yfinance structure varies depending on number of tickers
-            # If multiple tickers, 'Close' is a DataFrame with columns as tickers
-            if len(tickers) > 1:
-                closes = hist_data['Close']
+            try:
+                closes = await asyncio.to_thread(self._download_closes, tickers, period=yf_period)
+            except Exception as e:
+                raise HistoryUnavailableError(f"Failed to download price history for {', '.join(tickers)}: {e}") from e
+            # yfinance reports failures as an empty frame; caching it would serve no history all day
+            if closes.empty:
+                raise HistoryUnavailableError(f"No price history returned for {', '.join(tickers)}")
+        else:
+            previous = cached["closes"]
+            last_date = previous.index[-1]
+            try:
+                recent = await asyncio.to_thread(self._download_closes, tickers, start=last_date.strftime("%Y-%m-%d"))
+            except Exception as e:
+                # Keep serving yesterday's frame; the next request retries
+                print(f"Error refreshing portfolio history: {e}")
+                return cached
+            if recent.empty:
+                closes = previous
             else:
-                closes = hist_data[['Close']]
-                closes.columns = tickers
-            
-            portfolio_history = []
-            
-            # Iterate through dates
-            for date, row in closes.iterrows():
-                daily_value = 0.0
-                valid_data = True
-                
-                for holding in self.holdings:
-                    symbol = holding['symbol']
-                    ticker = f"{symbol}-USD"
-                    quantity = holding['quantity']
-                    
-                    # Handle case where some tickers might be missing data for some dates
-                    val = 0
-                    if ticker in row and not pd.isna(row[ticker]):
-                        val = row[ticker]
-                    elif len(tickers) == 1 and not pd.isna(row.iloc[0]): # Single ticker case
-                         val = row.iloc[0]
-                         
-                    daily_value += val * quantity
-                
-                if daily_value > 0:
-                    portfolio_history.append({
-                        "date": date.strftime("%Y-%m-%d"),
-                        "value": daily_value
-                    })
-            
-            return portfolio_history
-            
+                closes = pd.concat([previous[previous.index < recent.index[0]], recent])
+            closes = self._trim_to_period(closes, yf_period)
+
+        frame = {"closes": closes, "fetched_on": today, "version": self._next_history_version()}
+        self._history_frames.set(key, frame)
+        return frame
+
+    def _next_history_version(self) -> int:
+        self._history_version += 1
+        return self._history_version
+
+    @staticmethod
+    def _series_json(dates: pd.DatetimeIndex, values: np.ndarray, field: str, max_points: Optional[int], method: str) -> str:
+        """Serialize a dated series as [{date, field}], downsampled to max_points if longer"""
+        if max_points and len(values) > max_points:
+            x = dates.to_numpy(dtype="datetime64[ns]").astype(np.int64).astype(float)
+            keep = downsample_indices(x, values, max_points, method)
+            dates, values = dates[keep], values[keep]
+        series = pd.DataFrame({"date": dates.strftime("%Y-%m-%d"), field: values})
+        return series.to_json(orient="records", double_precision=10)
+
+    async def get_portfolio_history_json(self, period: str = '1Y', max_points: Optional[int] = None, method: str = "lttb") -> str:
+        """
+        Get historical portfolio value as a JSON array of {date, value}
+        
+        Valued as one product of the forward-filled close matrix and the
+        holding quantities. With max_points, long series are downsampled
+        (LTTB or min/max buckets) to about what a chart can draw. The serialized
+        response is cached per period and resolution until the closes or the
+        holdings change.
+        """
+        try:
+            yf_period = self.PERIOD_MAP.get(period, '1y')
+            # Prepare symbols for yfinance (append -USD for crypto)
+            holdings = await self.get_holdings()
+            tickers = [f"{h['symbol']}-USD" for h in holdings]
+            quantities = np.array([h['quantity'] for h in holdings], dtype=float)
+            if not tickers:
+                return "[]"
+
+            frame = await self._history_frame(tickers, yf_period)
+            closes, version = frame["closes"], frame["version"]
+            response_key = ("portfolio", tuple(tickers), yf_period, tuple(quantities), max_points, method)
+            cached = self._history_json.get(response_key)
+            if cached is not None and cached[0] == version:
+                return cached[1]
+
+            if closes.empty:
+                return "[]"
+            # Carry the last close over days a ticker did not trade; before a ticker's first close it counts as 0
+            prices = closes.ffill().fillna(0.0).to_numpy(dtype=float)
+            values = prices @ quantities
+            has_value = values > 0
+            payload = self._series_json(closes.index[has_value], values[has_value], "value", max_points, method)
+            self._history_json.set(response_key, (version, payload))
+            return payload
+
         except Exception as e:
             print(f"Error fetching portfolio history: {e}")
             import traceback
             traceback.print_exc()
-            return []
+            return "[]"
+
+    async def get_portfolio_history(self, period: str = '1Y', max_points: Optional[int] = None) -> List[Dict]:
+        """
+        Get historical portfolio value based on current holdings
+        Note: This assumes constant holdings over time (simplified)
+        
+        Args:
+            period: Time period (1M, 6M, YTD, 1Y, 5Y, MAX)
+            max_points: Downsample to at most this many points
+            
+        Returns:
+            List of data points {date, value}
+        """
+        return json.loads(await self.get_portfolio_history_json(period, max_points))
+
+    async def get_price_history_json(self, symbol: str, period: str = '1Y', max_points: Optional[int] = None, method: str = "lttb") -> str:
+        """
+        Get daily closes of one crypto symbol as a JSON array of {date, close}
+        
+        Shares the cached yfinance frames and downsampling of the portfolio history.
+        """
+        try:
+            yf_period = self.PERIOD_MAP.get(period, '1y')
+            tickers = [f"{symbol.upper()}-USD"]
+            frame = await self._history_frame(tickers, yf_period)
+            closes, version = frame["closes"], frame["version"]
+            response_key = ("price", tickers[0], yf_period, max_points, method)
+            cached = self._history_json.get(response_key)
+            if cached is not None and cached[0] == version:
+                return cached[1]
+
+            series = closes[tickers[0]].dropna()
+            payload = self._series_json(series.index, series.to_numpy(dtype=float), "close", max_points, method)
+            self._history_json.set(response_key, (version, payload))
+            return payload
+
+        except Exception as e:
+            print(f"Error fetching price history for {symbol}: {e}")
+            return "[]"
+
+    async def get_risk_metrics(
+        self,
+        portfolio_id: Optional[str] = None,
+        period: str = '1Y',
+        confidence: float = 0.95,
+        window: int = 30
+    ) -> Dict:
+        """
+        Get volatility, VaR/CVaR, correlation, beta and risk contributions of a portfolio
+        
+        Computed in one vectorized pass over the cached daily closes of the
+        holdings (and the benchmark, RISK_BENCHMARK_SYMBOL), and memoized until
+        the next daily bar arrives or the holdings change.
+        
+        Raises:
+            ValueError: Unknown portfolio, or not enough priced history
+            HistoryUnavailableError: The holdings' closes could not be downloaded
+        """
+        portfolio_id = portfolio_id or self.default_portfolio_id
+        if not await asyncio.to_thread(self.store.portfolio_exists, portfolio_id):
+            raise ValueError(f"Portfolio '{portfolio_id}' does not exist")
+
+        yf_period = self.PERIOD_MAP.get(period, '1y')
+        holdings = [h for h in await self.get_holdings(portfolio_id) if h['quantity'] > 0]
+        if not holdings:
+            raise ValueError(f"Portfolio '{portfolio_id}' has no holdings")
+        tickers = [f"{h['symbol']}-USD" for h in holdings]
+        quantities = np.array([h['quantity'] for h in holdings], dtype=float)
+        benchmark_ticker = f"{self.risk_benchmark}-USD"
+
+        # Same frames as the history endpoints, so charts and risk share one download per day
+        frame = await self._history_frame(tickers, yf_period)
+        closes = frame["closes"]
+        try:
+            benchmark_frame = await self._history_frame([benchmark_ticker], yf_period)
+            benchmark = benchmark_frame["closes"][benchmark_ticker]
+            benchmark_version = benchmark_frame["version"]
+        except Exception as e:
+            # Everything but beta can still be computed
+            print(f"Error fetching {benchmark_ticker} history, skipping beta: {e}")
+            benchmark, benchmark_version = None, None
+        if benchmark is not None and benchmark.dropna().empty:
+            benchmark = None
+        versions = (frame["version"], benchmark_version)
+        response_key = ("risk", portfolio_id, tuple(tickers), tuple(quantities), yf_period, confidence, window)
+        cached = self._risk_metrics.get(response_key)
+        if cached is not None and cached[0] == versions:
+            return cached[1]
+
+        # Holdings yfinance has no closes for are left out and reported
+        priced = closes.notna().any(axis=0).to_numpy()
+        if not priced.any():
+            raise ValueError("No price history for the portfolio holdings")
+        symbols = [h['symbol'] for h in holdings]
+        metrics = await asyncio.to_thread(
+            compute_risk_metrics,
+            closes.loc[:, priced],
+            [s for s, ok in zip(symbols, priced) if ok],
+            quantities[priced],
+            benchmark.rename(self.risk_benchmark) if benchmark is not None else None,
+            confidence,
+            window
+        )
+        metrics.update({
+            "portfolio_id": portfolio_id,
+            "period": period,
+            "as_of": closes.index[-1].strftime("%Y-%m-%d"),
+            "missing_symbols": [s for s, ok in zip(symbols, priced) if not ok]
+        })
+        if benchmark_version is not None:
+            # Without the benchmark, retry it on the next request rather than serving no beta all day
+            self._risk_metrics.set(response_key, (versions, metrics))
+        return metrics
 
     def _get_fallback_data(self) -> Dict:
         """Return mock data if calculation fails"""
@@ -192,5 +453,6 @@ class PortfolioService:
                 {"symbol": "ETH", "quantity": 5.0, "value": 15000.00},
                 {"symbol": "SOL", "quantity": 100.0, "value": 12000.00}
             ],
-            "last_updated": datetime.utcnow().isoformat() + "Z"
+            "last_updated": datetime.utcnow().isoformat() + "Z",
+            "is_fallback": True
         }
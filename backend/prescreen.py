@@ -0,0 +1,165 @@
+"""
+Rule-Based Analysis Pre-Screen
+Decides locally whether a performance update is material enough to need an LLM review
+"""
+
+import os
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+from models import PerformanceData, AnalysisResult
+
+class PreScreen:
+    """
+    Deterministic fast path in front of the LLM strategy analysis.
+
+    For each strategy it keeps a baseline taken at the last LLM review. A new
+    performance update is escalated to the LLM only when a threshold is crossed
+    relative to that baseline:
+      - drawdown from the peak equity seen since the review
+      - equity (P&L) change since the review
+      - win rate change since the review
+      - time since the review (measured on record timestamps, so backfills behave
+        the same as live data)
+      - a trade signal (position change)
+    Otherwise the update gets a local "keep".
+    """
+
+    # Signals that leave the position unchanged
+    QUIET_SIGNALS = ("HOLD", "NONE")
+
+    def __init__(
+        self,
+        enabled: Optional[bool] = None,
+        max_drawdown_pct: Optional[float] = None,
+        max_equity_change_pct: Optional[float] = None,
+        max_win_rate_change: Optional[float] = None,
+        max_review_interval_seconds: Optional[float] = None,
+        reference_capital: Optional[float] = None
+    ):
+        self.enabled = enabled if enabled is not None else os.getenv("PRESCREEN_ENABLED", "true").lower() == "true"
+        self.max_drawdown_pct = max_drawdown_pct if max_drawdown_pct is not None else float(os.getenv("PRESCREEN_MAX_DRAWDOWN_PCT", "0.03"))
+        self.max_equity_change_pct = max_equity_change_pct if max_equity_change_pct is not None else float(os.getenv("PRESCREEN_MAX_EQUITY_CHANGE_PCT", "0.02"))
+        self.max_win_rate_change = max_win_rate_change if max_win_rate_change is not None else float(os.getenv("PRESCREEN_MAX_WIN_RATE_CHANGE", "0.1"))
+        self.max_review_interval_seconds = max_review_interval_seconds if max_review_interval_seconds is not None else float(os.getenv("PRESCREEN_MAX_REVIEW_INTERVAL_SECONDS", "3600"))
+        # Equity base used when a record carries no portfolio value
+        self.reference_capital = reference_capital if reference_capital is not None else float(os.getenv("PRESCREEN_REFERENCE_CAPITAL", "10000"))
+
+        # strategy_id -> baseline at the last LLM review
+        self.baselines: Dict[str, Dict[str, Any]] = {}
+
+        # Statistics
+        self.ticks = 0
+        self.short_circuited = 0
+        self.escalated = 0
+        self.escalations_by_reason: Dict[str, int] = {}
+        self.fallbacks = 0
+
+    def _snapshot(self, performance: PerformanceData, portfolio_metrics: Optional[dict]) -> Dict[str, Any]:
+        portfolio_metrics = portfolio_metrics or {}
+        equity = portfolio_metrics.get("portfolio_value")
+        if equity is None:
+            equity = self.reference_capital + performance.pnl_realized + performance.pnl_unrealized
+        # Compare in aware UTC; naive timestamps are local time, as the generators write them
+        try:
+            at = datetime.fromisoformat(performance.timestamp).astimezone(timezone.utc)
+        except ValueError:
+            at = datetime.now(timezone.utc)
+        return {
+            "equity": float(equity),
+            "win_rate": portfolio_metrics.get("win_rate"),
+            "at": at
+        }
+
+    def _check(self, strategy_id: str, performance: PerformanceData, portfolio_metrics: Optional[dict]) -> Optional[str]:
+        """Update the strategy's peak and return the first crossed threshold, if any"""
+        baseline = self.baselines.get(strategy_id)
+        if baseline is None:
+            return "no_baseline"
+
+        current = self._snapshot(performance, portfolio_metrics)
+        baseline["peak_equity"] = max(baseline["peak_equity"], current["equity"])
+
+        if performance.signal.upper() not in self.QUIET_SIGNALS:
+            return "trade_signal"
+        if baseline["peak_equity"] > 0 and (baseline["peak_equity"] - current["equity"]) / baseline["peak_equity"] >= self.max_drawdown_pct:
+            return "drawdown"
+        if baseline["equity"] > 0 and abs(current["equity"] - baseline["equity"]) / baseline["equity"] >= self.max_equity_change_pct:
+            return "pnl_change"
+        if current["win_rate"] is not None and baseline["win_rate"] is not None \
+                and abs(current["win_rate"] - baseline["win_rate"]) >= self.max_win_rate_change:
+            return "win_rate_change"
+        if (current["at"] - baseline["at"]).total_seconds() >= self.max_review_interval_seconds:
+            return "review_interval"
+        return None
+
+    def screen(self, strategy_id: str, records: List[Dict[str, Any]]) -> Optional[str]:
+        """
+        Screen one or more performance records (oldest first) of a strategy
+
+        Returns:
+            The reason to escalate to the LLM, or None if a local keep is enough
+        """
+        self.ticks += len(records)
+        if not self.enabled:
+            reason = "disabled"
+        else:
+            reason = None
+            for record in records:
+                reason = self._check(strategy_id, record['performance'], record.get('portfolio_metrics')) or reason
+
+        if reason is None:
+            self.short_circuited += len(records)
+        else:
+            self.escalated += len(records)
+            self.escalations_by_reason[reason] = self.escalations_by_reason.get(reason, 0) + len(records)
+        return reason
+
+    def record_review(self, strategy_id: str, performance: PerformanceData, portfolio_metrics: Optional[dict] = None):
+        """Reset the strategy's baseline after an LLM review"""
+        snapshot = self._snapshot(performance, portfolio_metrics)
+        snapshot["peak_equity"] = snapshot["equity"]
+        self.baselines[strategy_id] = snapshot
+
+    def local_keep(self, strategy_id: str) -> AnalysisResult:
+        """Build the keep result returned when the LLM review is skipped"""
+        baseline = self.baselines[strategy_id]
+        return AnalysisResult(
+            action="keep",
+            feedback=(
+                "No material change since the last full review at "
+                f"{baseline['at'].isoformat(timespec='seconds')}: drawdown, P&L and win rate are within "
+                "thresholds and no trade was signaled. Keeping current strategy."
+            ),
+            new_strategy=None
+        )
+
+    def fallback_keep(self, reason: str) -> AnalysisResult:
+        """Build the keep result returned when a review is needed but the LLM is unavailable"""
+        self.fallbacks += 1
+        return AnalysisResult(
+            action="keep",
+            feedback=(
+                f"Full review needed ({reason.replace('_', ' ')}) but the AI analyst is temporarily "
+                "unavailable. Keeping current strategy until it can be reviewed."
+            ),
+            new_strategy=None
+        )
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get pre-screen statistics"""
+        return {
+            "enabled": self.enabled,
+            "thresholds": {
+                "max_drawdown_pct": self.max_drawdown_pct,
+                "max_equity_change_pct": self.max_equity_change_pct,
+                "max_win_rate_change": self.max_win_rate_change,
+                "max_review_interval_seconds": self.max_review_interval_seconds
+            },
+            "ticks": self.ticks,
+            "short_circuited": self.short_circuited,
+            "escalated": self.escalated,
+            "short_circuit_rate": round(self.short_circuited / self.ticks, 3) if self.ticks else 0.0,
+            "escalations_by_reason": dict(self.escalations_by_reason),
+            "llm_unavailable_fallbacks": self.fallbacks,
+            "tracked_strategies": len(self.baselines)
+        }
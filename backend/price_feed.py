@@ -0,0 +1,211 @@
+"""
+Live Price Feed
+Polls quotes once per subscribed symbol set and pushes quote and portfolio deltas over the websocket
+"""
+
+import os
+import asyncio
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Set
+from fastapi import WebSocket
+from credit_budget import background_priority
+from websocket_manager import websocket_manager
+
+# Subscription key of the portfolio feed: the holdings' symbols, plus their valuation
+PORTFOLIO = "portfolio"
+
+class FeedPoller:
+    """One polling loop and its subscribers, shared by every client asking for the same symbols"""
+
+    def __init__(self, key):
+        self.key = key
+        self.subscribers: Set[WebSocket] = set()
+        self.quotes: Dict[str, Dict] = {}
+        self.portfolio: Optional[Dict] = None
+        # Holdings the portfolio was last valued with
+        self.holdings: Optional[List[Dict]] = None
+        self.task: Optional[asyncio.Task] = None
+
+class PriceFeed:
+    """
+    Server-push replacement for dashboard polling.
+
+    Clients send {"type": "subscribe_prices", "symbols": [...]} or
+    {"type": "subscribe_prices", "portfolio": true} over /ws. Each distinct
+    symbol set gets one poller, so upstream load depends on the number of
+    distinct sets, not on the number of viewers. The portfolio is revalued when
+    a quote or a holding changed. After a full snapshot on subscribe, clients only
+    receive what changed: "price_update" with changed quotes and
+    "portfolio_update" with changed totals and positions.
+    """
+
+    def __init__(self, cmc_service, portfolio_service=None, manager=websocket_manager):
+        self.cmc_service = cmc_service
+        self.portfolio_service = portfolio_service
+        self.manager = manager
+        self.interval_seconds = float(os.getenv("PRICE_FEED_INTERVAL_SECONDS", "10"))
+        self._pollers: Dict[Any, FeedPoller] = {}
+        self._client_keys: Dict[WebSocket, Any] = {}
+
+        # Statistics
+        self.polls = 0
+        self.failed_polls = 0
+        self.unchanged_polls = 0
+        self.price_updates = 0
+        self.portfolio_updates = 0
+        self.messages_sent = 0
+
+    async def subscribe(self, websocket: WebSocket, symbols: Optional[List[str]] = None, portfolio: bool = False):
+        """Subscribe a client to a symbol set or the portfolio, replacing its previous subscription"""
+        if portfolio:
+            if self.portfolio_service is None:
+                await self.manager.send_json({"type": "feed_error", "error": "Portfolio service unavailable"}, websocket)
+                return
+            key = PORTFOLIO
+        else:
+            key = frozenset(s.strip().upper() for s in symbols or [] if s.strip())
+            if not key:
+                await self.manager.send_json({"type": "feed_error", "error": "No symbols to subscribe to"}, websocket)
+                return
+
+        self.unsubscribe(websocket)
+        poller = self._pollers.get(key)
+        if poller is None:
+            poller = FeedPoller(key)
+            self._pollers[key] = poller
+            poller.task = asyncio.create_task(self._run(poller))
+        poller.subscribers.add(websocket)
+        self._client_keys[websocket] = key
+
+        await self.manager.send_json({
+            "type": "subscribed",
+            "portfolio": key == PORTFOLIO,
+            "symbols": None if key == PORTFOLIO else sorted(key),
+            "interval_seconds": self.interval_seconds
+        }, websocket)
+        # Late joiners get the current state now; the first subscriber gets it from the first poll
+        for message in self._snapshot_messages(poller):
+            await self.manager.send_json(message, websocket)
+
+    def unsubscribe(self, websocket: WebSocket):
+        """Drop a client's subscription, stopping its poller if nobody else uses it"""
+        key = self._client_keys.pop(websocket, None)
+        poller = self._pollers.get(key)
+        if poller is None:
+            return
+        poller.subscribers.discard(websocket)
+        if not poller.subscribers:
+            del self._pollers[key]
+            if poller.task is not None:
+                poller.task.cancel()
+
+    async def stop(self):
+        """Stop every poller"""
+        tasks = [poller.task for poller in self._pollers.values() if poller.task is not None]
+        self._pollers.clear()
+        self._client_keys.clear()
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _run(self, poller: FeedPoller):
+        while True:
+            try:
+                # Feed refreshes must not starve interactive requests of API credits
+                with background_priority():
+                    await self._poll(poller)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Error in price feed poller: {e}")
+            await asyncio.sleep(self.interval_seconds)
+
+    async def _poll(self, poller: FeedPoller):
+        self.polls += 1
+        holdings = await self.portfolio_service.get_holdings() if poller.key == PORTFOLIO else None
+        symbols = [h["symbol"] for h in holdings] if holdings is not None else sorted(poller.key)
+        response = await self.cmc_service.get_multiple_prices(symbols)
+        if not response or not response.get("success"):
+            self.failed_polls += 1
+            return
+
+        quotes = response["data"]
+        full = not poller.quotes
+        changed = {symbol: quote for symbol, quote in quotes.items() if poller.quotes.get(symbol) != quote}
+        poller.quotes.update(quotes)
+
+        messages = []
+        if changed:
+            self.price_updates += 1
+            messages.append(self._price_message(changed, full))
+        # Added, removed or edited holdings are pushed even when no quote moved
+        if poller.key == PORTFOLIO and (changed or holdings != poller.holdings):
+            realized_pl = await self.portfolio_service.get_realized_pl()
+            valuation = self.portfolio_service.value_holdings(poller.quotes, holdings, realized_pl)
+            delta = self._portfolio_delta(poller.portfolio, valuation)
+            first_valuation = poller.portfolio is None
+            poller.portfolio = valuation
+            poller.holdings = holdings
+            if delta is not None:
+                self.portfolio_updates += 1
+                messages.append(self._portfolio_message(delta, first_valuation))
+        if not messages:
+            self.unchanged_polls += 1
+
+        subscribers = list(poller.subscribers)
+        for message in messages:
+            self.messages_sent += await self.manager.send_json_to(message, subscribers)
+        # Connections the manager dropped while sending
+        for websocket in subscribers:
+            if websocket not in self.manager.active_connections:
+                self.unsubscribe(websocket)
+
+    @staticmethod
+    def _price_message(quotes: Dict[str, Dict], full: bool) -> Dict[str, Any]:
+        return {"type": "price_update", "timestamp": datetime.now().isoformat(), "full": full, "data": quotes}
+
+    @staticmethod
+    def _portfolio_message(data: Dict[str, Any], full: bool) -> Dict[str, Any]:
+        return {"type": "portfolio_update", "timestamp": datetime.now().isoformat(), "full": full, "data": data}
+
+    @staticmethod
+    def _portfolio_delta(previous: Optional[Dict], current: Dict) -> Optional[Dict]:
+        """Changed totals and positions between two valuations, or None if nothing changed"""
+        if previous is None:
+            return current
+        delta = {
+            field: value for field, value in current.items()
+            if field not in ("positions", "last_updated") and previous.get(field) != value
+        }
+        previous_positions = {p["symbol"]: p for p in previous.get("positions", [])}
+        current_symbols = {p["symbol"] for p in current.get("positions", [])}
+        changed_positions = [p for p in current.get("positions", []) if previous_positions.get(p["symbol"]) != p]
+        removed_positions = [symbol for symbol in previous_positions if symbol not in current_symbols]
+        if not delta and not changed_positions and not removed_positions:
+            return None
+        delta["positions"] = changed_positions
+        delta["removed_positions"] = removed_positions
+        delta["last_updated"] = current["last_updated"]
+        return delta
+
+    def _snapshot_messages(self, poller: FeedPoller) -> List[Dict[str, Any]]:
+        messages = []
+        if poller.quotes:
+            messages.append(self._price_message(dict(poller.quotes), True))
+        if poller.portfolio is not None:
+            messages.append(self._portfolio_message(poller.portfolio, True))
+        return messages
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get feed statistics"""
+        return {
+            "interval_seconds": self.interval_seconds,
+            "pollers": len(self._pollers),
+            "subscribers": len(self._client_keys),
+            "polls": self.polls,
+            "failed_polls": self.failed_polls,
+            "unchanged_polls": self.unchanged_polls,
+            "price_updates": self.price_updates,
+            "portfolio_updates": self.portfolio_updates,
+            "messages_sent": self.messages_sent
+        }
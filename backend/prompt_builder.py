@@ -0,0 +1,118 @@
+"""
+Prompt Builder with Token Budgeting
+Serializes prompt context compactly, counts tokens locally and trims low-value sections to fit a budget
+"""
+
+import json
+import math
+from typing import Any, Dict, List, Optional, Tuple
+
+try:
+    import tiktoken
+    _encoding = tiktoken.get_encoding("cl100k_base")
+except Exception:
+    # tiktoken is optional; fall back to the ~4 characters per token rule of thumb
+    _encoding = None
+
+def count_tokens(text: str) -> int:
+    """Count tokens in text (exact with tiktoken installed, estimated otherwise)"""
+    if not text:
+        return 0
+    if _encoding is not None:
+        return len(_encoding.encode(text))
+    return math.ceil(len(text) / 4)
+
+def _compact_value(value: Any, float_digits: int) -> Any:
+    if isinstance(value, float):
+        return round(value, float_digits)
+    if isinstance(value, dict):
+        return {k: _compact_value(v, float_digits) for k, v in value.items() if v is not None}
+    if isinstance(value, (list, tuple)):
+        return [_compact_value(v, float_digits) for v in value]
+    return value
+
+def compact_json(data: Any, float_digits: int = 4) -> str:
+    """
+    Serialize data without whitespace, dropping null fields and rounding floats
+    """
+    return json.dumps(_compact_value(data, float_digits), separators=(',', ':'), default=str)
+
+class PromptBuilder:
+    """
+    Assembles a prompt from named sections and enforces a token budget.
+
+    Sections are emitted in insertion order. When the prompt is over budget,
+    optional sections are trimmed lowest priority first: each one is truncated
+    to whatever still fits, or dropped if nothing useful fits.
+    """
+
+    def __init__(self, budget_tokens: int):
+        self.budget_tokens = budget_tokens
+        self.sections: List[Dict[str, Any]] = []
+
+    def add(self, name: str, text: str, priority: int = 0, required: bool = False) -> "PromptBuilder":
+        """
+        Add a section
+
+        Args:
+            name: Section name (reported in build stats)
+            text: Section text
+            priority: Higher priority sections are trimmed last
+            required: Never trim this section
+        """
+        if text:
+            self.sections.append({
+                "name": name,
+                "text": text,
+                "priority": priority,
+                "required": required,
+                "tokens": count_tokens(text)
+            })
+        return self
+
+    @staticmethod
+    def _truncate(text: str, max_tokens: int) -> Optional[str]:
+        """Cut text down to roughly max_tokens, or None if too little would remain"""
+        if max_tokens < 16:
+            return None
+        # Shrink proportionally, then tighten until it fits
+        cut = int(len(text) * max_tokens / max(1, count_tokens(text)))
+        while cut > 0 and count_tokens(text[:cut]) + 1 > max_tokens:
+            cut = int(cut * 0.9)
+        return text[:cut].rstrip() + "…" if cut > 0 else None
+
+    def build(self) -> Tuple[str, Dict[str, Any]]:
+        """
+        Returns:
+            (prompt, stats) where stats lists token counts and trimmed sections
+        """
+        total = sum(s["tokens"] for s in self.sections)
+        trimmed = []
+
+        optional = sorted(
+            (s for s in self.sections if not s["required"]),
+            key=lambda s: s["priority"]
+        )
+        for section in optional:
+            if total <= self.budget_tokens:
+                break
+            overflow = total - self.budget_tokens
+            truncated = self._truncate(section["text"], section["tokens"] - overflow)
+            total -= section["tokens"]
+            if truncated is None:
+                section["text"] = ""
+                section["tokens"] = 0
+                trimmed.append({"section": section["name"], "action": "dropped"})
+            else:
+                section["text"] = truncated
+                section["tokens"] = count_tokens(truncated)
+                trimmed.append({"section": section["name"], "action": "truncated"})
+            total += section["tokens"]
+
+        prompt = "\n\n".join(s["text"] for s in self.sections if s["text"])
+        return prompt, {
+            "prompt_tokens": count_tokens(prompt),
+            "budget_tokens": self.budget_tokens,
+            "sections": {s["name"]: s["tokens"] for s in self.sections},
+            "trimmed": trimmed
+        }
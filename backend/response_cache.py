@@ -0,0 +1,86 @@
+"""
+Response Cache
+In-memory LRU cache with per-entry TTL and hit-rate statistics
+"""
+
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional
+
+class TTLCache:
+    """
+    LRU cache whose entries expire after a per-entry TTL.
+
+    Expired entries are not returned by get() but stay in the cache until
+    evicted, so callers can still fall back to them with allow_stale=True.
+    on_evict(key, value) is called for entries dropped to stay within max_entries.
+    """
+
+    def __init__(self, max_entries: int = 512, default_ttl: float = 300.0, on_evict: Optional[Callable[[Hashable, Any], None]] = None):
+        self.max_entries = max_entries
+        self.default_ttl = default_ttl
+        self.on_evict = on_evict
+        # key -> (value, stored_at, expires_at)
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+
+        # Statistics
+        self.hits = 0
+        self.misses = 0
+        self.stale_hits = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable, allow_stale: bool = False) -> Optional[Any]:
+        """
+        Get a cached value, or None if missing (or expired, unless allow_stale)
+        """
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        value, _, expires_at = entry
+        if time.monotonic() >= expires_at:
+            if allow_stale:
+                self.stale_hits += 1
+                return value
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def age(self, key: Hashable) -> Optional[float]:
+        """Seconds since the entry for key was stored"""
+        entry = self._entries.get(key)
+        return time.monotonic() - entry[1] if entry else None
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None):
+        """Store a value, evicting the least recently used entries beyond max_entries"""
+        now = time.monotonic()
+        self._entries[key] = (value, now, now + (self.default_ttl if ttl is None else ttl))
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            evicted_key, (evicted_value, _, _) = self._entries.popitem(last=False)
+            self.evictions += 1
+            if self.on_evict is not None:
+                self.on_evict(evicted_key, evicted_value)
+
+    def invalidate(self, key: Hashable):
+        self._entries.pop(key, None)
+
+    def clear(self):
+        self._entries.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get cache statistics"""
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "stale_hits": self.stale_hits,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0
+        }
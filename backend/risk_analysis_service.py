@@ -0,0 +1,209 @@
+"""
+Portfolio Risk Analysis Service
+Keeps a precomputed AI risk summary of the portfolio fresh in the background
+"""
+
+import os
+import time
+import asyncio
+import datetime
+from typing import Any, Dict, Optional
+from models import Strategy, RiskProfile
+from credit_budget import background_priority
+
+class RiskAnalysisService:
+    """
+    Precomputes the portfolio risk summary so requests never wait on the LLM.
+
+    A background loop checks the portfolio every check_interval_seconds and
+    refreshes the summary when it is older than refresh_interval_seconds, when
+    holdings change, or when any position's price has moved by more than
+    price_move_threshold_pct since the summary was computed. Mock valuations
+    served while prices are unavailable never count as a change.
+    """
+
+    FALLBACK_ANALYSIS = "Market volatility remains high. Diversification recommended."
+
+    def __init__(self, trading_agent, portfolio_service):
+        self.trading_agent = trading_agent
+        self.portfolio_service = portfolio_service
+        self.refresh_interval_seconds = float(os.getenv("RISK_ANALYSIS_REFRESH_SECONDS", "900"))
+        self.check_interval_seconds = float(os.getenv("RISK_ANALYSIS_CHECK_SECONDS", "60"))
+        self.price_move_threshold_pct = float(os.getenv("RISK_ANALYSIS_PRICE_MOVE_PCT", "2.0"))
+
+        self.latest: Optional[Dict[str, Any]] = None
+        # Holdings and prices the latest summary was computed from (None until real prices are seen)
+        self._basis: Optional[Dict[str, Dict[str, float]]] = None
+        self._refresh_lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+
+        # Statistics
+        self.refreshes_by_trigger: Dict[str, int] = {}
+        self.refresh_errors = 0
+
+        # Strategy object required by the chat method
+        self._risk_strategy = Strategy(
+            strategy_id="portfolio_risk",
+            name="Portfolio Risk Analysis",
+            description="AI-powered portfolio risk analysis",
+            risk_profile=RiskProfile(
+                max_position_pct=100.0,
+                stop_loss_pct=0.0,
+                take_profit_pct=0.0
+            ),
+            logic=[]
+        )
+
+    def start(self):
+        """Start the background refresh loop"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+            print("🛡️ Risk analysis background refresh started")
+
+    async def stop(self):
+        """Stop the background refresh loop"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            try:
+                # Price lookups from the loop must not starve user requests of API credits
+                with background_priority():
+                    await self.check_and_refresh()
+            except Exception as e:
+                print(f"Error in risk analysis refresh loop: {e}")
+            await asyncio.sleep(self.check_interval_seconds)
+
+    @staticmethod
+    def _positions_basis(portfolio_value: Dict) -> Dict[str, Dict[str, float]]:
+        return {
+            p["symbol"]: {"quantity": p.get("quantity", 0.0), "price": p.get("current_price", 0.0)}
+            for p in portfolio_value.get("positions", [])
+        }
+
+    def _refresh_trigger(self, portfolio_value: Dict) -> Optional[str]:
+        """Return why the summary needs a refresh, or None if it is still current"""
+        if self.latest is None:
+            return "initial"
+        if self.latest["is_fallback"]:
+            return "retry"
+        if time.monotonic() - self.latest["_computed_at"] >= self.refresh_interval_seconds:
+            return "scheduled"
+        if portfolio_value.get("is_fallback") or self._basis is None:
+            # Nothing real to compare
+            return None
+
+        basis = self._positions_basis(portfolio_value)
+        if {s: b["quantity"] for s, b in basis.items()} != {s: b["quantity"] for s, b in self._basis.items()}:
+            return "holdings_changed"
+        for symbol, current in basis.items():
+            previous_price = self._basis[symbol]["price"]
+            if previous_price and abs(current["price"] - previous_price) / previous_price * 100 >= self.price_move_threshold_pct:
+                return "price_move"
+        return None
+
+    async def check_and_refresh(self):
+        """Refresh the summary if it is stale or the portfolio moved materially"""
+        portfolio_value = await self.portfolio_service.calculate_portfolio_value()
+        trigger = self._refresh_trigger(portfolio_value)
+        if trigger:
+            await self.refresh(trigger, portfolio_value)
+        elif self._basis is None and not portfolio_value.get("is_fallback"):
+            # First real prices since a summary computed on fallback data
+            self._basis = self._positions_basis(portfolio_value)
+
+    async def refresh(self, trigger: str = "manual", portfolio_value: Optional[Dict] = None):
+        """
+        Recompute the risk summary
+
+        Concurrent refreshes are coalesced: a caller that waited for a refresh
+        started after its own request reuses that result.
+        """
+        requested_at = time.monotonic()
+        async with self._refresh_lock:
+            if self.latest is not None and self.latest["_computed_at"] >= requested_at:
+                return
+            if self.latest is not None and not self.trading_agent.gateway.available():
+                # LLM provider unhealthy: keep the last good summary rather than an error message
+                return
+
+            started = time.monotonic()
+            if portfolio_value is None:
+                portfolio_value = await self.portfolio_service.calculate_portfolio_value()
+            # The prompt names the stored holdings, never the mock positions of a fallback valuation
+            positions = await asyncio.to_thread(
+                self.portfolio_service.store.get_positions, self.portfolio_service.default_portfolio_id
+            )
+            holdings_str = ", ".join(p["symbol"] for p in positions)
+
+            is_fallback = False
+            try:
+                prompt = f"Analyze the market risk for a crypto portfolio containing: {holdings_str}. Focus on recent market news and volatility. Provide a concise 1-2 sentence risk summary."
+                # Always a fresh completion; failures raise instead of returning error text
+                analysis = await self.trading_agent.chat(
+                    message=prompt,
+                    strategy=self._risk_strategy,
+                    market="crypto",
+                    include_market_data=True,
+                    include_web_search=True,
+                    use_cache=False,
+                    raise_on_error=True
+                )
+            except Exception as e:
+                print(f"Risk analysis error: {e}")
+                self.refresh_errors += 1
+                # Keep serving the last good summary if there is one
+                if self.latest is not None:
+                    return
+                analysis = self.FALLBACK_ANALYSIS
+                is_fallback = True
+
+            now = datetime.datetime.now()
+            self.latest = {
+                "analysis": analysis,
+                "timestamp": now.strftime("%d%b %Y %H%M").lower(),
+                "computed_at": now.isoformat(),
+                "trigger": trigger,
+                "is_fallback": is_fallback,
+                "holdings": holdings_str,
+                "compute_seconds": round(time.monotonic() - started, 3),
+                "_computed_at": time.monotonic()
+            }
+            self._basis = None if portfolio_value.get("is_fallback") else self._positions_basis(portfolio_value)
+            self.refreshes_by_trigger[trigger] = self.refreshes_by_trigger.get(trigger, 0) + 1
+            print(f"🛡️ Risk analysis refreshed ({trigger}) in {self.latest['compute_seconds']}s")
+
+    async def get_analysis(self, force: bool = False) -> Dict[str, Any]:
+        """
+        Get the latest precomputed risk summary with its age
+
+        Args:
+            force: Recompute now instead of serving the precomputed summary
+        """
+        if force:
+            await self.refresh("forced")
+        elif self.latest is None:
+            await self.refresh("initial")
+
+        result = {k: v for k, v in self.latest.items() if not k.startswith("_")}
+        result["age_seconds"] = round(time.monotonic() - self.latest["_computed_at"], 1)
+        result["refreshing"] = self._refresh_lock.locked()
+        return result
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get refresh statistics"""
+        return {
+            "running": self._task is not None and not self._task.done(),
+            "refresh_interval_seconds": self.refresh_interval_seconds,
+            "check_interval_seconds": self.check_interval_seconds,
+            "price_move_threshold_pct": self.price_move_threshold_pct,
+            "refreshes_by_trigger": dict(self.refreshes_by_trigger),
+            "refresh_errors": self.refresh_errors,
+            "age_seconds": round(time.monotonic() - self.latest["_computed_at"], 1) if self.latest else None
+        }
@@ -0,0 +1,129 @@
+"""
+Portfolio Risk Analytics
+Vectorized volatility, VaR/CVaR, correlation, beta and risk contribution from daily closes
+"""
+
+import math
+from statistics import NormalDist
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+# Crypto trades every day of the year
+PERIODS_PER_YEAR = 365
+
+def _round_list(values: np.ndarray, digits: int = 6) -> List[float]:
+    return np.round(values, digits).tolist()
+
+def compute_risk_metrics(
+    closes: pd.DataFrame,
+    symbols: List[str],
+    quantities: np.ndarray,
+    benchmark: Optional[pd.Series] = None,
+    confidence: float = 0.95,
+    window: int = 30,
+    rolling_points: int = 90
+) -> Dict[str, Any]:
+    """
+    Risk metrics of a constant-quantity portfolio over the given daily closes
+
+    Args:
+        closes: Daily closes, one column per holding, in the order of symbols/quantities
+        benchmark: Daily closes of the benchmark for beta (optional)
+        confidence: VaR/CVaR confidence level
+        window: Rolling volatility window in days
+        rolling_points: How many of the latest rolling volatility values to return
+
+    Weights are today's value weights. Daily returns of assets without a close
+    yet (listed later than the lookback start) count as 0. All figures are daily
+    except the annualized volatilities.
+    """
+    prices = closes.ffill()
+    returns = prices.pct_change().iloc[1:].fillna(0.0)
+    R = returns.to_numpy(dtype=float)
+    if R.shape[0] < 2:
+        raise ValueError("Not enough price history for risk metrics")
+
+    last_prices = np.nan_to_num(prices.iloc[-1].to_numpy(dtype=float))
+    values = quantities * last_prices
+    total_value = float(values.sum())
+    if total_value <= 0:
+        raise ValueError("Portfolio has no priced holdings")
+    weights = values / total_value
+
+    # Portfolio daily returns (weights held constant)
+    portfolio_returns = R @ weights
+
+    # Volatility
+    annualize = math.sqrt(PERIODS_PER_YEAR)
+    asset_volatility = R[-window:].std(axis=0, ddof=1) * annualize
+    rolling = pd.Series(portfolio_returns, index=returns.index).rolling(window).std() * annualize
+    rolling = rolling.dropna().iloc[-rolling_points:]
+
+    # Historical VaR/CVaR: the loss quantile of realized portfolio returns and the mean loss beyond it
+    tail = 1.0 - confidence
+    historical_var = -float(np.quantile(portfolio_returns, tail))
+    tail_returns = portfolio_returns[portfolio_returns <= -historical_var]
+    historical_cvar = -float(tail_returns.mean()) if tail_returns.size else historical_var
+
+    # Parametric (normal) VaR/CVaR
+    mu = float(portfolio_returns.mean())
+    sigma = float(portfolio_returns.std(ddof=1))
+    z = NormalDist().inv_cdf(tail)
+    parametric_var = -(mu + z * sigma)
+    parametric_cvar = -(mu - sigma * NormalDist().pdf(z) / tail)
+
+    # Correlation and each holding's contribution to portfolio volatility (Euler allocation)
+    covariance = np.atleast_2d(np.cov(R, rowvar=False))
+    with np.errstate(invalid="ignore", divide="ignore"):
+        correlation = np.nan_to_num(np.atleast_2d(np.corrcoef(R, rowvar=False)))
+    marginal = covariance @ weights
+    portfolio_variance = float(weights @ marginal)
+    portfolio_sigma = math.sqrt(portfolio_variance) if portfolio_variance > 0 else 0.0
+    contribution = weights * marginal / portfolio_sigma if portfolio_sigma > 0 else np.zeros_like(weights)
+    contribution_pct = contribution / portfolio_sigma if portfolio_sigma > 0 else np.zeros_like(weights)
+
+    metrics: Dict[str, Any] = {
+        "total_value": total_value,
+        "observations": int(R.shape[0]),
+        "confidence": confidence,
+        "window_days": window,
+        "volatility": {
+            "daily": sigma,
+            "annualized": sigma * annualize,
+            "rolling_annualized": [
+                {"date": date.strftime("%Y-%m-%d"), "value": value}
+                for date, value in zip(rolling.index, np.round(rolling.to_numpy(), 6).tolist())
+            ]
+        },
+        "var": {
+            "historical": {"pct": historical_var, "amount": historical_var * total_value},
+            "parametric": {"pct": parametric_var, "amount": parametric_var * total_value}
+        },
+        "cvar": {
+            "historical": {"pct": historical_cvar, "amount": historical_cvar * total_value},
+            "parametric": {"pct": parametric_cvar, "amount": parametric_cvar * total_value}
+        },
+        "correlation": {"symbols": symbols, "matrix": np.round(correlation, 4).tolist()}
+    }
+
+    betas = None
+    if benchmark is not None:
+        benchmark_returns = benchmark.reindex(closes.index).ffill().pct_change().iloc[1:].fillna(0.0).to_numpy(dtype=float)
+        benchmark_variance = float(benchmark_returns.var(ddof=1))
+        if benchmark_variance > 0:
+            centered = R - R.mean(axis=0)
+            betas = centered.T @ (benchmark_returns - benchmark_returns.mean()) / (R.shape[0] - 1) / benchmark_variance
+            metrics["beta"] = {"benchmark": str(benchmark.name), "portfolio": float(weights @ betas)}
+
+    holdings = pd.DataFrame({
+        "symbol": symbols,
+        "weight": _round_list(weights),
+        "annualized_volatility": _round_list(asset_volatility),
+        "risk_contribution": _round_list(contribution, 8),
+        "risk_contribution_pct": _round_list(contribution_pct),
+        "beta": _round_list(betas) if betas is not None else None
+    })
+    metrics["holdings"] = holdings.to_dict(orient="records")
+    return metrics
@@ -14,8 +14,9 @@ class SchedulerService:
     Background service that automatically generates performance files
     """
     
-    def __init__(self, interval_minutes: int = 300, symbols: List[str] = None):
+    def __init__(self, interval_minutes: int = 300, symbols: List[str] = None, compaction_interval_hours: float = 1.0):
         self.interval_minutes = interval_minutes
+        self.compaction_interval_hours = compaction_interval_hours
         self.symbols = symbols or ['BTC-USD', 'ETH-USD', 'AAPL', 'TSLA']
         self.is_running = False
         self.task = None
@@ -32,6 +33,7 @@ class SchedulerService:
         self.last_generated_at = None
         self.errors_count = 0
         self.start_time = None
+        self.last_compacted_at = None
     
     async def generate_performance_file(self) -> Optional[str]:
         """
@@ -59,6 +61,21 @@ class SchedulerService:
             print(f"❌ Scheduler error generating performance file: {e}")
             return None
     
+    async def compact_if_due(self):
+        """
+        Compact performance data partitions older than the retention window,
+        at most once per compaction interval
+        """
+        if self.last_compacted_at and datetime.now() - self.last_compacted_at < timedelta(hours=self.compaction_interval_hours):
+            return
+        
+        try:
+            # Compaction is file I/O heavy; keep it off the event loop
+            await asyncio.to_thread(self.yfinance_generator.store.compact)
+            self.last_compacted_at = datetime.now()
+        except Exception as e:
+            print(f"❌ Scheduler error compacting performance data: {e}")
+    
     async def _run_scheduler(self):
         """
         Main scheduler loop that runs in the background
@@ -71,6 +88,9 @@ class SchedulerService:
                 # Generate a performance file
                 await self.generate_performance_file()
                 
+                # Rotate old partitions into daily archives
+                await self.compact_if_due()
+                
                 # Wait for the next interval
                 await asyncio.sleep(self.interval_minutes * 60)
                 
@@ -140,6 +160,7 @@ class SchedulerService:
             "files_generated": self.files_generated,
             "errors_count": self.errors_count,
             "last_generated_at": self.last_generated_at.isoformat() if self.last_generated_at else None,
+            "last_compacted_at": self.last_compacted_at.isoformat() if self.last_compacted_at else None,
             "uptime_minutes": round(uptime_minutes, 1),
             "next_run_in_minutes": round(next_run_in, 1) if next_run_in is not None else None,
             "success_rate": round(self.files_generated / (self.files_generated + self.errors_count), 2) if (self.files_generated + self.errors_count) > 0 else 0.0
@@ -0,0 +1,192 @@
+"""
+Cryptocurrency Symbol Index
+In-memory prefix and fuzzy search over the CoinMarketCap symbol map
+"""
+
+import json
+import heapq
+import time
+from bisect import bisect_left
+from collections import Counter, OrderedDict
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+def _trigrams(text: str) -> List[str]:
+    padded = f"  {text} "
+    return [padded[i:i + 3] for i in range(len(padded) - 2)]
+
+class SymbolIndex:
+    """
+    Search index over CoinMarketCap map entries (id, name, symbol, slug, rank).
+
+    Prefix matches on symbol, name, name words and slug come from a sorted key
+    list searched with bisect. When they do not fill the result, trigram
+    similarity on symbol and name finds near misses ("etherium", "solan").
+    Results are ordered by match quality, then CMC rank. Recent results are
+    kept in a small LRU, since typing repeats the same prefixes.
+    """
+
+    # Match tiers, best first
+    EXACT_SYMBOL, EXACT_NAME, PREFIX_SYMBOL, PREFIX_NAME, FUZZY = range(5)
+
+    def __init__(self, min_similarity: float = 0.35, max_cached_results: int = 1024):
+        self.min_similarity = min_similarity
+        self.max_cached_results = max_cached_results
+        self._results: "OrderedDict[tuple, List[Dict[str, Any]]]" = OrderedDict()
+        self.entries: List[Dict[str, Any]] = []
+        self._keys: List[str] = []
+        self._key_ids: List[int] = []
+        self._key_is_symbol: List[bool] = []
+        self._trigram_postings: Dict[str, List[int]] = {}
+        self._trigram_counts: List[int] = []
+        self.built_at: Optional[float] = None
+
+        # Statistics
+        self.searches = 0
+        self.cached_searches = 0
+        self.fuzzy_searches = 0
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    @property
+    def loaded(self) -> bool:
+        return bool(self.entries)
+
+    def _rank(self, entry_id: int) -> int:
+        rank = self.entries[entry_id].get("rank")
+        return rank if rank else 1_000_000
+
+    def build(self, entries: List[Dict[str, Any]]):
+        """Replace the index contents with CMC map entries"""
+        self.entries = [
+            {"id": e["id"], "name": e["name"], "symbol": e["symbol"], "slug": e.get("slug"), "rank": e.get("rank")}
+            for e in entries
+        ]
+        keyed = []
+        postings: Dict[str, List[int]] = {}
+        trigram_counts = []
+        for entry_id, entry in enumerate(self.entries):
+            symbol, name = entry["symbol"].lower(), entry["name"].lower()
+            keys = {name, *name.split()}
+            if entry["slug"]:
+                keys.add(entry["slug"].lower())
+            keyed.append((symbol, entry_id, True))
+            keyed.extend((key, entry_id, False) for key in keys if key != symbol)
+
+            grams = set(_trigrams(symbol)) | set(_trigrams(name))
+            for gram in grams:
+                postings.setdefault(gram, []).append(entry_id)
+            trigram_counts.append(len(grams))
+
+        keyed.sort()
+        self._keys = [key for key, _, _ in keyed]
+        self._key_ids = [entry_id for _, entry_id, _ in keyed]
+        self._key_is_symbol = [is_symbol for _, _, is_symbol in keyed]
+        self._trigram_postings = postings
+        self._trigram_counts = trigram_counts
+        self._results.clear()
+        self.built_at = time.time()
+
+    def _prefix_matches(self, query: str) -> Dict[int, int]:
+        """Entry id -> best tier for keys starting with query"""
+        tiers: Dict[int, int] = {}
+        position = bisect_left(self._keys, query)
+        while position < len(self._keys) and self._keys[position].startswith(query):
+            key, entry_id, is_symbol = self._keys[position], self._key_ids[position], self._key_is_symbol[position]
+            if key == query:
+                tier = self.EXACT_SYMBOL if is_symbol else self.EXACT_NAME
+            else:
+                tier = self.PREFIX_SYMBOL if is_symbol else self.PREFIX_NAME
+            if tier < tiers.get(entry_id, self.FUZZY):
+                tiers[entry_id] = tier
+            position += 1
+        return tiers
+
+    def _fuzzy_matches(self, query: str, exclude: Dict[int, int]) -> Dict[int, float]:
+        """Entry id -> Dice similarity of trigrams, for entries above min_similarity"""
+        grams = set(_trigrams(query))
+        shared = Counter()
+        for gram in grams:
+            shared.update(self._trigram_postings.get(gram, ()))
+        scores = {}
+        for entry_id, count in shared.items():
+            if entry_id in exclude:
+                continue
+            similarity = 2 * count / (len(grams) + self._trigram_counts[entry_id])
+            if similarity >= self.min_similarity:
+                scores[entry_id] = similarity
+        return scores
+
+    def search(self, query: str, limit: int = 10) -> List[Dict[str, Any]]:
+        """
+        Search by symbol or name
+
+        Returns:
+            Up to limit entries, each with the match type that found it
+        """
+        query = query.strip().lower()
+        if not query or not self.entries:
+            return []
+        self.searches += 1
+        cached = self._results.get((query, limit))
+        if cached is not None:
+            self._results.move_to_end((query, limit))
+            self.cached_searches += 1
+            return [dict(entry) for entry in cached]
+
+        tiers = self._prefix_matches(query)
+        ranked = heapq.nsmallest(limit, tiers, key=lambda entry_id: (tiers[entry_id], self._rank(entry_id)))
+        results = [(entry_id, tiers[entry_id]) for entry_id in ranked]
+
+        if len(results) < limit and len(query) >= 3:
+            self.fuzzy_searches += 1
+            scores = self._fuzzy_matches(query, tiers)
+            fuzzy = heapq.nsmallest(limit - len(results), scores, key=lambda entry_id: (-round(scores[entry_id], 2), self._rank(entry_id)))
+            results.extend((entry_id, self.FUZZY) for entry_id in fuzzy)
+
+        match_names = {
+            self.EXACT_SYMBOL: "symbol", self.EXACT_NAME: "name",
+            self.PREFIX_SYMBOL: "symbol_prefix", self.PREFIX_NAME: "name_prefix", self.FUZZY: "fuzzy"
+        }
+        found = [{**self.entries[entry_id], "match": match_names[tier]} for entry_id, tier in results]
+        self._results[(query, limit)] = found
+        if len(self._results) > self.max_cached_results:
+            self._results.popitem(last=False)
+        return [dict(entry) for entry in found]
+
+    def load(self, path: str) -> bool:
+        """Build the index from a snapshot file; False if there is none"""
+        snapshot = Path(path)
+        if not snapshot.exists():
+            return False
+        with open(snapshot) as f:
+            data = json.load(f)
+        self.build(data["entries"])
+        self.built_at = data.get("saved_at", self.built_at)
+        return True
+
+    def save(self, path: str):
+        """Write the indexed entries to a snapshot file"""
+        snapshot = Path(path)
+        snapshot.parent.mkdir(parents=True, exist_ok=True)
+        tmp = snapshot.with_suffix(".tmp")
+        with open(tmp, "w") as f:
+            json.dump({"saved_at": self.built_at, "entries": self.entries}, f)
+        tmp.replace(snapshot)
+
+    def age_seconds(self) -> Optional[float]:
+        return time.time() - self.built_at if self.built_at else None
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get index statistics"""
+        age = self.age_seconds()
+        return {
+            "entries": len(self.entries),
+            "keys": len(self._keys),
+            "trigrams": len(self._trigram_postings),
+            "age_seconds": round(age, 1) if age is not None else None,
+            "searches": self.searches,
+            "cached_searches": self.cached_searches,
+            "fuzzy_searches": self.fuzzy_searches
+        }
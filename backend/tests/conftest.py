@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# Backend modules are imported flat (e.g. "from micro_batcher import MicroBatcher")
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
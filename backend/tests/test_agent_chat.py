@@ -0,0 +1,168 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+import agent_service
+from agent_service import TradingStrategyAgent
+from llm_gateway import LLMUnavailableError
+from market_snapshot import MarketSnapshot
+from models import RiskProfile, Strategy, StrategyLogic
+
+
+class FakeGateway:
+    """Stands in for the LLM gateway: answers with a numbered reply or raises a queued error"""
+
+    def __init__(self):
+        self.calls = []
+        self.errors = []
+
+    async def complete(self, timeout, estimated_tokens=0, **kwargs):
+        self.calls.append(kwargs)
+        if self.errors:
+            raise self.errors.pop(0)
+        message = SimpleNamespace(content=f"answer {len(self.calls)}")
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)], usage=None)
+
+
+def make_strategy(stop_loss_pct=2.0):
+    return Strategy(
+        strategy_id="s1",
+        name="Test",
+        risk_profile=RiskProfile(max_position_pct=10, stop_loss_pct=stop_loss_pct, take_profit_pct=5),
+        logic=[StrategyLogic(indicator="rsi", params={"period": 14}, buy={"below": 30})]
+    )
+
+
+@pytest.fixture
+def agent(monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    monkeypatch.delenv("DESEARCH_API_KEY", raising=False)
+    agent = TradingStrategyAgent()
+    agent.gateway = FakeGateway()
+    yield agent
+    asyncio.run(agent.aclose())
+
+
+def test_repeat_questions_are_answered_from_the_cache(agent):
+    strategy = make_strategy()
+
+    first = asyncio.run(agent.chat("How is my strategy doing?", strategy))
+    # Case, whitespace and trailing punctuation do not change the question
+    again = asyncio.run(agent.chat("  how is my   STRATEGY doing ", strategy))
+
+    assert first == again == "answer 1"
+    assert len(agent.gateway.calls) == 1
+    assert agent.chat_cache.get_stats()["hits"] == 1
+
+
+def test_strategy_market_and_context_flags_are_part_of_the_key(agent):
+    key = agent._chat_cache_key("Hi", make_strategy(), "crypto", False, False)
+
+    assert agent._chat_cache_key("Hi", make_strategy(stop_loss_pct=3.0), "crypto", False, False) != key
+    assert agent._chat_cache_key("Hi", make_strategy(), "stock", False, False) != key
+    assert agent._chat_cache_key("Hi", make_strategy(), "crypto", True, False) != key
+    assert agent._chat_cache_key("Hi", make_strategy(), "CRYPTO", False, False) == key
+
+
+def test_ttl_follows_the_freshest_context(agent):
+    assert agent._chat_cache_ttl(False, False) == agent.CHAT_CACHE_TTL_PLAIN
+    assert agent._chat_cache_ttl(True, True) == agent.CHAT_CACHE_TTL_MARKET_DATA
+    assert agent._chat_cache_ttl(False, True) == agent.CHAT_CACHE_TTL_WEB_SEARCH
+    assert agent._chat_cache_ttl(True, False, ["market_data"]) == agent.CHAT_CACHE_TTL_DEGRADED
+
+
+def test_errors_are_not_cached_and_stale_answers_cover_outages(agent):
+    strategy = make_strategy()
+    agent.gateway.errors.append(RuntimeError("boom"))
+
+    reply = asyncio.run(agent.chat("Hi", strategy))
+    assert reply.startswith("I encountered an error")
+    assert asyncio.run(agent.chat("Hi", strategy)) == "answer 2"
+
+    # Expire the answer, then lose the provider: the expired answer is served
+    key = agent._chat_cache_key("Hi", strategy, "crypto", False, False)
+    agent.chat_cache.set(key, "answer 2", ttl=0)
+    agent.gateway.errors.append(LLMUnavailableError("circuit open"))
+    assert asyncio.run(agent.chat("Hi", strategy)) == "answer 2"
+
+    # use_cache=False always asks the LLM
+    assert asyncio.run(agent.chat("Hi", strategy, use_cache=False)) == "answer 4"
+
+
+class SlowNews:
+    def __init__(self, delay):
+        self.delay = delay
+
+    async def get_market_news(self, symbol, timeframe="PAST_24_HOURS"):
+        await asyncio.sleep(self.delay)
+        return {"summary": "BTC rallies", "sources": [], "success": True}
+
+
+def use_context(agent, news_delay, market_delay=0.0):
+    async def market_data(symbol):
+        await asyncio.sleep(market_delay)
+        return {"symbol": symbol, "price": 100.0, "source": "test"}
+
+    agent.get_live_market_data = market_data
+    agent.desearch = SlowNews(news_delay)
+    agent.desearch_available = True
+    agent.market_data_timeout = 0.5
+    agent.news_timeout = 0.1
+
+
+def test_context_sources_are_gathered_concurrently(agent):
+    use_context(agent, news_delay=0.08, market_delay=0.08)
+
+    async def run():
+        started = asyncio.get_running_loop().time()
+        built = await agent._build_chat_prompt("Hi", make_strategy(), "crypto", True, True)
+        return built, asyncio.get_running_loop().time() - started
+
+    (prompt, _, stats), elapsed = asyncio.run(run())
+
+    assert "BTC rallies" in prompt and '"price":100.0' in prompt
+    assert stats["missing_context"] == []
+    assert elapsed < 0.15
+
+
+def test_slow_source_is_left_out_and_the_answer_cached_briefly(agent):
+    use_context(agent, news_delay=1.0)
+    agent.CHAT_CACHE_TTL_DEGRADED = 0
+    strategy = make_strategy()
+
+    reply = asyncio.run(agent.chat("Hi", strategy, include_market_data=True, include_web_search=True))
+
+    prompt = agent.gateway.calls[0]["messages"][1]["content"]
+    assert reply == "answer 1"
+    assert '"price":100.0' in prompt and "BTC rallies" not in prompt
+    assert agent.context_stats["news"]["timeouts"] == 1
+    # Cached with the degraded TTL, not the market-data one
+    key = agent._chat_cache_key("Hi", strategy, "crypto", True, True)
+    assert agent.chat_cache.get(key) is None
+    assert agent.chat_cache.get(key, allow_stale=True) == "answer 1"
+
+
+def test_live_market_data_comes_from_the_shared_snapshot(agent, monkeypatch):
+    snapshot = MarketSnapshot()
+    monkeypatch.setattr(agent_service, "market_snapshot", snapshot)
+
+    assert asyncio.run(agent.get_live_market_data("SOL-USD"))["source"] == "unavailable"
+    snapshot.update("SOL", {"price": 150.0}, source="coinmarketcap")
+    assert asyncio.run(agent.get_live_market_data("SOL-USD"))["price"] == 150.0
+
+
+def test_llm_calls_share_one_bounded_client(monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    monkeypatch.setenv("OPENAI_MAX_CONCURRENCY", "3")
+    agent = TradingStrategyAgent()
+
+    # Retries belong to the gateway, connections to the shared pool
+    assert agent.client.max_retries == 0
+    assert agent.client._client is agent.http_client
+    assert agent.gateway.semaphore._value == 3
+    pool = agent.http_client._transport._pool
+    assert (pool._max_connections, pool._max_keepalive_connections) == (6, 3)
+
+    asyncio.run(agent.aclose())
+    assert agent.http_client.is_closed
@@ -0,0 +1,72 @@
+import asyncio
+
+import httpx
+import openai
+import pytest
+
+import openai_stub
+from agent_service import TradingStrategyAgent
+from llm_gateway import LLMGateway
+from models import RiskProfile, Strategy
+
+STRATEGY = Strategy(
+    strategy_id="s1", name="Test", logic=[],
+    risk_profile=RiskProfile(max_position_pct=10, stop_loss_pct=2, take_profit_pct=5)
+)
+
+
+@pytest.fixture
+def agent(monkeypatch):
+    monkeypatch.setattr(openai_stub, "STUB_LATENCY_SECONDS", 0.0)
+    monkeypatch.setattr(openai_stub, "STUB_FIRST_TOKEN_SECONDS", 0.0)
+    for name, value in (("error_rate", 0.0), ("rate_limit_rate", 0.0), ("outage", False)):
+        monkeypatch.setitem(openai_stub.faults, name, value)
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    monkeypatch.delenv("DESEARCH_API_KEY", raising=False)
+
+    agent = TradingStrategyAgent()
+    client = openai.AsyncOpenAI(
+        api_key="stub",
+        base_url="http://stub/v1",
+        max_retries=0,
+        http_client=httpx.AsyncClient(transport=httpx.ASGITransport(app=openai_stub.app))
+    )
+    agent.gateway = LLMGateway(client, model="stub-model", max_concurrency=2)
+    yield agent
+    asyncio.run(agent.aclose())
+
+
+def collect(agent, stop_after=None):
+    async def run():
+        tokens = []
+        stream = agent.chat_stream("How is BTC doing?", STRATEGY)
+        try:
+            async for token in stream:
+                tokens.append(token)
+                if stop_after and len(tokens) == stop_after:
+                    break
+        finally:
+            await stream.aclose()
+        return tokens
+
+    return asyncio.run(run())
+
+
+def test_tokens_arrive_one_by_one_and_the_answer_is_cached(agent):
+    tokens = collect(agent)
+
+    assert len(tokens) > 1
+    assert "".join(tokens).startswith("Stub response")
+    assert agent.token_usage["chat_stream"]["calls"] == 1
+
+    # The repeat question is served from the cache in one piece
+    assert collect(agent) == ["".join(tokens)]
+    assert agent.gateway.stats["attempts"] == 1
+
+
+def test_closing_the_stream_early_releases_the_slot_and_caches_nothing(agent):
+    assert len(collect(agent, stop_after=1)) == 1
+
+    assert agent.gateway.semaphore._value == 2
+    assert agent.gateway.breaker.state == "closed"
+    assert agent.chat_cache.get_stats()["entries"] == 0
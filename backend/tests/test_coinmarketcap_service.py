@@ -0,0 +1,175 @@
+import asyncio
+
+import pytest
+
+import cmc_stub
+from coinmarketcap_service import CoinMarketCapService
+from credit_budget import CreditBudget, background_priority
+
+
+class FakeApi:
+    """Stands in for CoinMarketCapService._get_json with stub quotes, recording each call"""
+
+    def __init__(self):
+        self.calls = []
+        self.fail = False
+
+    async def __call__(self, path, params=None):
+        self.calls.append((path, dict(params or {})))
+        await asyncio.sleep(0.001)
+        if self.fail:
+            return None
+        if path == "/cryptocurrency/map":
+            return {"data": []}
+        symbols = params["symbol"].split(",")
+        return {"data": {s: cmc_stub._quote(s, params["convert"]) for s in symbols if s in cmc_stub.ASSETS_BY_SYMBOL}}
+
+    def quote_calls(self):
+        return [params["symbol"].split(",") for path, params in self.calls if path == "/cryptocurrency/quotes/latest"]
+
+
+@pytest.fixture
+def cmc(tmp_path, monkeypatch):
+    monkeypatch.setenv("COINMARKETCAP_API_KEY", "test")
+    monkeypatch.setenv("CMC_SYMBOL_MAP_PATH", str(tmp_path / "cmc_symbol_map.json"))
+    service = CoinMarketCapService()
+    service._get_json = FakeApi()
+    return service
+
+
+def test_one_pooled_session_lives_for_the_app_lifespan(cmc):
+    async def run():
+        await cmc.start()
+        session = cmc.session
+        await cmc.start()
+        assert cmc.session is session
+        assert session.connector.limit == cmc.max_connections
+        await cmc.close()
+        await cmc.close()
+        return session
+
+    session = asyncio.run(run())
+    assert session.closed
+    assert cmc.session is None
+
+
+def test_cached_quotes_are_served_and_only_missing_symbols_fetched(cmc):
+    async def run():
+        first = await cmc.get_multiple_prices(["BTC", "ETH"])
+        again = await cmc.get_multiple_prices(["btc", "eth"])
+        await cmc.get_multiple_prices(["BTC", "SOL"])
+        return first, again
+
+    first, again = asyncio.run(run())
+
+    assert again == first
+    assert cmc._get_json.quote_calls() == [["BTC", "ETH"], ["SOL"]]
+    stats = cmc.get_cache_stats()
+    assert (stats["lookups"], stats["quote_hits"], stats["upstream_calls"]) == (6, 3, 2)
+
+
+def test_expired_quotes_are_fetched_again(cmc):
+    cmc.quote_cache.default_ttl = 0
+
+    async def run():
+        first = await cmc.get_latest_price("BTC")
+        return first, await cmc.get_latest_price("BTC")
+
+    first, second = asyncio.run(run())
+
+    assert len(cmc._get_json.quote_calls()) == 2
+    assert first["price"] != second["price"]
+
+
+def test_unknown_symbols_are_not_looked_up_again(cmc):
+    async def run():
+        first = await cmc.get_multiple_prices(["BTC", "NOPE"])
+        return first, await cmc.get_latest_price("NOPE")
+
+    first, missing = asyncio.run(run())
+
+    assert list(first["data"]) == ["BTC"]
+    assert missing is None
+    assert cmc._get_json.quote_calls() == [["BTC", "NOPE"]]
+    assert cmc.get_cache_stats()["negative_hits"] == 1
+
+
+def test_concurrent_single_symbol_lookups_share_one_call(cmc):
+    async def run():
+        return await asyncio.gather(*(cmc.get_latest_price(s) for s in ("BTC", "ETH", "SOL", "BTC")))
+
+    prices = asyncio.run(run())
+
+    assert [p["symbol"] for p in prices] == ["BTC", "ETH", "SOL", "BTC"]
+    assert prices[0] == prices[3]
+    assert cmc._get_json.quote_calls() == [["BTC", "ETH", "SOL"]]
+    assert cmc.get_cache_stats()["batching"]["items_submitted"] == 4
+
+
+def test_batches_are_split_by_convert_currency(cmc):
+    async def run():
+        return await asyncio.gather(cmc.get_latest_price("BTC"), cmc.get_latest_price("ETH", convert="EUR"))
+
+    usd, eur = asyncio.run(run())
+
+    assert usd["symbol"] == "BTC" and eur["symbol"] == "ETH"
+    assert sorted(params["convert"] for _, params in cmc._get_json.calls) == ["EUR", "USD"]
+
+
+def test_a_failed_batch_fails_every_lookup_in_it(cmc):
+    cmc._get_json.fail = True
+
+    async def run():
+        return await asyncio.gather(cmc.get_latest_price("BTC"), cmc.get_latest_price("ETH"))
+
+    assert asyncio.run(run()) == [None, None]
+    assert len(cmc._get_json.quote_calls()) == 1
+
+
+def test_out_of_credits_serves_expired_quotes_and_partial_results(cmc):
+    cmc.credit_budget = CreditBudget(per_minute=1, per_day=100)
+    cmc.quote_cache.default_ttl = 0
+
+    async def run():
+        await cmc.get_latest_price("BTC")
+        return await cmc.get_multiple_prices(["BTC", "ETH"])
+
+    prices = asyncio.run(run())
+
+    # BTC is served expired rather than spending credits; ETH cannot be fetched
+    assert list(prices["data"]) == ["BTC"]
+    assert cmc._get_json.quote_calls() == [["BTC"]]
+    stats = cmc.get_credit_stats()
+    assert stats["throttled_calls"] == 1 and stats["stale_served"] == 1
+
+
+def test_background_lookups_reuse_older_quotes_and_refresh_them_together(cmc):
+    cmc.quote_cache.default_ttl = 0
+
+    async def run():
+        await cmc.get_latest_price("BTC")
+        with background_priority():
+            reused = await cmc.get_latest_price("BTC")
+            # A missing symbol costs one call anyway: the cached ones ride along
+            await cmc.get_multiple_prices(["BTC", "ETH"])
+        return reused
+
+    assert asyncio.run(run())["symbol"] == "BTC"
+    assert [sorted(symbols) for symbols in cmc._get_json.quote_calls()] == [["BTC"], ["BTC", "ETH"]]
+    assert cmc.credit_budget.calls_by_priority == {"interactive": 1, "background": 1}
+
+
+def test_background_refreshes_cannot_starve_user_requests(cmc):
+    cmc.credit_budget = CreditBudget(per_minute=2, per_day=100, background_share=0.5)
+
+    async def run():
+        with background_priority():
+            await cmc.get_latest_price("BTC")
+            refused = await cmc.get_latest_price("ETH")
+        return refused, await cmc.get_latest_price("ETH")
+
+    refused, interactive = asyncio.run(run())
+
+    assert refused is None
+    assert interactive["symbol"] == "ETH"
+    assert cmc.credit_budget.throttled_by_priority["background"] == 1
@@ -0,0 +1,73 @@
+import pytest
+
+import credit_budget
+from credit_budget import CreditBudget, background_priority, request_priority
+
+
+def test_background_work_is_held_to_its_share():
+    budget = CreditBudget(per_minute=10, per_day=100, background_share=0.5)
+
+    assert budget.try_spend("quotes", 5, priority="background")
+    assert not budget.try_spend("quotes", 1, priority="background")
+    # User requests can still use the rest of the budget
+    assert budget.try_spend("quotes", 5, priority="interactive")
+    assert not budget.try_spend("quotes", 1, priority="interactive")
+
+    stats = budget.get_stats()
+    assert stats["calls_by_priority"] == {"interactive": 1, "background": 1}
+    assert stats["throttled_by_priority"] == {"interactive": 1, "background": 1}
+    assert stats["credits_by_endpoint"] == {"quotes": 10}
+
+
+def test_daily_limit_applies_across_minutes(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(credit_budget.time, "monotonic", lambda: now[0])
+    budget = CreditBudget(per_minute=2, per_day=3)
+
+    assert budget.try_spend("quotes", 2)
+    assert not budget.try_spend("quotes", 1)
+    now[0] += 61
+    assert budget.used_this_minute == 0
+    assert budget.try_spend("quotes", 1)
+    assert not budget.try_spend("quotes", 1)
+    assert budget.used_today == 3
+
+
+def test_soft_limit_is_per_priority():
+    budget = CreditBudget(per_minute=10, per_day=100, background_share=0.5, soft_limit_share=0.8)
+    budget.try_spend("quotes", 4)
+
+    assert budget.near_limit("background")
+    assert not budget.near_limit("interactive")
+    budget.try_spend("quotes", 4)
+    assert budget.near_limit("interactive")
+
+
+def test_priority_comes_from_the_running_context():
+    budget = CreditBudget(per_minute=10, per_day=100)
+
+    with background_priority():
+        assert request_priority.get() == "background"
+        budget.try_spend("quotes", 1)
+    budget.try_spend("quotes", 1)
+
+    assert budget.calls_by_priority == {"interactive": 1, "background": 1}
+
+
+def test_background_refresh_interval_fits_the_daily_share():
+    budget = CreditBudget(per_minute=30, per_day=333, background_share=0.6, soft_limit_share=0.8)
+
+    # The daily limit binds on the Basic plan: 2 credits per refresh over 199.8 background credits a day
+    assert budget.background_refresh_seconds(2) == pytest.approx(86400 * 2 / (333 * 0.6) / 0.8)
+    # With plenty of daily credits the per-minute limit binds
+    generous = CreditBudget(per_minute=30, per_day=10_000_000, background_share=0.6, soft_limit_share=0.8)
+    assert generous.background_refresh_seconds(2) == pytest.approx(60 * 2 / 18 / 0.8)
+
+
+def test_limits_are_read_from_the_environment(monkeypatch):
+    monkeypatch.setenv("CMC_CREDITS_PER_DAY", "1000")
+    monkeypatch.setenv("CMC_BACKGROUND_SHARE", "0.25")
+
+    budget = CreditBudget.from_env("CMC", per_minute=30, per_day=333)
+
+    assert (budget.per_minute, budget.per_day, budget.background_share) == (30, 1000, 0.25)
@@ -0,0 +1,55 @@
+import numpy as np
+import pytest
+
+from downsampling import downsample_indices, lttb_indices, minmax_indices
+
+
+def series(n=1000, seed=7):
+    rng = np.random.default_rng(seed)
+    x = np.arange(n, dtype=float)
+    y = np.cumsum(rng.normal(size=n))
+    return x, y
+
+
+@pytest.mark.parametrize("method", ["lttb", "minmax"])
+@pytest.mark.parametrize("max_points", [10, 11, 57, 500, 999])
+def test_endpoints_kept_and_indices_strictly_increasing(method, max_points):
+    x, y = series()
+    indices = downsample_indices(x, y, max_points, method)
+
+    assert indices[0] == 0
+    assert indices[-1] == len(y) - 1
+    assert np.all(np.diff(indices) > 0)
+    assert len(indices) <= max_points
+
+
+def test_lttb_returns_exactly_threshold_points():
+    x, y = series()
+    assert len(lttb_indices(x, y, 100)) == 100
+
+
+@pytest.mark.parametrize("method", ["lttb", "minmax"])
+def test_short_series_returned_whole(method):
+    x, y = series(n=50)
+    assert np.array_equal(downsample_indices(x, y, 50, method), np.arange(50))
+    assert np.array_equal(downsample_indices(x, y, 200, method), np.arange(50))
+
+
+def test_lttb_keeps_a_lone_spike():
+    x = np.arange(1000, dtype=float)
+    y = np.zeros(1000)
+    y[437] = 100.0
+    assert 437 in lttb_indices(x, y, 20)
+
+
+def test_minmax_keeps_global_extremes():
+    _, y = series()
+    indices = minmax_indices(y, 40)
+    assert int(np.argmax(y)) in indices
+    assert int(np.argmin(y)) in indices
+
+
+def test_unknown_method_raises():
+    x, y = series(n=20)
+    with pytest.raises(ValueError):
+        downsample_indices(x, y, 10, "average")
@@ -0,0 +1,96 @@
+import pytest
+
+from holdings_store import HoldingsStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = HoldingsStore(str(tmp_path / "holdings.db"), seed_demo=False)
+    store.create_portfolio("p1")
+    yield store
+    store.close()
+
+
+def buy(quantity, price, executed_at, **extra):
+    return {"symbol": "btc", "side": "buy", "quantity": quantity, "price": price, "executed_at": executed_at, **extra}
+
+
+def sell(quantity, price, executed_at, **extra):
+    return {"symbol": "btc", "side": "sell", "quantity": quantity, "price": price, "executed_at": executed_at, **extra}
+
+
+def test_sell_closes_oldest_lots_first(store):
+    summary = store.import_transactions("p1", [
+        buy(1.0, 100.0, "2025-01-01T00:00:00"),
+        buy(1.0, 200.0, "2025-01-02T00:00:00"),
+        buy(1.0, 300.0, "2025-01-03T00:00:00"),
+        sell(1.5, 400.0, "2025-01-04T00:00:00"),
+    ])
+
+    # 1.0 @ 100 and 0.5 @ 200 are sold at 400
+    assert summary["realized_pl"] == pytest.approx(300.0 + 100.0)
+    assert summary["lots_opened"] == 3
+    assert summary["lots_closed"] == 1
+    lots = store.get_lots("p1")
+    assert [(lot["quantity"], lot["cost_basis"]) for lot in lots] == [(0.5, 200.0), (1.0, 300.0)]
+    assert store.get_realized_pl(["p1"]) == {"p1": pytest.approx(400.0)}
+
+
+def test_fees_raise_cost_basis_and_reduce_proceeds(store):
+    summary = store.import_transactions("p1", [
+        buy(2.0, 100.0, "2025-01-01T00:00:00", fee=10.0),
+        sell(2.0, 150.0, "2025-01-02T00:00:00", fee=10.0),
+    ])
+
+    assert summary["realized_pl"] == pytest.approx(2.0 * (145.0 - 105.0))
+    assert store.get_lots("p1") == []
+
+
+def test_transactions_are_applied_in_utc_order(store):
+    # Submitted out of order and in different offsets: the buy at 09:00Z comes before the sell at 10:00Z
+    summary = store.import_transactions("p1", [
+        sell(1.0, 150.0, "2025-01-01T12:00:00+02:00"),
+        buy(1.0, 100.0, "2025-01-01T09:00:00Z"),
+    ])
+
+    assert summary["realized_pl"] == pytest.approx(50.0)
+    executed = [tx["executed_at"] for tx in store.get_transactions("p1")]
+    assert executed == ["2025-01-01T10:00:00+00:00", "2025-01-01T09:00:00+00:00"]
+
+
+def test_reimported_external_ids_are_skipped(store):
+    transactions = [buy(1.0, 100.0, "2025-01-01T00:00:00", external_id="t1")]
+    store.import_transactions("p1", transactions)
+    summary = store.import_transactions("p1", transactions)
+
+    assert summary["imported"] == 0
+    assert summary["duplicates"] == 1
+    assert len(store.get_lots("p1")) == 1
+
+
+def test_oversell_imports_nothing(store):
+    with pytest.raises(ValueError):
+        store.import_transactions("p1", [
+            buy(1.0, 100.0, "2025-01-01T00:00:00"),
+            sell(2.0, 150.0, "2025-01-02T00:00:00"),
+        ])
+
+    assert store.get_lots("p1") == []
+    assert store.get_transactions("p1") == []
+
+
+def test_unknown_portfolio_and_bad_timestamp_raise(store):
+    with pytest.raises(ValueError):
+        store.import_transactions("missing", [buy(1.0, 100.0, "2025-01-01T00:00:00")])
+    with pytest.raises(ValueError):
+        store.import_transactions("p1", [buy(1.0, 100.0, "yesterday")])
+
+
+def test_deleting_a_portfolio_removes_its_lots_and_transactions(store):
+    store.import_transactions("p1", [buy(1.0, 100.0, "2025-01-01T00:00:00"), sell(0.5, 300.0, "2025-01-02T00:00:00")])
+
+    assert store.get_realized_pl(["p1", "p2"]) == {"p1": pytest.approx(100.0), "p2": 0.0}
+    assert store.delete_portfolio("p1")
+    assert not store.delete_portfolio("p1")
+    assert store.get_lots("p1") == []
+    assert store.get_transactions("p1") == []
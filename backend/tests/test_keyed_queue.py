@@ -0,0 +1,64 @@
+import asyncio
+
+from keyed_queue import LatestWinsQueue
+
+
+def test_newer_item_replaces_pending_item_for_same_key():
+    queue = LatestWinsQueue()
+    assert queue.put("s1", 1) is None
+    assert queue.put("s1", 2) == 1
+    assert queue.put("s1", 3) == 2
+
+    stats = queue.get_stats()
+    assert stats["pending"] == 1
+    assert stats["enqueued"] == 3
+    assert stats["superseded"] == 2
+    assert stats["superseded_by_key"] == {"s1": 2}
+    assert asyncio.run(queue.get()) == ("s1", 3)
+
+
+def test_stalest_key_is_handed_out_first_and_keeps_its_wait_time():
+    async def run():
+        queue = LatestWinsQueue()
+        queue.put("a", 1)
+        await asyncio.sleep(0.01)
+        queue.put("b", 1)
+        # Replacing a's item does not move it behind b
+        queue.put("a", 2)
+        return [await queue.get(), await queue.get()]
+
+    assert asyncio.run(run()) == [("a", 2), ("b", 1)]
+
+
+def test_key_in_flight_is_not_handed_out_until_task_done():
+    async def run():
+        queue = LatestWinsQueue()
+        queue.put("a", 1)
+        assert await queue.get() == ("a", 1)
+        queue.put("a", 2)
+        queue.put("b", 1)
+        # a is still being processed, so b goes next even though a was queued first
+        assert await queue.get() == ("b", 1)
+
+        waiter = asyncio.create_task(queue.get())
+        await asyncio.sleep(0.01)
+        assert not waiter.done()
+        queue.task_done("a")
+        return await asyncio.wait_for(waiter, 1), queue.get_stats()
+
+    item, stats = asyncio.run(run())
+    assert item == ("a", 2)
+    assert stats["completed"] == 1
+    assert stats["in_flight"] == 2
+
+
+def test_get_waits_for_a_put():
+    async def run():
+        queue = LatestWinsQueue()
+        waiter = asyncio.create_task(queue.get())
+        await asyncio.sleep(0.01)
+        assert not waiter.done()
+        queue.put("a", "x")
+        return await asyncio.wait_for(waiter, 1)
+
+    assert asyncio.run(run()) == ("a", "x")
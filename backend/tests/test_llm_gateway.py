@@ -0,0 +1,156 @@
+import asyncio
+
+import httpx
+import openai
+import pytest
+
+import openai_stub
+from llm_gateway import LLMGateway, LLMUnavailableError, TokenBucket
+
+MESSAGES = [{"role": "user", "content": "How is BTC doing?"}]
+
+
+class ScriptedRandom:
+    """Stands in for the stub's random module so fault rolls are deterministic"""
+
+    def __init__(self, rolls):
+        self.rolls = list(rolls)
+
+    def random(self):
+        return self.rolls.pop(0) if self.rolls else 1.0
+
+
+@pytest.fixture
+def stub(monkeypatch):
+    monkeypatch.setattr(openai_stub, "STUB_LATENCY_SECONDS", 0.0)
+    for name, value in (("error_rate", 0.0), ("rate_limit_rate", 0.0), ("retry_after_seconds", 0.0), ("outage", False)):
+        monkeypatch.setitem(openai_stub.faults, name, value)
+    return openai_stub
+
+
+def make_gateway(failure_threshold=3, reset_timeout=30.0, max_retries=3):
+    # The SDK's own retries are off so every attempt goes through the gateway
+    client = openai.AsyncOpenAI(
+        api_key="stub",
+        base_url="http://stub/v1",
+        max_retries=0,
+        http_client=httpx.AsyncClient(transport=httpx.ASGITransport(app=openai_stub.app))
+    )
+    gateway = LLMGateway(client, model="stub-model", max_concurrency=4)
+    gateway.max_retries = max_retries
+    gateway.retry_base_delay = 0.001
+    gateway.retry_max_delay = 0.001
+    gateway.breaker.failure_threshold = failure_threshold
+    gateway.breaker.reset_timeout = reset_timeout
+    return gateway
+
+
+def test_transient_errors_are_retried(stub, monkeypatch):
+    # A 500, then a 429, then a normal completion
+    stub.faults.update(error_rate=0.5, rate_limit_rate=0.25)
+    monkeypatch.setattr(stub, "random", ScriptedRandom([0.5, 0.1]))
+    gateway = make_gateway()
+
+    response = asyncio.run(gateway.complete(timeout=5, messages=MESSAGES))
+
+    assert response.choices[0].message.content.startswith("Stub response")
+    stats = gateway.get_stats()
+    assert stats["attempts"] == 3
+    assert stats["retries"] == 2
+    assert stats["succeeded"] == 1
+    assert stats["circuit_breaker"]["state"] == "closed"
+    assert stats["circuit_breaker"]["consecutive_failures"] == 0
+
+
+def test_client_errors_are_not_retried(stub):
+    gateway = make_gateway()
+
+    async def run():
+        # An unknown route gets a 404, which the provider answered deliberately
+        gateway.client = gateway.client.with_options(base_url="http://stub/missing")
+        await gateway.complete(timeout=5, messages=MESSAGES)
+
+    with pytest.raises(openai.NotFoundError):
+        asyncio.run(run())
+    assert gateway.stats["attempts"] == 1
+    assert gateway.breaker.state == "closed"
+
+
+def test_outage_opens_the_breaker_and_recovery_closes_it(stub):
+    stub.faults["outage"] = True
+    gateway = make_gateway(failure_threshold=2, reset_timeout=0.05, max_retries=5)
+
+    async def run():
+        # Retries stop as soon as the breaker opens
+        with pytest.raises(openai.InternalServerError):
+            await gateway.complete(timeout=5, messages=MESSAGES)
+        assert gateway.breaker.state == "open"
+        assert gateway.stats["attempts"] == 2
+        assert not gateway.available()
+
+        # While open, calls fail fast without reaching the provider
+        requests = stub.fault_stats["requests"]
+        with pytest.raises(LLMUnavailableError):
+            await gateway.complete(timeout=5, messages=MESSAGES)
+        assert stub.fault_stats["requests"] == requests
+        assert gateway.stats["rejected_circuit_open"] == 1
+
+        # After the reset timeout a failed trial call re-opens it
+        await asyncio.sleep(0.06)
+        assert gateway.available()
+        with pytest.raises(openai.InternalServerError):
+            await gateway.complete(timeout=5, messages=MESSAGES)
+        assert gateway.breaker.state == "open"
+        assert gateway.breaker.times_opened == 2
+
+        # Once the provider is back, the next trial call closes it
+        stub.faults["outage"] = False
+        await asyncio.sleep(0.06)
+        response = await gateway.complete(timeout=5, messages=MESSAGES)
+        assert response.choices[0].message.content
+        assert gateway.breaker.state == "closed"
+        assert gateway.available()
+
+    asyncio.run(run())
+
+
+def test_client_error_during_half_open_trial_leaves_the_breaker_open(stub):
+    stub.faults["outage"] = True
+    gateway = make_gateway(failure_threshold=1, reset_timeout=0.05, max_retries=0)
+
+    async def run():
+        with pytest.raises(openai.InternalServerError):
+            await gateway.complete(timeout=5, messages=MESSAGES)
+        await asyncio.sleep(0.06)
+
+        # A rejected request says nothing about the provider's health
+        client = gateway.client
+        gateway.client = client.with_options(base_url="http://stub/missing")
+        with pytest.raises(openai.NotFoundError):
+            await gateway.complete(timeout=5, messages=MESSAGES)
+        gateway.client = client
+        assert gateway.breaker.state == "half_open"
+        assert gateway.available()
+
+        # The next call is the trial; the provider is still down
+        with pytest.raises(openai.InternalServerError):
+            await gateway.complete(timeout=5, messages=MESSAGES)
+        assert gateway.breaker.state == "open"
+
+    asyncio.run(run())
+
+
+def test_failed_attempts_refund_their_token_reservation(stub):
+    stub.faults["outage"] = True
+    gateway = make_gateway(failure_threshold=10, max_retries=3)
+    # About one token a second: without refunds the third attempt would wait minutes
+    gateway.token_bucket = TokenBucket(rate_per_minute=60, capacity=1000)
+
+    async def run():
+        with pytest.raises(openai.InternalServerError):
+            await asyncio.wait_for(gateway.complete(timeout=5, estimated_tokens=400, messages=MESSAGES), 5)
+
+    asyncio.run(run())
+    assert gateway.stats["attempts"] == 4
+    assert gateway.stats["rate_limit_wait_seconds"] == 0
+    assert gateway.token_bucket.tokens == pytest.approx(1000, abs=1)
@@ -0,0 +1,111 @@
+import asyncio
+
+import pytest
+
+from llm_recorder import CallRecorder, LatencyModel, ReplayMissError, upstream_latency
+
+
+class FakeStream:
+    def __init__(self, chunks):
+        self.chunks = list(chunks)
+        self.closed = False
+
+    async def __aiter__(self):
+        for chunk in self.chunks:
+            yield chunk
+
+    async def close(self):
+        self.closed = True
+
+
+def record(cassette, calls):
+    recorder = CallRecorder("record", str(cassette))
+
+    async def run():
+        results = []
+        for kind, request, response in calls:
+            async def fn(response=response):
+                return response
+            results.append(await recorder.call(kind, request, fn))
+        return results
+
+    return recorder, asyncio.run(run())
+
+
+def test_replay_answers_from_the_cassette_without_calling_out(tmp_path):
+    cassette = tmp_path / "cassette.jsonl"
+    recorder, results = record(cassette, [
+        ("chat.completions", {"messages": ["a"]}, {"text": "first"}),
+        ("chat.completions", {"messages": ["b"]}, {"text": "second"}),
+        ("desearch.news", {"symbol": "BTC"}, {"summary": "news"}),
+    ])
+    assert results[0] == {"text": "first"} and recorder.recorded == 3
+
+    replayer = CallRecorder("replay", str(cassette), latency="none")
+
+    async def unreachable():
+        raise AssertionError("replay must not call out")
+
+    async def run():
+        return [
+            await replayer.call("chat.completions", {"messages": ["b"]}, unreachable),
+            # Live prices in the prompt: no exact match, the next recording of the kind
+            await replayer.call("chat.completions", {"messages": ["changed"]}, unreachable),
+            await replayer.call("desearch.news", {"symbol": "BTC"}, unreachable),
+        ]
+
+    assert asyncio.run(run()) == [{"text": "second"}, {"text": "first"}, {"summary": "news"}]
+    stats = replayer.get_stats()
+    assert (stats["exact_matches"], stats["fallback_matches"], stats["replayed"]) == (2, 1, 3)
+
+    with pytest.raises(ReplayMissError):
+        asyncio.run(replayer.call("desearch.topic", {}, unreachable))
+
+
+def test_replayed_latency_is_reported_to_the_benchmark(tmp_path):
+    cassette = tmp_path / "cassette.jsonl"
+    record(cassette, [("chat.completions", {}, {"text": "a"})])
+    replayer = CallRecorder("replay", str(cassette), latency="fixed:0.01")
+
+    async def run():
+        spent = []
+        upstream_latency.set(spent)
+        await replayer.call("chat.completions", {}, None)
+        return spent
+
+    assert asyncio.run(run()) == [0.01]
+
+
+def test_streams_are_recorded_and_replayed_chunk_by_chunk(tmp_path):
+    cassette = tmp_path / "cassette.jsonl"
+    recorder = CallRecorder("record", str(cassette))
+    live = FakeStream(["Hel", "lo"])
+
+    async def open_live():
+        return live
+
+    async def consume(recorder, fn):
+        stream = await recorder.stream("chat.stream", {}, fn, str, str)
+        chunks = [chunk async for chunk in stream]
+        await stream.close()
+        return chunks
+
+    recorded = asyncio.run(consume(recorder, open_live))
+    assert recorded == ["Hel", "lo"] and live.closed
+
+    replayer = CallRecorder("replay", str(cassette), latency="none")
+    replayed = asyncio.run(consume(replayer, None))
+    assert replayed == ["Hel", "lo"]
+    assert replayer.replayed == 1
+
+
+def test_synthetic_latency_is_seeded_and_unknown_models_rejected():
+    model, same_seed = LatencyModel("uniform:0.1,0.2", seed=7), LatencyModel("uniform:0.1,0.2", seed=7)
+    first = [model.sample(5.0) for _ in range(3)]
+
+    assert first == [same_seed.sample(5.0) for _ in range(3)]
+    assert len(set(first)) == 3
+    assert all(0.1 <= delay <= 0.2 for delay in first)
+    assert LatencyModel("recorded").sample(1.5) == 1.5
+    with pytest.raises(ValueError):
+        LatencyModel("gaussian:1")
@@ -0,0 +1,31 @@
+import time
+
+from market_snapshot import MarketSnapshot
+
+
+def test_sources_share_an_entry_and_the_latest_fields_win():
+    snapshot = MarketSnapshot(fresh_seconds=60, max_age_seconds=600)
+    snapshot.update("BTC-USD", {"price": 100.0, "rsi": 55.0}, source="yfinance")
+    time.sleep(0.001)
+    snapshot.update("btc", {"price": 101.0, "market_cap": 2e12}, source="coinmarketcap")
+
+    quote = snapshot.get("BTC-USD")
+
+    assert quote["symbol"] == "BTC"
+    assert (quote["price"], quote["rsi"], quote["market_cap"]) == (101.0, 55.0, 2e12)
+    assert quote["source"] == "coinmarketcap"
+    assert quote["sources"] == ["yfinance", "coinmarketcap"]
+    assert not quote["stale"]
+
+
+def test_old_quotes_are_flagged_stale_then_ignored():
+    snapshot = MarketSnapshot(fresh_seconds=0, max_age_seconds=600)
+    snapshot.update("ETH", {"price": 10.0}, source="coinmarketcap")
+    assert snapshot.get("ETH")["stale"]
+
+    snapshot.max_age_seconds = 0
+    assert snapshot.get("ETH") is None
+    assert snapshot.get_all() == []
+
+    stats = snapshot.get_stats()
+    assert (stats["stale_reads"], stats["missed_reads"], stats["fresh_reads"]) == (1, 1, 0)
@@ -0,0 +1,92 @@
+import asyncio
+
+import pytest
+
+from micro_batcher import MicroBatcher
+
+
+def make_batcher(**kwargs):
+    flushes = []
+
+    async def flush(key, items):
+        flushes.append((key, list(items)))
+        return [f"{key}:{item}" for item in items]
+
+    return MicroBatcher(flush, **kwargs), flushes
+
+
+def test_items_within_window_share_one_flush():
+    async def run():
+        batcher, flushes = make_batcher(window_seconds=0.05, max_batch_size=10)
+        results = await asyncio.gather(*(batcher.submit("a", i) for i in range(3)))
+        return results, flushes
+
+    results, flushes = asyncio.run(run())
+    assert results == ["a:0", "a:1", "a:2"]
+    assert flushes == [("a", [0, 1, 2])]
+
+
+def test_full_batch_flushes_before_window_ends():
+    async def run():
+        batcher, flushes = make_batcher(window_seconds=10, max_batch_size=2)
+        results = await asyncio.wait_for(asyncio.gather(batcher.submit("a", 1), batcher.submit("a", 2)), 1)
+        return results, flushes
+
+    results, flushes = asyncio.run(run())
+    assert results == ["a:1", "a:2"]
+    assert flushes == [("a", [1, 2])]
+
+
+def test_items_beyond_max_batch_size_go_to_the_next_batch():
+    async def run():
+        batcher, flushes = make_batcher(window_seconds=0.05, max_batch_size=2)
+        await asyncio.gather(*(batcher.submit("a", i) for i in range(5)))
+        return batcher, flushes
+
+    batcher, flushes = asyncio.run(run())
+    assert [items for _, items in flushes] == [[0, 1], [2, 3], [4]]
+    assert batcher.get_stats()["batches_flushed"] == 3
+
+
+def test_keys_are_batched_separately():
+    async def run():
+        batcher, flushes = make_batcher(window_seconds=0.05)
+        await asyncio.gather(batcher.submit("a", 1), batcher.submit("b", 2), batcher.submit("a", 3))
+        return flushes
+
+    flushes = asyncio.run(run())
+    assert sorted(flushes) == [("a", [1, 3]), ("b", [2])]
+
+
+def test_zero_window_flushes_each_submit():
+    async def run():
+        batcher, flushes = make_batcher(window_seconds=0)
+        await batcher.submit("a", 1)
+        await batcher.submit("a", 2)
+        return flushes
+
+    assert asyncio.run(run()) == [("a", [1]), ("a", [2])]
+
+
+def test_flush_error_reaches_every_caller_in_the_batch():
+    async def flush(key, items):
+        raise RuntimeError("upstream failed")
+
+    async def run():
+        batcher = MicroBatcher(flush, window_seconds=0.01)
+        return await asyncio.gather(batcher.submit("a", 1), batcher.submit("a", 2), return_exceptions=True)
+
+    results = asyncio.run(run())
+    assert all(isinstance(r, RuntimeError) for r in results)
+
+
+def test_wrong_result_count_is_an_error():
+    async def flush(key, items):
+        return items[:1]
+
+    async def run():
+        batcher = MicroBatcher(flush, window_seconds=0.01)
+        await asyncio.gather(batcher.submit("a", 1), batcher.submit("a", 2))
+
+    with pytest.raises(ValueError):
+        asyncio.run(run())
@@ -0,0 +1,91 @@
+import asyncio
+
+import pytest
+
+from desearch_service import DesearchService
+
+
+class FakeSearch:
+    """Stands in for the Desearch call: counts searches and answers after a short delay"""
+
+    def __init__(self):
+        self.calls = 0
+        self.fail = False
+
+    async def __call__(self, symbol, timeframe):
+        self.calls += 1
+        await asyncio.sleep(0.01)
+        if self.fail:
+            return {"summary": "down", "success": False}
+        return {"summary": f"news {self.calls}", "sources": [], "success": True}
+
+
+@pytest.fixture
+def news(monkeypatch):
+    monkeypatch.setenv("DESEARCH_API_KEY", "test")
+    service = DesearchService()
+    service._fetch_market_news = FakeSearch()
+    return service
+
+
+def test_concurrent_misses_share_one_search_and_hits_skip_it(news):
+    async def run():
+        results = await asyncio.gather(*(news.get_market_news("BTC") for _ in range(5)))
+        return results, await news.get_market_news("BTC")
+
+    results, again = asyncio.run(run())
+
+    assert news._fetch_market_news.calls == 1
+    assert {r["summary"] for r in results} == {"news 1"}
+    assert again["summary"] == "news 1"
+
+
+def test_stale_news_is_served_while_it_refreshes_in_the_background(news):
+    async def run():
+        await news.get_market_news("BTC")
+        news.news_cache.default_ttl = 0
+        stale = await news.get_market_news("BTC")
+        await asyncio.sleep(0.05)
+        news.news_cache.default_ttl = 300
+        return stale, await news.get_market_news("BTC")
+
+    stale, refreshed = asyncio.run(run())
+
+    assert stale["summary"] == "news 1"
+    assert refreshed["summary"] == "news 2"
+    assert news.get_cache_stats()["background_refreshes"] == 1
+
+
+def test_news_older_than_the_stale_limit_is_fetched_again(news):
+    async def run():
+        await news.get_market_news("BTC")
+        news.news_cache.default_ttl = 0
+        news.news_max_stale_seconds = 0
+        return await news.get_market_news("BTC")
+
+    assert asyncio.run(run())["summary"] == "news 2"
+
+
+def test_failed_searches_are_not_cached(news):
+    news._fetch_market_news.fail = True
+
+    async def run():
+        failed = await news.get_market_news("BTC")
+        news._fetch_market_news.fail = False
+        return failed, await news.get_market_news("BTC")
+
+    failed, retried = asyncio.run(run())
+
+    assert not failed["success"]
+    assert retried["summary"] == "news 2"
+
+
+def test_a_caller_timing_out_still_warms_the_cache(news):
+    async def run():
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(news.get_market_news("BTC"), 0.001)
+        await asyncio.sleep(0.05)
+        return await news.get_market_news("BTC")
+
+    assert asyncio.run(run())["summary"] == "news 1"
+    assert news._fetch_market_news.calls == 1
@@ -0,0 +1,243 @@
+import asyncio
+import json
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from models import AnalysisResult, PerformanceData, Strategy
+from performance_analyzer import PerformanceAnalyzer
+
+
+class FakeAgent:
+    def __init__(self):
+        self.gateway = SimpleNamespace(available=lambda: True)
+        self.fail = False
+
+    async def analyze_strategy(self, strategy, performance, raise_on_error=False):
+        if self.fail:
+            raise RuntimeError("LLM call failed")
+        return AnalysisResult(action="keep", feedback="reviewed")
+
+    async def analyze_strategy_batch(self, strategy, performances, raise_on_error=False):
+        return await self.analyze_strategy(strategy, performances[-1], raise_on_error)
+
+
+@pytest.fixture
+def analyzer(tmp_path, monkeypatch):
+    analyzer = PerformanceAnalyzer(FakeAgent(), str(tmp_path))
+    saved = []
+
+    async def save_analysis_result(file_path, analysis_result, performance_data, reviewed_by):
+        saved.append(reviewed_by)
+
+    async def broadcast(*args, **kwargs):
+        pass
+
+    monkeypatch.setattr(analyzer, "save_analysis_result", save_analysis_result)
+    monkeypatch.setattr(analyzer, "_broadcast_strategy_update", broadcast)
+    monkeypatch.setattr("performance_analyzer.websocket_manager.broadcast_analysis_status", broadcast)
+    analyzer.saved = saved
+    return analyzer
+
+
+def make_record():
+    strategy = Strategy(
+        strategy_id="s1", name="Test",
+        risk_profile={"max_position_pct": 0.2, "stop_loss_pct": 0.03, "take_profit_pct": 0.06}, logic=[]
+    )
+    performance = PerformanceData(
+        timestamp="2026-10-18T10:00:00", market="BTC-USD", strategy_id="s1", signal="HOLD",
+        price=1.0, qty=0.0, position_after=0.0, pnl_realized=0.0, pnl_unrealized=0.0
+    )
+    return {
+        "file_path": "perf.json", "performance_data": {}, "strategy_data": {},
+        "strategy": strategy, "performance": performance, "portfolio_metrics": None
+    }
+
+
+def test_failed_llm_review_is_not_saved_and_keeps_no_baseline(analyzer):
+    analyzer.trading_agent.fail = True
+    results = asyncio.run(analyzer._analyze_batch("s1", [make_record(), make_record()]))
+
+    # Not persisted, so backfill counts the files as failed and retries them
+    assert results == [None, None]
+    assert analyzer.saved == []
+    assert "s1" not in analyzer.prescreen.baselines
+    # The live answer is still a keep, visible in the recent analyses
+    assert analyzer.performance_cache["perf.json"]["reviewed_by"] == "fallback"
+    assert analyzer.performance_cache["perf.json"]["analysis_result"].action == "keep"
+    assert analyzer.prescreen.fallbacks == 1
+
+
+def test_unavailable_llm_is_not_called_and_not_saved(analyzer):
+    analyzer.trading_agent.gateway = SimpleNamespace(available=lambda: False)
+    analyzer.trading_agent.fail = True
+
+    assert asyncio.run(analyzer._analyze_batch("s1", [make_record()])) == [None]
+    assert analyzer.saved == []
+
+
+def test_successful_llm_review_records_the_baseline(analyzer):
+    asyncio.run(analyzer._analyze_batch("s1", [make_record()]))
+
+    assert analyzer.saved == ["llm"]
+    assert "s1" in analyzer.prescreen.baselines
+
+
+def test_backfill_retries_files_that_only_got_a_fallback(tmp_path, monkeypatch):
+    async def broadcast(*args, **kwargs):
+        pass
+
+    monkeypatch.setattr("performance_analyzer.websocket_manager.broadcast_analysis_status", broadcast)
+    monkeypatch.setattr("performance_analyzer.websocket_manager.broadcast_strategy_update", broadcast)
+    analyzer = PerformanceAnalyzer(FakeAgent(), str(tmp_path), batch_window_seconds=0.01)
+    performance_file = analyzer.store.path_for("perf_s1.json")
+    performance_file.write_text(json.dumps({
+        "strategy": {"strategy_id": "s1", "name": "Test"},
+        "performance": {"timestamp": "2026-10-18T10:00:00", "signal": "HOLD"}
+    }))
+    checkpoint = tmp_path / "checkpoint"
+
+    analyzer.trading_agent.fail = True
+    status = asyncio.run(analyzer.backfill(concurrency=1, checkpoint_file=str(checkpoint)))
+    assert (status["completed"], status["failed"]) == (0, 1)
+    assert checkpoint.read_text() == ""
+    assert not analyzer._analysis_file_for(performance_file).exists()
+
+    # Once the LLM is back, the resumed backfill reviews the file
+    analyzer.trading_agent.fail = False
+    status = asyncio.run(analyzer.backfill(concurrency=1, checkpoint_file=str(checkpoint)))
+    assert (status["completed"], status["skipped"]) == (1, 0)
+    assert json.loads(analyzer._analysis_file_for(performance_file).read_text())["reviewed_by"] == "llm"
+
+
+def test_live_burst_analyzes_only_the_newest_record_without_batching(analyzer):
+    calls = []
+
+    async def analyze_strategy(strategy, performance, raise_on_error=False):
+        calls.append(performance.timestamp)
+        return AnalysisResult(action="keep", feedback="reviewed")
+
+    analyzer.trading_agent.analyze_strategy = analyze_strategy
+    analyzer.batcher.window_seconds = 60
+
+    def record(minute):
+        return {
+            "strategy": {"strategy_id": "s1", "name": "Test"},
+            "performance": {"timestamp": f"2026-10-18T10:{minute:02d}:00", "signal": "BUY"}
+        }
+
+    async def run():
+        # A burst queued while the worker is busy elsewhere
+        for minute in range(3):
+            analyzer._enqueue_record(record(minute), None, 0.0)
+        worker = asyncio.create_task(analyzer._run_analysis_worker())
+        # Done well within the 60s batching window: live records do not wait for it
+        async def analyzed():
+            while analyzer.work_queue.completed < 1:
+                await asyncio.sleep(0.01)
+        await asyncio.wait_for(analyzed(), 5)
+        worker.cancel()
+
+    asyncio.run(run())
+    assert calls == ["2026-10-18T10:02:00"]
+    assert analyzer.work_queue.get_stats()["superseded"] == 2
+    assert analyzer.batcher.get_stats()["items_submitted"] == 0
+
+
+def write_performance_files(analyzer, strategies, per_strategy=1):
+    paths = []
+    for s in range(strategies):
+        for i in range(per_strategy):
+            path = analyzer.store.path_for(f"perf_s{s}_{i}.json")
+            path.write_text(json.dumps({
+                "strategy": {"strategy_id": f"s{s}", "name": "Test"},
+                "performance": {"timestamp": f"2026-10-18T10:00:{i:02d}", "signal": "BUY"}
+            }))
+            paths.append(path)
+    return paths
+
+
+@pytest.fixture
+def backfill_analyzer(tmp_path, monkeypatch):
+    async def broadcast(*args, **kwargs):
+        pass
+
+    monkeypatch.setattr("performance_analyzer.websocket_manager.broadcast_analysis_status", broadcast)
+    monkeypatch.setattr("performance_analyzer.websocket_manager.broadcast_strategy_update", broadcast)
+    return PerformanceAnalyzer(FakeAgent(), str(tmp_path), batch_window_seconds=0.01, max_batch_size=3)
+
+
+def test_backfill_bounds_llm_calls_in_flight(backfill_analyzer):
+    analyzer = backfill_analyzer
+    in_flight, peak, batch_sizes = [0], [0], []
+
+    async def review(strategy, performances):
+        in_flight[0] += 1
+        peak[0] = max(peak[0], in_flight[0])
+        batch_sizes.append(len(performances))
+        await asyncio.sleep(0.02)
+        in_flight[0] -= 1
+        return AnalysisResult(action="keep", feedback="reviewed")
+
+    analyzer.trading_agent.analyze_strategy = lambda strategy, performance, raise_on_error=False: review(strategy, [performance])
+    analyzer.trading_agent.analyze_strategy_batch = lambda strategy, performances, raise_on_error=False: review(strategy, performances)
+    write_performance_files(analyzer, strategies=6, per_strategy=3)
+
+    status = asyncio.run(analyzer.backfill(concurrency=2, checkpoint_file=str(analyzer.watch_directory / "cp")))
+
+    assert (status["completed"], status["failed"]) == (18, 0)
+    assert peak[0] == 2
+    # Files of one strategy still share an LLM call
+    assert sum(batch_sizes) == 18 and len(batch_sizes) < 18
+    assert analyzer._llm_slots is None
+
+
+def test_backfill_resumes_from_the_checkpoint_and_force_restarts(backfill_analyzer):
+    analyzer = backfill_analyzer
+    paths = write_performance_files(analyzer, strategies=3)
+    checkpoint = analyzer.watch_directory / "cp"
+    # An earlier run finished the first file but was interrupted before saving its analysis
+    checkpoint.write_text(f"{paths[0]}\n")
+
+    status = asyncio.run(analyzer.backfill(concurrency=2, checkpoint_file=str(checkpoint)))
+    assert (status["total"], status["skipped"], status["completed"]) == (3, 1, 2)
+    assert sorted(checkpoint.read_text().split()) == sorted(str(p) for p in paths)
+
+    # Everything done: a rerun has nothing to do, force analyzes all again
+    assert asyncio.run(analyzer.backfill(checkpoint_file=str(checkpoint)))["completed"] == 0
+    status = asyncio.run(analyzer.backfill(checkpoint_file=str(checkpoint), force=True))
+    assert (status["skipped"], status["completed"]) == (0, 3)
+
+
+def test_in_process_records_skip_the_file_watcher(analyzer, tmp_path):
+    record = {
+        "strategy": {"strategy_id": "s1", "name": "Test"},
+        "performance": {"timestamp": "2026-10-18T10:00:00", "signal": "BUY"}
+    }
+    path = str(tmp_path / "perf_s1.json")
+    assert not analyzer.submit_record(record, path)
+
+    analyzer.loop = analyzer._start_analysis_loop()
+    worker = asyncio.run_coroutine_threadsafe(analyzer._run_analysis_worker(), analyzer.loop)
+    try:
+        # Called from the producer's thread, like the data generator does
+        assert analyzer.submit_record(record, path)
+        deadline = time.monotonic() + 5
+        while analyzer.work_queue.completed < 1 and time.monotonic() < deadline:
+            time.sleep(0.01)
+    finally:
+        worker.cancel()
+        analyzer.loop.call_soon_threadsafe(analyzer.loop.stop)
+
+    assert analyzer.saved == ["llm"]
+    stats = analyzer.get_ingest_stats()
+    assert (stats["records_ingested"], stats["records_dequeued"]) == (1, 1)
+
+    # The watchdog event for the persisted file is ignored; other files are still picked up
+    submitted = []
+    analyzer.submit_file = submitted.append
+    analyzer.file_handler.on_created(SimpleNamespace(is_directory=False, src_path=path))
+    analyzer.file_handler.on_created(SimpleNamespace(is_directory=False, src_path=str(tmp_path / "other.json")))
+    assert submitted == [str(tmp_path / "other.json")]
@@ -0,0 +1,95 @@
+import json
+from datetime import datetime
+
+from performance_store import PerformanceStore
+
+DAY = datetime(2025, 1, 1, 9)
+
+
+def write_record(store, name, when=DAY, analyzed=True, reviewed_by="llm"):
+    path = store.path_for(f"{name}.json", when)
+    path.write_text(json.dumps({"strategy": {"strategy_id": name}, "performance": {"signal": "HOLD"}}))
+    if analyzed:
+        (path.parent / f"{name}_analysis.json").write_text(json.dumps({
+            "reviewed_by": reviewed_by,
+            "analyzed_at": when.isoformat(),
+            "analysis_result": {"action": "keep", "feedback": name, "new_strategy": None}
+        }))
+    return path
+
+
+def test_files_are_partitioned_by_hour(tmp_path):
+    store = PerformanceStore(str(tmp_path))
+    path = write_record(store, "s1")
+
+    assert path.relative_to(tmp_path).parts[:4] == ("2025", "01", "01", "09")
+    assert list(store.iter_performance_files()) == [path]
+
+
+def test_compaction_archives_analyzed_files_and_keeps_the_rest(tmp_path):
+    store = PerformanceStore(str(tmp_path))
+    write_record(store, "s1")
+    write_record(store, "s2", when=DAY.replace(hour=10))
+    pending = write_record(store, "s3", analyzed=False)
+
+    summary = store.compact(retention_days=1)
+
+    assert (summary["files_compacted"], summary["files_deferred"]) == (2, 1)
+    assert store.archive_path_for(DAY).exists()
+    # The unanalyzed file waits in its partition for backfill
+    assert list(store.iter_performance_files()) == [pending]
+    assert [r["analysis"]["feedback"] for r in store.iter_archived_records(DAY)] == ["s1", "s2"]
+
+
+def test_rerunning_compaction_merges_without_duplicates(tmp_path):
+    store = PerformanceStore(str(tmp_path))
+    write_record(store, "s1")
+    pending = write_record(store, "s2", analyzed=False)
+    store.compact(retention_days=1)
+
+    # Backfill analyzes the remaining file, the next run archives it too
+    write_record(store, "s2")
+    summary = store.compact(retention_days=1)
+    store.compact(retention_days=1)
+
+    assert summary["files_compacted"] == 1
+    assert not pending.exists()
+    assert not (tmp_path / "2025" / "01" / "01").exists()
+    assert sorted(r["file"] for r in store.iter_archived_records(DAY)) == [
+        "2025/01/01/09/s1.json", "2025/01/01/09/s2.json"
+    ]
+
+
+def test_recent_days_are_not_compacted(tmp_path):
+    store = PerformanceStore(str(tmp_path))
+    path = write_record(store, "s1", when=datetime.now())
+
+    assert store.compact(retention_days=1)["files_compacted"] == 0
+    assert path.exists()
+
+
+def test_day_records_cover_archived_and_raw_analyses(tmp_path):
+    store = PerformanceStore(str(tmp_path))
+    write_record(store, "s1", reviewed_by="prescreen")
+    store.compact(retention_days=1)
+    write_record(store, "s2")
+    write_record(store, "s3", analyzed=False)
+
+    records = list(store.iter_day_records(DAY))
+
+    assert [(r["performance"]["strategy"]["strategy_id"], r["reviewed_by"]) for r in records] == [
+        ("s1", "prescreen"), ("s2", "llm")
+    ]
+    assert list(store.iter_day_records(datetime(2024, 1, 1))) == []
+
+
+def test_legacy_flat_files_are_migrated_with_their_analysis(tmp_path):
+    store = PerformanceStore(str(tmp_path))
+    (tmp_path / "old.json").write_text("{}")
+    (tmp_path / "old_analysis.json").write_text("{}")
+
+    assert store.migrate_flat_files() == 1
+    assert not (tmp_path / "old.json").exists()
+    migrated = list(store.iter_performance_files())
+    assert [p.name for p in migrated] == ["old.json"]
+    assert (migrated[0].parent / "old_analysis.json").exists()
@@ -0,0 +1,60 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+import crypto_endpoints
+from holdings_store import HoldingsStore
+from portfolio_service import PortfolioService
+
+
+class FakeCMC:
+    def __init__(self, prices):
+        self.prices = prices
+        self.lookups = 0
+
+    async def get_multiple_prices(self, symbols):
+        self.lookups += 1
+        return {"success": True, "data": {s: {"price": self.prices[s], "percent_change_24h": 0.0} for s in symbols}}
+
+
+@pytest.fixture
+def client(tmp_path):
+    store = HoldingsStore(str(tmp_path / "holdings.db"), seed_demo=False)
+    store.create_portfolio(HoldingsStore.DEFAULT_PORTFOLIO)
+    store.add_lot(HoldingsStore.DEFAULT_PORTFOLIO, "BTC", 1.0, 100.0)
+    service = PortfolioService(FakeCMC({"BTC": 200.0, "ETH": 20.0}), store)
+
+    app = FastAPI()
+    app.include_router(crypto_endpoints.router)
+    app.dependency_overrides[crypto_endpoints.get_portfolio_service] = lambda: service
+    yield TestClient(app), service
+    store.close()
+
+
+def test_batch_valuation_reports_unrealized_and_realized_pl(client):
+    http, service = client
+    assert http.post("/portfolios", json={"id": "p1"}).status_code == 200
+    imported = http.post("/portfolios/p1/transactions", json={"transactions": [
+        {"symbol": "ETH", "side": "buy", "quantity": 2.0, "price": 10.0, "executed_at": "2025-01-01T00:00:00Z"},
+        {"symbol": "ETH", "side": "sell", "quantity": 1.0, "price": 30.0, "executed_at": "2025-01-02T00:00:00Z"}
+    ]})
+    assert imported.json()["realized_pl"] == pytest.approx(20.0)
+
+    response = http.post("/portfolios/value/batch", json={"portfolio_ids": ["default", "p1"]}).json()
+    assert response["count"] == 2
+    assert service.cmc_service.lookups == 1
+    p1 = response["portfolios"]["p1"]
+    assert p1["total_value"] == pytest.approx(20.0)
+    assert p1["total_unrealized_pl"] == pytest.approx(10.0)
+    assert p1["total_realized_pl"] == pytest.approx(20.0)
+    assert response["portfolios"]["default"]["total_realized_pl"] == 0.0
+
+
+def test_delete_portfolio(client):
+    http, _ = client
+    http.post("/portfolios", json={"id": "p1"})
+
+    assert http.delete("/portfolios/p1").json() == {"deleted": "p1"}
+    assert http.delete("/portfolios/p1").status_code == 404
+    assert http.get("/portfolios/p1/lots").status_code == 404
+    assert http.delete("/portfolios/default").status_code == 409
@@ -0,0 +1,174 @@
+import asyncio
+import json
+import time
+from datetime import datetime
+
+import pandas as pd
+import pytest
+
+import portfolio_service
+from holdings_store import HoldingsStore
+from portfolio_service import HistoryUnavailableError, PortfolioService
+
+
+class FakeDownloads:
+    """Stands in for yfinance: records each call and answers from a queue of frames"""
+
+    def __init__(self, *frames):
+        self.frames = list(frames)
+        self.calls = []
+
+    def __call__(self, tickers, **kwargs):
+        self.calls.append(kwargs)
+        frame = self.frames.pop(0) if len(self.frames) > 1 else self.frames[0]
+        if isinstance(frame, Exception):
+            raise frame
+        return frame.reindex(columns=tickers)
+
+
+def closes(start, days, price=100.0, tickers=("BTC-USD",)):
+    index = pd.date_range(start, periods=days, freq="D")
+    return pd.DataFrame({ticker: [price + i for i in range(days)] for ticker in tickers}, index=index)
+
+
+def set_today(monkeypatch, day):
+    class FixedDatetime(datetime):
+        @classmethod
+        def now(cls, tz=None):
+            return datetime.fromisoformat(day)
+
+    monkeypatch.setattr(portfolio_service, "datetime", FixedDatetime)
+
+
+@pytest.fixture
+def service(tmp_path):
+    store = HoldingsStore(str(tmp_path / "holdings.db"), seed_demo=False)
+    store.create_portfolio(HoldingsStore.DEFAULT_PORTFOLIO)
+    store.add_lot(HoldingsStore.DEFAULT_PORTFOLIO, "BTC", 2.0, 50.0)
+    service = PortfolioService(None, store)
+    yield service
+    store.close()
+
+
+def test_empty_first_download_raises_and_is_not_cached(service):
+    downloads = FakeDownloads(pd.DataFrame(), closes("2026-01-01", 30))
+    service._download_closes = downloads
+
+    with pytest.raises(HistoryUnavailableError):
+        asyncio.run(service._history_frame(["BTC-USD"], "1mo"))
+    assert service._history_frames.get((("BTC-USD",), "1mo"), allow_stale=True) is None
+
+    # The next request downloads again instead of serving no history all day
+    frame = asyncio.run(service._history_frame(["BTC-USD"], "1mo"))
+    assert len(frame["closes"]) == 30
+    assert len(downloads.calls) == 2
+
+
+def test_risk_metrics_without_history_is_unavailable_not_invalid(service):
+    service._download_closes = FakeDownloads(pd.DataFrame())
+
+    with pytest.raises(HistoryUnavailableError):
+        asyncio.run(service.get_risk_metrics())
+
+
+def test_history_is_downloaded_once_a_day_then_incrementally(service, monkeypatch):
+    first = closes("2026-01-01", 10)
+    # The next day: the last cached bar is final now, plus one new bar
+    recent = pd.DataFrame({"BTC-USD": [999.0, 111.0]}, index=pd.date_range("2026-01-10", periods=2, freq="D"))
+    downloads = FakeDownloads(first, recent)
+    service._download_closes = downloads
+
+    set_today(monkeypatch, "2026-01-10T12:00:00")
+    frame = asyncio.run(service._history_frame(["BTC-USD"], "max"))
+    again = asyncio.run(service._history_frame(["BTC-USD"], "max"))
+    assert again["version"] == frame["version"]
+    assert downloads.calls == [{"period": "max"}]
+
+    set_today(monkeypatch, "2026-01-11T12:00:00")
+    refreshed = asyncio.run(service._history_frame(["BTC-USD"], "max"))
+    assert downloads.calls[1] == {"start": "2026-01-10"}
+    assert refreshed["version"] != frame["version"]
+    assert len(refreshed["closes"]) == 11
+    assert refreshed["closes"]["BTC-USD"].iloc[-2:].tolist() == [999.0, 111.0]
+
+
+def test_failed_incremental_refresh_keeps_serving_the_cached_frame(service, monkeypatch):
+    downloads = FakeDownloads(closes("2026-01-01", 10), RuntimeError("yfinance down"))
+    service._download_closes = downloads
+
+    set_today(monkeypatch, "2026-01-10T12:00:00")
+    frame = asyncio.run(service._history_frame(["BTC-USD"], "max"))
+    set_today(monkeypatch, "2026-01-11T12:00:00")
+    assert asyncio.run(service._history_frame(["BTC-USD"], "max")) is frame
+
+
+def test_concurrent_first_requests_share_one_download(service):
+    downloads = FakeDownloads(closes("2026-01-01", 30))
+    service._download_closes = downloads
+
+    async def run():
+        return await asyncio.gather(*(service._history_frame(["BTC-USD"], "1mo") for _ in range(5)))
+
+    frames = asyncio.run(run())
+    assert len(downloads.calls) == 1
+    assert all(frame is frames[0] for frame in frames)
+
+
+def test_history_response_is_reused_until_holdings_change(service):
+    service._download_closes = FakeDownloads(closes("2026-01-01", 30))
+
+    history = json.loads(asyncio.run(service.get_portfolio_history_json("MAX")))
+    assert history[0] == {"date": "2026-01-01", "value": 200.0}
+    assert asyncio.run(service.get_portfolio_history_json("MAX")) == json.dumps(history, separators=(",", ":"))
+
+    service.store.add_lot(HoldingsStore.DEFAULT_PORTFOLIO, "BTC", 1.0, 50.0)
+    history = json.loads(asyncio.run(service.get_portfolio_history_json("MAX")))
+    assert history[0]["value"] == 300.0
+
+
+def test_waiters_keep_the_lock_after_a_failed_first_download(service):
+    frame = closes("2026-01-01", 30)
+    calls, in_flight, peak = [], [0], [0]
+
+    def download(tickers, **kwargs):
+        calls.append(kwargs)
+        in_flight[0] += 1
+        peak[0] = max(peak[0], in_flight[0])
+        try:
+            time.sleep(0.05)
+            if len(calls) == 1:
+                raise RuntimeError("yfinance down")
+            return frame
+        finally:
+            in_flight[0] -= 1
+
+    service._download_closes = download
+
+    async def late_caller():
+        # Arrives while the waiter that took over is downloading
+        while len(calls) < 2:
+            await asyncio.sleep(0.005)
+        return await service._history_frame(["BTC-USD"], "1mo")
+
+    async def run():
+        return await asyncio.gather(
+            service._history_frame(["BTC-USD"], "1mo"),
+            service._history_frame(["BTC-USD"], "1mo"),
+            late_caller(),
+            return_exceptions=True
+        )
+
+    first, second, late = asyncio.run(run())
+    assert isinstance(first, HistoryUnavailableError)
+    assert late is second
+    assert peak[0] == 1
+    assert len(calls) == 2
+
+
+def test_lock_of_a_failed_key_is_dropped_once_idle(service):
+    service._download_closes = FakeDownloads(pd.DataFrame())
+
+    with pytest.raises(HistoryUnavailableError):
+        asyncio.run(service._history_frame(["NOPE-USD"], "1mo"))
+    assert service._history_locks == {}
+    assert service._history_lock_users == {}
@@ -0,0 +1,90 @@
+import pytest
+
+from models import PerformanceData
+from prescreen import PreScreen
+
+
+def perf(timestamp="2026-10-18T10:00:00+00:00", signal="HOLD", pnl=0.0):
+    return PerformanceData(
+        timestamp=timestamp, market="BTC-USD", strategy_id="s1", signal=signal,
+        price=100.0, qty=0.0, position_after=0.0, pnl_realized=0.0, pnl_unrealized=pnl
+    )
+
+
+def record(performance, portfolio_metrics=None):
+    return {"performance": performance, "portfolio_metrics": portfolio_metrics}
+
+
+@pytest.fixture
+def prescreen():
+    return PreScreen(
+        enabled=True,
+        max_drawdown_pct=0.03,
+        max_equity_change_pct=0.02,
+        max_win_rate_change=0.1,
+        max_review_interval_seconds=3600,
+        reference_capital=10000
+    )
+
+
+def test_first_record_escalates_without_baseline(prescreen):
+    assert prescreen.screen("s1", [record(perf())]) == "no_baseline"
+
+
+def test_quiet_update_within_thresholds_is_kept_locally(prescreen):
+    prescreen.record_review("s1", perf())
+    assert prescreen.screen("s1", [record(perf("2026-10-18T10:30:00+00:00", pnl=50))]) is None
+    assert prescreen.get_stats()["short_circuited"] == 1
+    assert prescreen.local_keep("s1").action == "keep"
+
+
+def test_trade_signal_escalates(prescreen):
+    prescreen.record_review("s1", perf())
+    assert prescreen.screen("s1", [record(perf(signal="BUY"))]) == "trade_signal"
+
+
+@pytest.mark.parametrize("pnl, expected", [(199, None), (200, "pnl_change"), (-300, "drawdown")])
+def test_equity_thresholds(prescreen, pnl, expected):
+    prescreen.record_review("s1", perf())
+    assert prescreen.screen("s1", [record(perf(pnl=pnl))]) == expected
+
+
+def test_drawdown_is_measured_from_peak_since_review(prescreen):
+    prescreen.max_equity_change_pct = 1.0
+    prescreen.record_review("s1", perf())
+    # Up 5%, then back to +1.5%: within the P&L band but 3.3% below the peak
+    assert prescreen.screen("s1", [record(perf(pnl=500))]) is None
+    assert prescreen.screen("s1", [record(perf(pnl=150))]) == "drawdown"
+
+
+def test_win_rate_change_escalates(prescreen):
+    prescreen.record_review("s1", perf(), {"portfolio_value": 10000, "win_rate": 0.5})
+    assert prescreen.screen("s1", [record(perf(), {"portfolio_value": 10000, "win_rate": 0.55})]) is None
+    assert prescreen.screen("s1", [record(perf(), {"portfolio_value": 10000, "win_rate": 0.65})]) == "win_rate_change"
+
+
+def test_review_interval_uses_record_timestamps(prescreen):
+    prescreen.record_review("s1", perf("2026-10-18T10:00:00+00:00"))
+    assert prescreen.screen("s1", [record(perf("2026-10-18T10:59:59+00:00"))]) is None
+    assert prescreen.screen("s1", [record(perf("2026-10-18T11:00:00+00:00"))]) == "review_interval"
+
+
+def test_mixed_naive_aware_and_unparseable_timestamps_do_not_raise(prescreen):
+    prescreen.record_review("s1", perf("2026-10-18T10:00:00+02:00"))
+    prescreen.screen("s1", [record(perf("2026-10-18T10:00:00"))])
+    prescreen.screen("s1", [record(perf("not a timestamp"))])
+    prescreen.record_review("s1", perf("not a timestamp"))
+    prescreen.screen("s1", [record(perf("2026-10-18T10:00:00"))])
+
+
+def test_batch_escalates_if_any_record_crosses_a_threshold(prescreen):
+    prescreen.record_review("s1", perf())
+    records = [record(perf(signal="SELL")), record(perf(pnl=10))]
+    assert prescreen.screen("s1", records) == "trade_signal"
+    assert prescreen.get_stats()["escalated"] == 2
+
+
+def test_disabled_prescreen_escalates_everything(prescreen):
+    prescreen.enabled = False
+    prescreen.record_review("s1", perf())
+    assert prescreen.screen("s1", [record(perf())]) == "disabled"
@@ -0,0 +1,147 @@
+import asyncio
+
+import pytest
+
+from holdings_store import HoldingsStore
+from portfolio_service import PortfolioService
+from price_feed import PORTFOLIO, FeedPoller, PriceFeed
+
+
+class FakeCMC:
+    def __init__(self, prices):
+        self.prices = dict(prices)
+        self.requested = []
+
+    async def get_multiple_prices(self, symbols):
+        self.requested.append(list(symbols))
+        data = {s: {"price": self.prices[s], "percent_change_24h": 1.0} for s in symbols if s in self.prices}
+        return {"success": True, "data": data}
+
+
+class FakeManager:
+    def __init__(self, connections):
+        self.active_connections = list(connections)
+        self.sent = []
+
+    async def send_json(self, data, websocket):
+        self.sent.append(data)
+        return True
+
+    async def send_json_to(self, data, connections):
+        self.sent.append(data)
+        return len(connections)
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = HoldingsStore(str(tmp_path / "holdings.db"), seed_demo=False)
+    store.create_portfolio(HoldingsStore.DEFAULT_PORTFOLIO)
+    store.add_lot(HoldingsStore.DEFAULT_PORTFOLIO, "BTC", 1.0, 100.0)
+    yield store
+    store.close()
+
+
+def make_feed(cmc, store=None):
+    client = object()
+    manager = FakeManager([client])
+    service = PortfolioService(cmc, store) if store is not None else None
+    feed = PriceFeed(cmc, service, manager=manager)
+    return feed, manager, client
+
+
+def poll(feed, poller):
+    sent = len(feed.manager.sent)
+    asyncio.run(feed._poll(poller))
+    return feed.manager.sent[sent:]
+
+
+def test_only_changed_quotes_are_pushed_after_the_first_snapshot():
+    cmc = FakeCMC({"BTC": 100.0, "ETH": 10.0})
+    feed, _, client = make_feed(cmc)
+    poller = FeedPoller(frozenset({"BTC", "ETH"}))
+    poller.subscribers.add(client)
+
+    first = poll(feed, poller)
+    assert [(m["type"], m["full"], sorted(m["data"])) for m in first] == [("price_update", True, ["BTC", "ETH"])]
+
+    assert poll(feed, poller) == []
+    assert feed.unchanged_polls == 1
+
+    cmc.prices["ETH"] = 11.0
+    changed = poll(feed, poller)
+    assert [(m["full"], list(m["data"])) for m in changed] == [(False, ["ETH"])]
+    assert feed.get_stats()["price_updates"] == 2
+
+
+def test_portfolio_delta_carries_only_changed_positions(store):
+    cmc = FakeCMC({"BTC": 100.0, "ETH": 10.0})
+    store.add_lot(HoldingsStore.DEFAULT_PORTFOLIO, "ETH", 2.0, 10.0)
+    feed, _, client = make_feed(cmc, store)
+    poller = FeedPoller(PORTFOLIO)
+    poller.subscribers.add(client)
+
+    first = poll(feed, poller)
+    assert [m["type"] for m in first] == ["price_update", "portfolio_update"]
+    assert first[1]["full"] and first[1]["data"]["total_value"] == 120.0
+
+    cmc.prices["BTC"] = 150.0
+    portfolio = poll(feed, poller)[1]
+    assert not portfolio["full"]
+    assert portfolio["data"]["total_value"] == 170.0
+    assert [p["symbol"] for p in portfolio["data"]["positions"]] == ["BTC"]
+    assert portfolio["data"]["removed_positions"] == []
+
+
+def test_holdings_change_is_pushed_without_a_quote_change(store):
+    cmc = FakeCMC({"BTC": 100.0, "ETH": 10.0})
+    feed, _, client = make_feed(cmc, store)
+    poller = FeedPoller(PORTFOLIO)
+    poller.subscribers.add(client)
+    poll(feed, poller)
+    assert poll(feed, poller) == []
+
+    # Added position: its symbol's first quote counts as changed anyway
+    store.add_lot(HoldingsStore.DEFAULT_PORTFOLIO, "ETH", 2.0, 10.0)
+    assert [m["type"] for m in poll(feed, poller)] == ["price_update", "portfolio_update"]
+
+    # Edited position with every quote unchanged
+    store.add_lot(HoldingsStore.DEFAULT_PORTFOLIO, "BTC", 1.0, 100.0)
+    edited = poll(feed, poller)
+    assert [m["type"] for m in edited] == ["portfolio_update"]
+    assert edited[0]["data"]["total_value"] == 220.0
+    assert [p["symbol"] for p in edited[0]["data"]["positions"]] == ["BTC"]
+
+    # Removed position
+    store.import_transactions(HoldingsStore.DEFAULT_PORTFOLIO, [
+        {"symbol": "ETH", "side": "sell", "quantity": 2.0, "price": 15.0}
+    ])
+    removed = poll(feed, poller)
+    assert [m["type"] for m in removed] == ["portfolio_update"]
+    assert removed[0]["data"]["removed_positions"] == ["ETH"]
+    assert removed[0]["data"]["total_value"] == 200.0
+    assert removed[0]["data"]["total_realized_pl"] == 10.0
+
+
+def test_late_subscriber_gets_the_current_snapshot(store):
+    async def run():
+        cmc = FakeCMC({"BTC": 100.0})
+        feed, manager, client = make_feed(cmc, store)
+        feed.interval_seconds = 60
+        await feed.subscribe(client, portfolio=True)
+        await asyncio.sleep(0.05)
+
+        late = object()
+        manager.active_connections.append(late)
+        sent = len(manager.sent)
+        await feed.subscribe(late, portfolio=True)
+        snapshot = manager.sent[sent:]
+        stats = feed.get_stats()
+        await feed.stop()
+        return snapshot, stats, cmc
+
+    snapshot, stats, cmc = asyncio.run(run())
+    assert [m["type"] for m in snapshot] == ["subscribed", "price_update", "portfolio_update"]
+    assert all(m.get("full", True) for m in snapshot)
+    # Both subscribers share one poller
+    assert stats["pollers"] == 1 and stats["subscribers"] == 2
+    assert len(cmc.requested) == 1
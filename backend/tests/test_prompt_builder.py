@@ -0,0 +1,47 @@
+import json
+
+from prompt_builder import PromptBuilder, compact_json, count_tokens
+
+
+def test_compact_json_drops_nulls_and_rounds_floats():
+    text = compact_json({"price": 101.123456789, "note": None, "series": [1.0 / 3, {"x": None, "y": 2}]})
+
+    assert " " not in text
+    assert json.loads(text) == {"price": 101.1235, "series": [0.3333, {"y": 2}]}
+
+
+def test_prompt_within_budget_is_untouched():
+    prompt, stats = PromptBuilder(1000).add("role", "You are a trader.", required=True).add("news", "Quiet day.").build()
+
+    assert prompt == "You are a trader.\n\nQuiet day."
+    assert stats["trimmed"] == []
+    assert stats["prompt_tokens"] == count_tokens(prompt)
+
+
+def test_lowest_priority_sections_are_trimmed_first():
+    news = "headline " * 400
+    market = "price " * 100
+    builder = PromptBuilder(budget_tokens=count_tokens(market) + 150)
+    builder.add("role", "You are a trader.", required=True)
+    builder.add("market_data", market, priority=2)
+    builder.add("news", news, priority=1)
+    builder.add("message", "What now?", required=True)
+
+    prompt, stats = builder.build()
+
+    assert stats["prompt_tokens"] <= stats["budget_tokens"]
+    assert stats["trimmed"] == [{"section": "news", "action": "truncated"}]
+    assert market in prompt
+    assert prompt.startswith("You are a trader.") and prompt.endswith("What now?")
+
+
+def test_sections_that_cannot_usefully_fit_are_dropped():
+    builder = PromptBuilder(budget_tokens=20)
+    builder.add("task", "Answer briefly, using the market context below.", required=True)
+    builder.add("sources", "source " * 200, priority=0)
+
+    prompt, stats = builder.build()
+
+    assert stats["trimmed"] == [{"section": "sources", "action": "dropped"}]
+    assert stats["sections"]["sources"] == 0
+    assert "source" not in prompt
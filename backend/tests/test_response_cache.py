@@ -0,0 +1,37 @@
+from response_cache import TTLCache
+
+
+def test_expired_entries_are_only_served_as_stale():
+    cache = TTLCache(default_ttl=60)
+    cache.set("fresh", 1)
+    cache.set("expired", 2, ttl=0)
+
+    assert cache.get("fresh") == 1
+    assert cache.get("expired") is None
+    assert cache.get("expired", allow_stale=True) == 2
+    assert cache.get("missing", allow_stale=True) is None
+    assert cache.age("expired") >= 0 and cache.age("missing") is None
+
+    stats = cache.get_stats()
+    assert (stats["hits"], stats["misses"], stats["stale_hits"]) == (1, 2, 1)
+
+
+def test_least_recently_used_entry_is_evicted():
+    evicted = []
+    cache = TTLCache(max_entries=2, on_evict=lambda key, value: evicted.append((key, value)))
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+
+    assert evicted == [("b", 2)]
+    assert cache.get("a") == 1 and cache.get("c") == 3
+    assert cache.get_stats()["evictions"] == 1
+
+
+def test_invalidated_entries_are_gone_even_when_stale():
+    cache = TTLCache()
+    cache.set("a", 1)
+    cache.invalidate("a")
+
+    assert cache.get("a", allow_stale=True) is None
@@ -0,0 +1,98 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from risk_analysis_service import RiskAnalysisService
+
+
+class FakeAgent:
+    def __init__(self):
+        self.calls = 0
+        self.error = None
+        self.gateway = SimpleNamespace(available=lambda: True)
+
+    async def chat(self, **kwargs):
+        self.calls += 1
+        await asyncio.sleep(0.01)
+        if self.error:
+            raise self.error
+        return f"summary {self.calls}"
+
+
+class FakePortfolio:
+    default_portfolio_id = "default"
+
+    def __init__(self):
+        self.value = {"positions": [{"symbol": "BTC", "quantity": 1.0, "current_price": 100.0}]}
+        self.store = SimpleNamespace(get_positions=lambda portfolio_id: [{"symbol": p["symbol"]} for p in self.value["positions"]])
+
+    async def calculate_portfolio_value(self):
+        return self.value
+
+
+@pytest.fixture
+def service():
+    return RiskAnalysisService(FakeAgent(), FakePortfolio())
+
+
+def move(service, price=None, quantity=None, is_fallback=False):
+    position = dict(service.portfolio_service.value["positions"][0])
+    position["current_price"] = price or position["current_price"]
+    position["quantity"] = quantity or position["quantity"]
+    service.portfolio_service.value = {"positions": [position], "is_fallback": is_fallback}
+
+
+def test_requests_are_served_the_precomputed_summary(service):
+    first = asyncio.run(service.get_analysis())
+    again = asyncio.run(service.get_analysis())
+
+    assert first["analysis"] == again["analysis"] == "summary 1"
+    assert first["trigger"] == "initial" and first["holdings"] == "BTC"
+    assert service.trading_agent.calls == 1
+    assert "_computed_at" not in again
+
+
+def test_refresh_triggers_on_material_changes_only(service):
+    asyncio.run(service.check_and_refresh())
+
+    move(service, price=101.0)
+    asyncio.run(service.check_and_refresh())
+    # Mock valuations never count as a change
+    move(service, price=50.0, is_fallback=True)
+    asyncio.run(service.check_and_refresh())
+    assert service.trading_agent.calls == 1
+
+    move(service, price=103.0, is_fallback=False)
+    asyncio.run(service.check_and_refresh())
+    move(service, quantity=2.0)
+    asyncio.run(service.check_and_refresh())
+    service.refresh_interval_seconds = 0
+    asyncio.run(service.check_and_refresh())
+
+    assert service.refreshes_by_trigger == {"initial": 1, "price_move": 1, "holdings_changed": 1, "scheduled": 1}
+
+
+def test_concurrent_forced_refreshes_are_coalesced(service):
+    async def run():
+        return await asyncio.gather(*(service.get_analysis(force=True) for _ in range(4)))
+
+    results = asyncio.run(run())
+
+    assert service.trading_agent.calls == 1
+    assert {r["analysis"] for r in results} == {"summary 1"}
+
+
+def test_llm_failures_keep_the_last_good_summary(service):
+    service.trading_agent.error = RuntimeError("provider down")
+    fallback = asyncio.run(service.get_analysis())
+    assert fallback["is_fallback"] and fallback["analysis"] == service.FALLBACK_ANALYSIS
+
+    # A fallback summary is retried on the next check
+    service.trading_agent.error = None
+    asyncio.run(service.check_and_refresh())
+    assert service.latest["trigger"] == "retry" and not service.latest["is_fallback"]
+
+    service.trading_agent.error = RuntimeError("provider down")
+    assert asyncio.run(service.get_analysis(force=True))["analysis"] == "summary 2"
+    assert service.refresh_errors == 2
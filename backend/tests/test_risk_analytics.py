@@ -0,0 +1,79 @@
+import math
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from risk_analytics import compute_risk_metrics
+
+
+def closes_frame(days=250, seed=11):
+    rng = np.random.default_rng(seed)
+    index = pd.date_range("2025-01-01", periods=days, freq="D")
+    returns = rng.normal(0.001, [0.04, 0.03, 0.06], size=(days, 3))
+    prices = 100 * np.cumprod(1 + returns, axis=0)
+    return pd.DataFrame(prices, index=index, columns=["BTC-USD", "ETH-USD", "SOL-USD"])
+
+
+def test_historical_var_and_cvar_match_the_return_distribution():
+    closes = closes_frame()
+    quantities = np.array([1.0, 2.0, 5.0])
+    metrics = compute_risk_metrics(closes, ["BTC", "ETH", "SOL"], quantities, confidence=0.95)
+
+    weights = quantities * closes.iloc[-1].to_numpy()
+    weights /= weights.sum()
+    portfolio_returns = closes.pct_change().iloc[1:].to_numpy() @ weights
+    var = -np.quantile(portfolio_returns, 0.05)
+    cvar = -portfolio_returns[portfolio_returns <= -var].mean()
+
+    assert metrics["var"]["historical"]["pct"] == pytest.approx(var)
+    assert metrics["cvar"]["historical"]["pct"] == pytest.approx(cvar)
+    assert metrics["cvar"]["historical"]["pct"] >= metrics["var"]["historical"]["pct"]
+    assert metrics["var"]["historical"]["amount"] == pytest.approx(var * metrics["total_value"])
+    assert metrics["volatility"]["daily"] == pytest.approx(portfolio_returns.std(ddof=1))
+
+
+def test_parametric_var_and_cvar_follow_the_normal_formula():
+    metrics = compute_risk_metrics(closes_frame(), ["BTC", "ETH", "SOL"], np.array([1.0, 1.0, 1.0]), confidence=0.99)
+
+    sigma = metrics["volatility"]["daily"]
+    var = metrics["var"]["parametric"]["pct"]
+    cvar = metrics["cvar"]["parametric"]["pct"]
+    # z(0.99) = 2.326, pdf(z) / 0.01 = 2.665; the mean shifts both by the same amount
+    assert cvar - var == pytest.approx(sigma * (2.665214 - 2.326348), rel=1e-4)
+    assert metrics["volatility"]["annualized"] == pytest.approx(sigma * math.sqrt(365))
+
+
+def test_risk_contributions_sum_to_portfolio_volatility():
+    metrics = compute_risk_metrics(closes_frame(), ["BTC", "ETH", "SOL"], np.array([1.0, 2.0, 5.0]))
+    holdings = metrics["holdings"]
+
+    assert sum(h["risk_contribution_pct"] for h in holdings) == pytest.approx(1.0, abs=1e-5)
+    assert sum(h["risk_contribution"] for h in holdings) == pytest.approx(metrics["volatility"]["daily"], rel=1e-5)
+    assert sum(h["weight"] for h in holdings) == pytest.approx(1.0, abs=1e-5)
+
+
+def test_benchmark_against_itself_has_beta_one():
+    closes = closes_frame()
+    benchmark = closes["BTC-USD"].rename("BTC-USD")
+    metrics = compute_risk_metrics(closes[["BTC-USD"]], ["BTC"], np.array([1.0]), benchmark=benchmark)
+
+    assert metrics["beta"]["benchmark"] == "BTC-USD"
+    assert metrics["beta"]["portfolio"] == pytest.approx(1.0)
+    assert metrics["holdings"][0]["beta"] == pytest.approx(1.0)
+
+
+def test_correlation_matrix_is_symmetric_with_unit_diagonal():
+    metrics = compute_risk_metrics(closes_frame(), ["BTC", "ETH", "SOL"], np.array([1.0, 1.0, 1.0]))
+    matrix = np.array(metrics["correlation"]["matrix"])
+
+    assert np.allclose(matrix, matrix.T)
+    assert np.allclose(np.diag(matrix), 1.0)
+
+
+def test_too_little_history_or_no_value_raises():
+    closes = closes_frame()
+    with pytest.raises(ValueError):
+        compute_risk_metrics(closes.iloc[:2], ["BTC", "ETH", "SOL"], np.array([1.0, 1.0, 1.0]))
+    with pytest.raises(ValueError):
+        compute_risk_metrics(closes, ["BTC", "ETH", "SOL"], np.zeros(3))
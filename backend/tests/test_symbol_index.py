@@ -0,0 +1,86 @@
+from symbol_index import SymbolIndex
+
+
+ENTRIES = [
+    {"id": 1, "name": "Bitcoin", "symbol": "BTC", "slug": "bitcoin", "rank": 1},
+    {"id": 1027, "name": "Ethereum", "symbol": "ETH", "slug": "ethereum", "rank": 2},
+    {"id": 1321, "name": "Ethereum Classic", "symbol": "ETC", "slug": "ethereum-classic", "rank": 30},
+    {"id": 5426, "name": "Solana", "symbol": "SOL", "slug": "solana", "rank": 5},
+    {"id": 9999, "name": "Solar Token", "symbol": "SOLAR", "slug": "solar-token", "rank": 800},
+    {"id": 8888, "name": "Bitcoin Cash", "symbol": "BCH", "slug": "bitcoin-cash", "rank": 15},
+    {"id": 7777, "name": "Sol Wrapped", "symbol": "WSOL", "slug": "wrapped-sol", "rank": None},
+    {"id": 6666, "name": "Solid Coin", "symbol": "SLD", "slug": "solid-coin", "rank": 400},
+]
+
+
+def build_index(**kwargs):
+    index = SymbolIndex(**kwargs)
+    index.build(ENTRIES)
+    return index
+
+
+def test_exact_matches_rank_before_prefix_matches():
+    results = build_index().search("sol")
+    assert [(r["symbol"], r["match"]) for r in results] == [
+        ("SOL", "symbol"),
+        ("WSOL", "name"),
+        ("SOLAR", "symbol_prefix"),
+        ("SLD", "name_prefix"),
+    ]
+
+
+def test_ties_within_a_tier_break_on_rank():
+    # A word of the name counts as an exact name match
+    results = build_index().search("bitcoin")
+    assert [(r["symbol"], r["match"]) for r in results] == [("BTC", "name"), ("BCH", "name")]
+
+    results = build_index().search("ether")
+    assert [(r["symbol"], r["match"]) for r in results] == [("ETH", "name_prefix"), ("ETC", "name_prefix")]
+
+
+def test_unranked_entries_sort_last_within_a_tier():
+    results = build_index().search("so")
+    assert [r["symbol"] for r in results] == ["SOL", "SOLAR", "SLD", "WSOL"]
+
+
+def test_typo_is_found_by_fuzzy_match():
+    results = build_index().search("etherium")
+    assert results
+    assert results[0]["symbol"] == "ETH"
+    assert results[0]["match"] == "fuzzy"
+
+
+def test_short_queries_do_not_fall_back_to_fuzzy():
+    index = build_index()
+    assert index.search("xq") == []
+    assert index.fuzzy_searches == 0
+
+
+def test_fuzzy_only_fills_what_prefix_matches_leave():
+    index = build_index()
+    results = index.search("eth", limit=2)
+    assert [r["match"] for r in results] == ["symbol", "name_prefix"]
+    assert index.fuzzy_searches == 0
+
+
+def test_limit_and_result_cache():
+    index = build_index()
+    first = index.search("S", limit=2)
+    assert len(first) == 2
+    # Results are copies, so callers cannot corrupt the cache
+    first[0]["symbol"] = "changed"
+    assert index.search(" s ", limit=2)[0]["symbol"] == "SOL"
+    assert index.searches == 2
+    assert index.cached_searches == 1
+
+
+def test_save_and_load_round_trip(tmp_path):
+    index = build_index()
+    path = tmp_path / "symbols.json"
+    index.save(str(path))
+
+    loaded = SymbolIndex()
+    assert loaded.load(str(path))
+    assert len(loaded) == len(ENTRIES)
+    assert loaded.search("btc")[0]["id"] == 1
+    assert not SymbolIndex().load(str(tmp_path / "missing.json"))
@@ -36,6 +36,29 @@ class WebSocketManager:
             print(f"Error sending personal message: {e}")
             self.disconnect(websocket)
     
+    async def send_json(self, data: Dict[str, Any], websocket: WebSocket) -> bool:
+        """Send JSON data to a specific WebSocket connection"""
+        try:
+            await websocket.send_text(json.dumps(data))
+            return True
+        except Exception as e:
+            print(f"Error sending message: {e}")
+            self.disconnect(websocket)
+            return False
+    
+    async def send_json_to(self, data: Dict[str, Any], connections: List[WebSocket]) -> int:
+        """Send JSON data to a group of connections, serializing it once; returns how many got it"""
+        message = json.dumps(data)
+        delivered = 0
+        for connection in connections:
+            try:
+                await connection.send_text(message)
+                delivered += 1
+            except Exception as e:
+                print(f"Error sending to connection: {e}")
+                self.disconnect(connection)
+        return delivered
+    
     async def broadcast_json(self, data: Dict[str, Any]):
         """Broadcast JSON data to all connected clients"""
         if not self.active_connections:
@@ -5,11 +5,14 @@ Gets actual market data and generates realistic performance JSON files
 
 import yfinance as yf
 import json
+import asyncio
 import pandas as pd
 import numpy as np
 from datetime import datetime
 from pathlib import Path
-from typing import Dict, Any
+from typing import Dict, Any, Callable, Optional
+from performance_store import PerformanceStore
+from market_snapshot import market_snapshot
 
 class YFinanceDataGenerator:
     """
@@ -19,7 +22,13 @@ class YFinanceDataGenerator:
     def __init__(self, symbols=['BTC-USD', 'ETH-USD', 'AAPL', 'TSLA'], output_dir="./performance_data"):
         self.symbols = symbols
         self.output_dir = Path(output_dir)
-        self.output_dir.mkdir(exist_ok=True)
+        # Files go into hourly partitions (YYYY/MM/DD/HH) under the output directory
+        self.store = PerformanceStore(output_dir)
+        
+        # Optional in-process consumer (e.g. PerformanceAnalyzer.submit_record)
+        self.sink: Optional[Callable[[dict, str], bool]] = None
+        self.persist = True
+        self._pending_writes = set()
         
         # Trading state
         self.positions = {}
@@ -46,6 +55,27 @@ class YFinanceDataGenerator:
             ]
         }
     
+    def attach_sink(self, sink: Callable[[dict, str], bool], persist: bool = True):
+        """
+        Deliver generated records straight to an in-process consumer
+        
+        Args:
+            sink: Callable taking (performance_data, filepath); returns False if it
+                  cannot accept records, in which case the file is written synchronously
+            persist: Also write records to disk in the background
+        """
+        self.sink = sink
+        self.persist = persist
+    
+    def _write_file(self, filepath: Path, performance_data: Dict[str, Any]):
+        with open(filepath, 'w') as f:
+            json.dump(performance_data, f, indent=2)
+    
+    def _on_write_done(self, task: asyncio.Task):
+        self._pending_writes.discard(task)
+        if not task.cancelled() and task.exception():
+            print(f"❌ Error writing performance file: {task.exception()}")
+    
     def get_real_market_data(self, symbol: str = 'BTC-USD') -> Dict[str, Any]:
         """
         Get real-time market data using yfinance
@@ -81,7 +111,7 @@ class YFinanceDataGenerator:
             current_volume = float(hist['Volume'].iloc[-1])
             avg_volume = float(hist['Volume'].tail(20).mean())
             
-            return {
+            market_data = {
                 "symbol": symbol,
                 "price": round(current_price, 2),
                 "sma_5": round(current_sma5, 2),
@@ -94,6 +124,8 @@ class YFinanceDataGenerator:
                 "volume_ratio": round(current_volume / avg_volume, 2),
                 "timestamp": datetime.now().isoformat()
             }
+            market_snapshot.update(symbol, {**market_data, "change_24h": market_data["price_change_1d"]}, source="yfinance")
+            return market_data
             
         except Exception as e:
             print(f"❌ Error getting data for {symbol}: {e}")
@@ -297,6 +329,7 @@ class YFinanceDataGenerator:
                 "pnl_realized": metrics["total_pnl"],
                 "pnl_unrealized": metrics["unrealized_pnl"]
             },
+            "portfolio_metrics": metrics,
             "market_data": market_data,
             "metadata": {
                 "data_source": "yfinance",
@@ -308,10 +341,17 @@ class YFinanceDataGenerator:
         # Save to file
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         filename = f"yfinance_performance_{timestamp}.json"
-        filepath = self.output_dir / filename
+        filepath = self.store.path_for(filename)
         
-        with open(filepath, 'w') as f:
-            json.dump(performance_data, f, indent=2)
+        handed_off = self.sink(performance_data, str(filepath)) if self.sink else False
+        if not handed_off:
+            # No in-process consumer: the file watcher picks the file up
+            self._write_file(filepath, performance_data)
+        elif self.persist:
+            # Persistence is off the analysis path; the write happens in the background
+            task = asyncio.create_task(asyncio.to_thread(self._write_file, filepath, performance_data))
+            self._pending_writes.add(task)
+            task.add_done_callback(self._on_write_done)
         
         print(f"📊 Generated: {filename} | {primary_symbol}: ${market_data['price']} | Signal: {signal} | Portfolio: ${metrics['portfolio_value']:.2f}")
         
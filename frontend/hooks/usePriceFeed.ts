@@ -0,0 +1,112 @@
+import { useState, useEffect, useRef } from 'react';
+
+export interface FeedPosition {
+    symbol: string;
+    quantity: number;
+    value: number;
+    current_price?: number;
+    avg_price?: number;
+    percent_change_24h?: number;
+    unrealized_pl?: number;
+    unrealized_pl_percent?: number;
+}
+
+export interface FeedPortfolio {
+    total_value: number;
+    total_change_24h: number;
+    total_unrealized_pl: number;
+    total_change_percent: number;
+    total_realized_pl?: number;
+    positions: FeedPosition[];
+    last_updated: string;
+}
+
+export interface FeedPrice {
+    name: string;
+    price: number;
+    percent_change_24h: number;
+    market_cap: number;
+    volume_24h: number;
+}
+
+// Apply a portfolio_update delta: changed totals, changed positions (by symbol) and removed positions
+const mergePortfolio = (previous: FeedPortfolio | null, data: any, full: boolean): FeedPortfolio => {
+    if (full || !previous) {
+        return data;
+    }
+    const { positions: changed = [], removed_positions: removed = [], ...totals } = data;
+    const changedBySymbol = new Map<string, FeedPosition>(changed.map((p: FeedPosition) => [p.symbol, p]));
+    const positions = previous.positions
+        .filter(p => !removed.includes(p.symbol))
+        .map(p => changedBySymbol.get(p.symbol) ?? p);
+    const known = new Set(positions.map(p => p.symbol));
+    changed.forEach((p: FeedPosition) => {
+        if (!known.has(p.symbol)) positions.push(p);
+    });
+    return { ...previous, ...totals, positions };
+};
+
+// Live portfolio valuation and holding prices pushed by the backend price feed over /ws
+export const usePriceFeed = () => {
+    const [portfolio, setPortfolio] = useState<FeedPortfolio | null>(null);
+    const [prices, setPrices] = useState<Record<string, FeedPrice>>({});
+    const [isConnected, setIsConnected] = useState(false);
+
+    const wsRef = useRef<WebSocket | null>(null);
+    const reconnectRef = useRef<ReturnType<typeof setTimeout> | null>(null);
+
+    useEffect(() => {
+        let stopped = false;
+
+        const connect = () => {
+            const ws = new WebSocket('ws://localhost:8000/ws');
+
+            ws.onopen = () => {
+                setIsConnected(true);
+                ws.send(JSON.stringify({ type: 'subscribe_prices', portfolio: true }));
+            };
+
+            ws.onmessage = (event) => {
+                try {
+                    const message = JSON.parse(event.data);
+                    if (message.type === 'price_update') {
+                        setPrices(prev => (message.full ? message.data : { ...prev, ...message.data }));
+                    } else if (message.type === 'portfolio_update') {
+                        setPortfolio(prev => mergePortfolio(prev, message.data, message.full));
+                    } else if (message.type === 'feed_error') {
+                        console.error('Price feed error:', message.error);
+                    }
+                } catch (error) {
+                    // Other /ws traffic (e.g. plain text echoes) is not for this hook
+                }
+            };
+
+            ws.onclose = () => {
+                setIsConnected(false);
+                // Attempt to reconnect after 3 seconds
+                if (!stopped) {
+                    reconnectRef.current = setTimeout(connect, 3000);
+                }
+            };
+
+            ws.onerror = (error) => {
+                console.error('Price feed WebSocket error:', error);
+            };
+
+            wsRef.current = ws;
+        };
+
+        connect();
+
+        return () => {
+            stopped = true;
+            if (reconnectRef.current) clearTimeout(reconnectRef.current);
+            if (wsRef.current) {
+                wsRef.current.close();
+                wsRef.current = null;
+            }
+        };
+    }, []);
+
+    return { portfolio, prices, isConnected };
+};
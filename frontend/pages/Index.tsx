@@ -4,36 +4,16 @@ import { Button } from "@/components/ui/button";
 import { Tabs, TabsContent, TabsList, TabsTrigger } from "@/components/ui/tabs";
 import { AreaChart, Area, XAxis, YAxis, CartesianGrid, Tooltip, ResponsiveContainer } from 'recharts';
 import { TrendingUp, TrendingDown, RefreshCw, MoreVertical } from "lucide-react";
+import { usePriceFeed } from "@/hooks/usePriceFeed";
 
-// Interfaces for API data
-interface Position {
-    symbol: string;
-    quantity: number;
-    value: number;
-}
-
-interface PortfolioData {
-    total_value: number;
-    total_change_24h: number;
-    total_unrealized_pl: number;
-    total_change_percent: number;
-    positions: Position[];
-    last_updated: string;
-}
-
-interface CryptoPrice {
-    name: string;
-    price: number;
-    percent_change_24h: number;
-    market_cap: number;
-    volume_24h: number;
-}
+// The chart cannot draw more points than this; longer histories are downsampled by the backend
+const HISTORY_MAX_POINTS = 500;
 
 const Index = () => {
     const [isLoading, setIsLoading] = useState(false);
     const [activeTab, setActiveTab] = useState("positions");
-    const [portfolioData, setPortfolioData] = useState<PortfolioData | null>(null);
-    const [marketPrices, setMarketPrices] = useState<Record<string, CryptoPrice>>({});
+    // Portfolio value and holding prices are pushed by the backend price feed
+    const { portfolio: portfolioData, prices: marketPrices } = usePriceFeed();
     const [selectedPeriod, setSelectedPeriod] = useState("1Y");
     const [chartData, setChartData] = useState<any[]>([]);
     const [riskAnalysis, setRiskAnalysis] = useState<string>("Loading risk analysis...");
@@ -55,7 +35,7 @@ const Index = () => {
 
     const fetchHistory = async (period: string) => {
         try {
-            const res = await fetch(`http://localhost:8000/portfolio/history?period=${period}`);
+            const res = await fetch(`http://localhost:8000/portfolio/history?period=${period}&max_points=${HISTORY_MAX_POINTS}`);
             if (res.ok) {
                 const data = await res.json();
                 setChartData(data);
@@ -97,31 +77,15 @@ const Index = () => {
     const fetchData = async () => {
         setIsLoading(true);
         try {
-            // 1. Fetch Portfolio Value
-            const portfolioRes = await fetch("http://localhost:8000/portfolio/value");
-            if (!portfolioRes.ok) throw new Error("Failed to fetch portfolio");
-            const portfolio: PortfolioData = await portfolioRes.json();
-            setPortfolioData(portfolio);
-
-            // 2. Fetch Real-time Prices for positions
-            const symbols = portfolio.positions.map(p => p.symbol).join(',');
-            if (symbols) {
-                const pricesRes = await fetch(`http://localhost:8000/crypto/prices?symbols=${symbols}`);
-                if (pricesRes.ok) {
-                    const pricesData = await pricesRes.json();
-                    if (pricesData.success && pricesData.data) {
-                        setMarketPrices(pricesData.data);
-                    }
-                }
-            }
-            
-            // 3. Fetch History
+            // Portfolio value and real-time prices arrive over the WebSocket price feed
+
+            // 1. Fetch History
             await fetchHistory(selectedPeriod);
 
-            // 4. Fetch Risk Analysis (non-blocking)
+            // 2. Fetch Risk Analysis (non-blocking)
             fetchRiskAnalysis();
 
-            // 5. Fetch Order History
+            // 3. Fetch Order History
             // fetchOrderHistory();
 
         } catch (error) {